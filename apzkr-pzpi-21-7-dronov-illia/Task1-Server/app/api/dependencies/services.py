@@ -1,14 +1,19 @@
 from fastapi import Depends
 
 from app.api.dependencies.repository import get_repository
+from app.repository.critical_message import critical_message_repository
+from app.repository.fuel_level import FuelLevelRepository
 from app.repository.fuel_storage import FuelStorageRepository
 from app.repository.fuel_supplier import FuelSupplierRepository
 from app.repository.inspection import InspectionRepository
 from app.repository.purchase import PurchaseRepository
+from app.repository.purchase_rollup import PurchaseRollupRepository
 from app.repository.shift import ShiftRepository
 from app.repository.user import UserRepository
 from app.repository.vehicle import VehicleRepository
+from app.services.export import ExportService
 from app.services.fuel import FuelService
+from app.services.message import MessageService
 from app.services.shift import ShiftService
 from app.services.user import UserService
 from app.services.vehicle import VehicleService
@@ -21,6 +26,18 @@ def get_user_service(
     return service
 
 
+def get_export_service(
+    user_repository: UserRepository = Depends(get_repository(UserRepository)),
+) -> ExportService:
+    service = ExportService(user_repository)
+    return service
+
+
+def get_message_service() -> MessageService:
+    service = MessageService(critical_message_repository)
+    return service
+
+
 def get_vehicle_service(
     user_repository: UserRepository = Depends(get_repository(UserRepository)),
     vehicle_repository: VehicleRepository = Depends(get_repository(VehicleRepository)),
@@ -55,11 +72,20 @@ def get_fuel_service(
     purchase_repository: PurchaseRepository = Depends(
         get_repository(PurchaseRepository)
     ),
+    fuel_level_repository: FuelLevelRepository = Depends(
+        get_repository(FuelLevelRepository)
+    ),
+    purchase_rollup_repository: PurchaseRollupRepository = Depends(
+        get_repository(PurchaseRollupRepository)
+    ),
 ) -> FuelService:
     service = FuelService(
         user_repository,
         fuel_supplier_repository,
         fuel_storage_repository,
         purchase_repository,
+        critical_message_repository,
+        fuel_level_repository,
+        purchase_rollup_repository,
     )
     return service
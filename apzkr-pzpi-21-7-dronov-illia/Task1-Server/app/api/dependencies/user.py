@@ -1,21 +1,14 @@
-from typing import Any
+from typing import Any, Optional
 
-from fastapi import Depends
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import Row
 
 from app.api.dependencies.auth import auth_wrapper
 from app.api.dependencies.repository import get_repository
-from app.models.db.user import User
+from app.models.schemas.users import UserIdentity
 from app.repository.user import UserRepository
 
 
-async def get_current_user(
-    auth_data: dict[str, Any] = Depends(auth_wrapper),
-    user_repository: UserRepository = Depends(get_repository(UserRepository)),
-) -> User:
-    current_user: User = await user_repository.get_user_by_email(auth_data["email"])
-    return current_user
-
-
 async def get_current_user_id(
     auth_data: dict[str, Any] = Depends(auth_wrapper),
     user_repository: UserRepository = Depends(get_repository(UserRepository)),
@@ -27,3 +20,19 @@ async def get_current_user_id(
     )
 
     return user_id
+
+
+async def get_current_identity(
+    auth_data: dict[str, Any] = Depends(auth_wrapper),
+    user_repository: UserRepository = Depends(get_repository(UserRepository)),
+) -> UserIdentity:
+    # Tokens live for 30 days, so deleted or demoted users are caught by checking
+    # the row itself. The id claim keeps it a primary key lookup, and FastAPI
+    # resolves the dependency once per request
+    identity: Optional[Row] = await user_repository.get_identity(
+        auth_data.get("id"), auth_data["email"]
+    )
+    if not identity:
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail="User is not found")
+
+    return UserIdentity(**identity._mapping)
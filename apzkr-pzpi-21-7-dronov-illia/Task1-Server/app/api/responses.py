@@ -0,0 +1,20 @@
+from typing import Any
+
+from fastapi import Response, status
+
+from app.models.schemas.adapters import get_adapter
+
+
+def schema_response(
+    content: Any, content_type: Any, status_code: int = status.HTTP_200_OK
+) -> Response:
+    """
+    Serializes schema objects the service has already validated straight to JSON.
+    A returned response skips the `response_model` validation and encoding,
+    the route still declares `response_model` for the documentation.
+    """
+    return Response(
+        get_adapter(content_type).dump_json(content),
+        status_code=status_code,
+        media_type="application/json",
+    )
@@ -1,10 +1,23 @@
-import json
+import os
+from typing import Optional
 
-from fastapi import APIRouter, Depends
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 
-from app.api.dependencies.services import get_user_service
-from app.api.dependencies.user import get_current_user_id
+from app.api.dependencies.services import (
+    get_export_service,
+    get_message_service,
+    get_user_service,
+)
+from app.api.dependencies.user import get_current_identity
+from app.api.responses import schema_response
+from app.models.schemas.export import ExportFormats, ExportJobData
+from app.models.schemas.message import CriticalMessageBase, CriticalMessageData
+from app.models.schemas.pagination import CursorPage, CursorParams
+from app.models.schemas.users import UserIdentity
+from app.services.export import EXPORT_WATERMARK_HEADER, ExportService
+from app.services.message import MessageService
 from app.services.user import UserService
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
@@ -12,32 +25,118 @@ router = APIRouter(prefix="/admin", tags=["Admin"])
 
 @router.get("/export-data/xlsx/", response_model=None)
 async def export_data_xlsx(
-    current_user_id: int = Depends(get_current_user_id),
+    current_user: UserIdentity = Depends(get_current_identity),
     user_service: UserService = Depends(get_user_service),
 ):
-    file_path = await user_service.export_data_xlsx(current_user_id)
+    file_path = await user_service.export_data_xlsx(current_user)
+    return FileResponse(
+        path=file_path,
+        filename="export.xlsx",
+        media_type="multipart/form-data",
+        background=BackgroundTask(os.remove, file_path),
+    )
+
+
+@router.post("/export-data/jobs/", response_model=ExportJobData, status_code=202)
+async def start_export(
+    current_user: UserIdentity = Depends(get_current_identity),
+    export_service: ExportService = Depends(get_export_service),
+) -> ExportJobData:
+    """
+    ### Start an XLSX export in the background or reuse an up-to-date one
+    """
+    return await export_service.start_export(current_user)
+
+
+@router.get("/export-data/jobs/{job_id}/", response_model=ExportJobData)
+async def get_export(
+    job_id: str,
+    current_user: UserIdentity = Depends(get_current_identity),
+    export_service: ExportService = Depends(get_export_service),
+) -> ExportJobData:
+    return await export_service.get_export(job_id, current_user)
+
+
+@router.get("/export-data/jobs/{job_id}/download/", response_model=None)
+async def download_export(
+    job_id: str,
+    current_user: UserIdentity = Depends(get_current_identity),
+    export_service: ExportService = Depends(get_export_service),
+):
+    file_path = await export_service.get_export_file(job_id, current_user)
     return FileResponse(
         path=file_path, filename="export.xlsx", media_type="multipart/form-data"
     )
 
-@router.post("/send-critical-messages/", response_model=None)
-async def send_message(
-    data: dict,
-    current_user_id: int = Depends(get_current_user_id),
-    user_service: UserService = Depends(get_user_service),
+
+@router.get("/export-data/{table_name}.ndjson", response_model=None)
+async def export_table_ndjson(
+    table_name: str,
+    since: Optional[int] = None,
+    current_user: UserIdentity = Depends(get_current_identity),
+    export_service: ExportService = Depends(get_export_service),
 ):
-    with open("./messages.json", "r", encoding="utf-8") as file:
-        current_data: list = json.loads(file.read())
-        current_data.append(data)
+    """
+    ### Stream a table as NDJSON, only rows changed since the `since` watermark if given
+    The next watermark comes in the `X-Export-Watermark` header. Rows near it can be
+    sent twice, deletes are streamed from the `deleted_rows` table
+    """
+    watermark, stream = await export_service.get_table_stream(
+        table_name, ExportFormats.NDJSON, since, current_user
+    )
+    return StreamingResponse(
+        stream,
+        media_type="application/x-ndjson",
+        headers={EXPORT_WATERMARK_HEADER: str(watermark)},
+    )
+
 
-    with open("./messages.json", "w", encoding="utf-8") as file:
-        file.write(json.dumps((current_data)))
+@router.get("/export-data/{table_name}.csv", response_model=None)
+async def export_table_csv(
+    table_name: str,
+    since: Optional[int] = None,
+    current_user: UserIdentity = Depends(get_current_identity),
+    export_service: ExportService = Depends(get_export_service),
+):
+    """
+    ### Stream a table as CSV, only rows changed since the `since` watermark if given
+    The next watermark comes in the `X-Export-Watermark` header. Rows near it can be
+    sent twice, deletes are streamed from the `deleted_rows` table
+    """
+    watermark, stream = await export_service.get_table_stream(
+        table_name, ExportFormats.CSV, since, current_user
+    )
+    return StreamingResponse(
+        stream,
+        media_type="text/csv",
+        headers={EXPORT_WATERMARK_HEADER: str(watermark)},
+    )
 
 
-@router.get("/get-critical-messages/", response_model=None)
-async def send_message(
-    current_user_id: int = Depends(get_current_user_id),
+@router.get("/cache-stats/", response_model=None)
+async def get_cache_stats(
+    current_user: UserIdentity = Depends(get_current_identity),
     user_service: UserService = Depends(get_user_service),
 ):
-    with open("./messages.json", "r", encoding="utf-8") as file:
-        return json.loads(file.read())
+    return await user_service.get_cache_stats(current_user)
+
+
+@router.post(
+    "/send-critical-messages/", response_model=CriticalMessageData, status_code=201
+)
+async def send_critical_message(
+    data: CriticalMessageBase,
+    current_user: UserIdentity = Depends(get_current_identity),
+    message_service: MessageService = Depends(get_message_service),
+) -> CriticalMessageData:
+    return await message_service.send_critical_message(data, current_user)
+
+
+@router.get("/get-critical-messages/", response_model=CursorPage[CriticalMessageData])
+async def get_critical_messages(
+    params: CursorParams = Depends(),
+    current_user: UserIdentity = Depends(get_current_identity),
+    message_service: MessageService = Depends(get_message_service),
+) -> Response:
+    result = await message_service.get_critical_messages(params, current_user)
+    return schema_response(result, CursorPage[CriticalMessageData])
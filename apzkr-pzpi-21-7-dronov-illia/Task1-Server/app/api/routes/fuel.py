@@ -1,18 +1,31 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 
 from app.api.dependencies.services import get_fuel_service
-from app.api.dependencies.user import get_current_user
-from app.models.db.user import User
+from app.api.dependencies.user import get_current_identity
+from app.api.responses import schema_response
 from app.models.schemas.fuel import (
     PurchaseBase,
+    PurchaseBulkResult,
     PurchaseData,
+    PurchaseFilter,
+    SpendData,
+    SpendFilter,
     StorageBase,
+    StorageBulkResult,
+    StorageBulkUpdate,
+    StorageConsume,
     StorageData,
+    StorageForecast,
+    StorageHistoryFilter,
+    StorageLevelBucket,
     StorageUpdate,
     SupplierBase,
     SupplierData,
+    SupplierRankFilter,
     SupplierUpdate,
 )
+from app.models.schemas.pagination import CursorPage, CursorParams
+from app.models.schemas.users import UserIdentity
 from app.services.fuel import FuelService
 
 router = APIRouter(prefix="/fuel", tags=["Fuel"])
@@ -20,16 +33,30 @@ router = APIRouter(prefix="/fuel", tags=["Fuel"])
 
 @router.get("/suppliers/", response_model=list[SupplierData])
 async def get_suppliers(
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     fuel_service: FuelService = Depends(get_fuel_service),
-) -> list[SupplierData]:
-    return await fuel_service.get_suppliers(current_user)
+) -> Response:
+    result = await fuel_service.get_suppliers(current_user)
+    return schema_response(result, list[SupplierData])
+
+
+@router.get("/suppliers/ranked/", response_model=list[SupplierData])
+async def get_ranked_suppliers(
+    filters: SupplierRankFilter = Depends(),
+    current_user: UserIdentity = Depends(get_current_identity),
+    fuel_service: FuelService = Depends(get_fuel_service),
+) -> Response:
+    """
+    ### Suppliers of the storage's or the given fuel type, the cheapest first
+    """
+    result = await fuel_service.get_ranked_suppliers(filters, current_user)
+    return schema_response(result, list[SupplierData])
 
 
 @router.post("/suppliers/", response_model=SupplierData, status_code=201)
 async def create_supplier(
     data: SupplierBase,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     fuel_service: FuelService = Depends(get_fuel_service),
 ) -> SupplierData:
     return await fuel_service.create_supplier(data, current_user)
@@ -39,7 +66,7 @@ async def create_supplier(
 async def update_supplier(
     data: SupplierUpdate,
     supplier_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     fuel_service: FuelService = Depends(get_fuel_service),
 ) -> SupplierData:
     return await fuel_service.update_supplier(data, supplier_id, current_user)
@@ -48,7 +75,7 @@ async def update_supplier(
 @router.delete("/suppliers/{supplier_id}/delete/", response_model=None, status_code=204)
 async def delete_supplier(
     supplier_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     fuel_service: FuelService = Depends(get_fuel_service),
 ) -> None:
     return await fuel_service.delete_supplier(supplier_id, current_user)
@@ -56,52 +83,136 @@ async def delete_supplier(
 
 @router.get("/storages/", response_model=list[StorageData])
 async def get_storages(
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     fuel_service: FuelService = Depends(get_fuel_service),
-) -> list[StorageData]:
-    return await fuel_service.get_storages(current_user)
+) -> Response:
+    result = await fuel_service.get_storages(current_user)
+    return schema_response(result, list[StorageData])
+
+
+@router.get("/storages/forecast/", response_model=list[StorageForecast])
+async def get_storage_forecasts(
+    current_user: UserIdentity = Depends(get_current_identity),
+    fuel_service: FuelService = Depends(get_fuel_service),
+) -> Response:
+    """
+    ### Estimate when every storage hits its critical amount at the last 24 hours consumption rate
+    """
+    result = await fuel_service.get_storage_forecasts(current_user)
+    return schema_response(result, list[StorageForecast])
 
 
 @router.post("/storages/", response_model=StorageData, status_code=201)
 async def create_storage(
     data: StorageBase,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     fuel_service: FuelService = Depends(get_fuel_service),
 ) -> StorageData:
     return await fuel_service.create_storage(data, current_user)
 
 
+@router.patch("/storages/bulk-update/", response_model=list[StorageBulkResult])
+async def update_storages(
+    data: list[StorageBulkUpdate],
+    current_user: UserIdentity = Depends(get_current_identity),
+    fuel_service: FuelService = Depends(get_fuel_service),
+) -> Response:
+    """
+    ### Update many storages in one transaction, errors are reported per item
+    """
+    result = await fuel_service.update_storages(data, current_user)
+    return schema_response(result, list[StorageBulkResult])
+
+
 @router.patch("/storages/{storage_id}/update/", response_model=StorageData)
 async def update_storage(
     data: StorageUpdate,
     storage_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     fuel_service: FuelService = Depends(get_fuel_service),
 ) -> StorageData:
     return await fuel_service.update_storage(storage_id, data, current_user)
 
 
+@router.post("/storages/{storage_id}/consume/", response_model=StorageData)
+async def consume_fuel(
+    data: StorageConsume,
+    storage_id: int,
+    current_user: UserIdentity = Depends(get_current_identity),
+    fuel_service: FuelService = Depends(get_fuel_service),
+) -> StorageData:
+    """
+    ### Draw fuel from the storage and get its new level back
+    """
+    return await fuel_service.consume_fuel(storage_id, data, current_user)
+
+
+@router.get(
+    "/storages/{storage_id}/history/", response_model=list[StorageLevelBucket]
+)
+async def get_storage_history(
+    storage_id: int,
+    filters: StorageHistoryFilter = Depends(),
+    current_user: UserIdentity = Depends(get_current_identity),
+    fuel_service: FuelService = Depends(get_fuel_service),
+) -> Response:
+    """
+    ### Min, average and max level of the storage per `bucket` seconds
+    """
+    result = await fuel_service.get_storage_history(storage_id, filters, current_user)
+    return schema_response(result, list[StorageLevelBucket])
+
+
 @router.delete("/storages/{storage_id}/delete/", response_model=None, status_code=204)
 async def delete_storage(
     storage_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     fuel_service: FuelService = Depends(get_fuel_service),
 ) -> None:
     return await fuel_service.delete_storage(storage_id, current_user)
 
 
-@router.get("/pucrhases/", response_model=list[PurchaseData])
+@router.get("/pucrhases/", response_model=CursorPage[PurchaseData])
 async def get_purchases(
-    current_user: User = Depends(get_current_user),
+    filters: PurchaseFilter = Depends(),
+    params: CursorParams = Depends(),
+    current_user: UserIdentity = Depends(get_current_identity),
     fuel_service: FuelService = Depends(get_fuel_service),
-) -> list[PurchaseData]:
-    return await fuel_service.get_purchases(current_user)
+) -> Response:
+    result = await fuel_service.get_purchases(filters, params, current_user)
+    return schema_response(result, CursorPage[PurchaseData])
+
+
+@router.get("/purchases/analytics/", response_model=list[SpendData])
+async def get_spend_analytics(
+    filters: SpendFilter = Depends(),
+    current_user: UserIdentity = Depends(get_current_identity),
+    fuel_service: FuelService = Depends(get_fuel_service),
+) -> Response:
+    """
+    ### Purchased amount and spend per month and supplier
+    """
+    result = await fuel_service.get_spend_analytics(filters, current_user)
+    return schema_response(result, list[SpendData])
 
 
 @router.post("/purchases/", response_model=PurchaseData, status_code=201)
 async def create_purchase(
     data: PurchaseBase,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     fuel_service: FuelService = Depends(get_fuel_service),
 ) -> PurchaseData:
-    return await fuel_service.create_purchase(data, current_user)
\ No newline at end of file
+    return await fuel_service.create_purchase(data, current_user)
+
+
+@router.post("/purchases/bulk/", response_model=list[PurchaseBulkResult])
+async def create_purchases(
+    data: list[PurchaseBase],
+    current_user: UserIdentity = Depends(get_current_identity),
+    fuel_service: FuelService = Depends(get_fuel_service),
+) -> Response:
+    """
+    ### Create many purchases in one transaction, errors are reported per item
+    """
+    result = await fuel_service.create_purchases(data, current_user)
+    return schema_response(result, list[PurchaseBulkResult])
@@ -1,26 +1,31 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 
 from app.api.dependencies.services import get_shift_service
-from app.api.dependencies.user import get_current_user
-from app.models.db.user import User
-from app.models.schemas.shift import ShiftBase, ShiftData
+from app.api.dependencies.user import get_current_identity
+from app.api.responses import schema_response
+from app.models.schemas.pagination import CursorPage, CursorParams
+from app.models.schemas.shift import ShiftBase, ShiftData, ShiftFilter
+from app.models.schemas.users import UserIdentity
 from app.services.shift import ShiftService
 
 router = APIRouter(prefix="/shifts", tags=["Shifts"])
 
 
-@router.get("/", response_model=list[ShiftData])
+@router.get("/", response_model=CursorPage[ShiftData])
 async def get_shifts(
-    current_user: User = Depends(get_current_user),
+    filters: ShiftFilter = Depends(),
+    params: CursorParams = Depends(),
+    current_user: UserIdentity = Depends(get_current_identity),
     shift_service: ShiftService = Depends(get_shift_service),
-) -> list[ShiftData]:
-    return await shift_service.get_shifts(current_user)
+) -> Response:
+    result = await shift_service.get_shifts(filters, params, current_user)
+    return schema_response(result, CursorPage[ShiftData])
 
 
 @router.post("/start/", response_model=ShiftData, status_code=201)
 async def start_shift(
     data: ShiftBase,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     shift_service: ShiftService = Depends(get_shift_service),
 ) -> None:
     return await shift_service.start_shift(data, current_user)
@@ -29,7 +34,7 @@ async def start_shift(
 @router.post("/{shift_id}/end/", response_model=ShiftData, status_code=201)
 async def end_shift(
     shift_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     shift_service: ShiftService = Depends(get_shift_service),
 ) -> ShiftData:
     return await shift_service.end_shift(shift_id, current_user)
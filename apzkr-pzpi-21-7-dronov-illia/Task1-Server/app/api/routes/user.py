@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 
 from app.api.dependencies.services import get_user_service
-from app.api.dependencies.user import get_current_user
-from app.models.db.user import User
+from app.api.dependencies.user import get_current_identity
+from app.api.responses import schema_response
+from app.models.schemas.pagination import CursorPage, CursorParams
 from app.models.schemas.users import (
     PasswordChangeInput,
     PasswordChangeOutput,
     UserData,
+    UserFilter,
+    UserIdentity,
     UserRegister,
     UserUpdate,
 )
@@ -15,17 +18,20 @@ from app.services.user import UserService
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
-@router.get("/", response_model=list[UserData])
+@router.get("/", response_model=CursorPage[UserData])
 async def get_users(
-    current_user: User = Depends(get_current_user),
+    filters: UserFilter = Depends(),
+    params: CursorParams = Depends(),
+    current_user: UserIdentity = Depends(get_current_identity),
     user_service: UserService = Depends(get_user_service),
-) -> list[UserData]:
-    return await user_service.get_users(current_user)
+) -> Response:
+    result = await user_service.get_users(filters, params, current_user)
+    return schema_response(result, CursorPage[UserData])
 
 
 @router.get("/profile/", response_model=UserData)
 async def get_profile(
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     user_service: UserService = Depends(get_user_service),
 ) -> list[UserData]:
     return await user_service.get_profile(current_user)
@@ -34,7 +40,7 @@ async def get_profile(
 @router.post("/register_user/", response_model=UserData, status_code=201)
 async def register_user(
     user_data: UserRegister,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     user_service: UserService = Depends(get_user_service),
 ) -> UserData:
     return await user_service.register_user(user_data, current_user)
@@ -44,7 +50,7 @@ async def register_user(
 async def update_user(
     user_id: int,
     user_data: UserUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     user_service: UserService = Depends(get_user_service),
 ) -> UserData:
     return await user_service.update_user(user_id, user_data, current_user)
@@ -53,7 +59,7 @@ async def update_user(
 @router.delete("/{user_id}/delete/", response_model=None, status_code=204)
 async def update_user(
     user_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     user_service: UserService = Depends(get_user_service),
 ) -> UserData:
     return await user_service.delete_user(user_id, current_user)
@@ -62,7 +68,7 @@ async def update_user(
 @router.patch("/change-password/", response_model=PasswordChangeOutput)
 async def change_password(
     data: PasswordChangeInput,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     user_service: UserService = Depends(get_user_service),
 ) -> None:
     return await user_service.change_password(current_user, data)
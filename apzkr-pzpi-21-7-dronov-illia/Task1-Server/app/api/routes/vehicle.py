@@ -1,16 +1,21 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 
 from app.api.dependencies.services import get_vehicle_service
-from app.api.dependencies.user import get_current_user
-from app.models.db.user import User
+from app.api.dependencies.user import get_current_identity
+from app.api.responses import schema_response
+from app.models.schemas.pagination import CursorPage, CursorParams
+from app.models.schemas.users import UserIdentity
 from app.models.schemas.vehicle import (
     InspectionBase,
     InspectionData,
+    InspectionFilter,
     InspectionUpdate,
     RefuelData,
     SetStatus,
     VehicleBase,
     VehicleData,
+    VehicleFilter,
+    VehicleStatusData,
     VehicleUpdate,
 )
 from app.services.vehicle import VehicleService
@@ -18,19 +23,22 @@ from app.services.vehicle import VehicleService
 router = APIRouter(prefix="/vehicles", tags=["Vehicles"])
 
 
-@router.get("/", response_model=list[VehicleData])
+@router.get("/", response_model=CursorPage[VehicleData])
 async def get_vehicles(
-    current_user: User = Depends(get_current_user),
+    filters: VehicleFilter = Depends(),
+    params: CursorParams = Depends(),
+    current_user: UserIdentity = Depends(get_current_identity),
     vehicle_service: VehicleService = Depends(get_vehicle_service),
-) -> list[VehicleData]:
-    return await vehicle_service.get_vehicles(current_user)
+) -> Response:
+    result = await vehicle_service.get_vehicles(filters, params, current_user)
+    return schema_response(result, CursorPage[VehicleData])
 
 
 @router.post("/refuel/", response_model=None, status_code=201)
 async def refuel_vehicle(
     vehicle_id: int,
     data: RefuelData,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     vehicle_service: VehicleService = Depends(get_vehicle_service),
 ) -> None:
     await vehicle_service.refuel_vehicle(vehicle_id, data, current_user)
@@ -39,17 +47,26 @@ async def refuel_vehicle(
 @router.post("/refuel/stop/", response_model=None, status_code=201)
 async def refuel_vehicle(
     vehicle_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     vehicle_service: VehicleService = Depends(get_vehicle_service),
 ) -> None:
     await vehicle_service.stop_refuel(vehicle_id, current_user)
 
 
+@router.get("/{vehicle_id}/status/", response_model=VehicleStatusData)
+async def get_vehicle_status(
+    vehicle_id: int,
+    current_user: UserIdentity = Depends(get_current_identity),
+    vehicle_service: VehicleService = Depends(get_vehicle_service),
+) -> VehicleStatusData:
+    return await vehicle_service.get_vehicle_status(vehicle_id, current_user)
+
+
 @router.post("/{vehicle_id}/set_current_status/", response_model=None, status_code=201)
 async def set_current_status(
     vehicle_id: int,
     status: SetStatus,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     vehicle_service: VehicleService = Depends(get_vehicle_service),
 ) -> None:
     return await vehicle_service.set_current_status(vehicle_id, status, current_user)
@@ -58,7 +75,7 @@ async def set_current_status(
 @router.post("/create/", response_model=VehicleData, status_code=201)
 async def create_vehicle(
     data: VehicleBase,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     vehicle_service: VehicleService = Depends(get_vehicle_service),
 ) -> VehicleData:
     return await vehicle_service.create_vehicle(data, current_user)
@@ -68,7 +85,7 @@ async def create_vehicle(
 async def update_vehicle(
     vehicle_id: int,
     data: VehicleUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     vehicle_service: VehicleService = Depends(get_vehicle_service),
 ) -> VehicleData:
     return await vehicle_service.update_vehicle(vehicle_id, data, current_user)
@@ -77,24 +94,27 @@ async def update_vehicle(
 @router.delete("/{vehicle_id}/delete/", response_model=None, status_code=204)
 async def delete_vehicle(
     vehicle_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     vehicle_service: VehicleService = Depends(get_vehicle_service),
 ) -> None:
     return await vehicle_service.delete_vehicle(vehicle_id, current_user)
 
 
-@router.get("/inspections/", response_model=list[InspectionData])
+@router.get("/inspections/", response_model=CursorPage[InspectionData])
 async def get_inspections(
-    current_user: User = Depends(get_current_user),
+    filters: InspectionFilter = Depends(),
+    params: CursorParams = Depends(),
+    current_user: UserIdentity = Depends(get_current_identity),
     vehicle_service: VehicleService = Depends(get_vehicle_service),
-) -> list[InspectionData]:
-    return await vehicle_service.get_inspections(current_user)
+) -> Response:
+    result = await vehicle_service.get_inspections(filters, params, current_user)
+    return schema_response(result, CursorPage[InspectionData])
 
 
 @router.post("/inspections/start/", response_model=InspectionData)
 async def start_inspection(
     data: InspectionBase,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     vehicle_service: VehicleService = Depends(get_vehicle_service),
 ) -> InspectionData:
     return await vehicle_service.start_inspection(data, current_user)
@@ -104,7 +124,7 @@ async def start_inspection(
 async def end_inspection(
     inspection_id: int,
     data: InspectionUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserIdentity = Depends(get_current_identity),
     vehicle_service: VehicleService = Depends(get_vehicle_service),
 ) -> InspectionData:
     return await vehicle_service.end_inspection(inspection_id, data, current_user)
@@ -12,7 +12,23 @@ class BackendBaseSettings(BaseSettings):
     DEBUG: bool = decouple.config("DEBUG", cast=bool)
     LOGGING_LEVEL: str = decouple.config("LOGGING_LEVEL")
     REDIS_URL: str = decouple.config("REDIS_URL")
+    STATUS_CACHE_TTL: int = decouple.config("STATUS_CACHE_TTL", cast=int, default=3600)
+    CRITICAL_MESSAGES_MAX_LENGTH: int = decouple.config(
+        "CRITICAL_MESSAGES_MAX_LENGTH", cast=int, default=100000
+    )
+    CRITICAL_MESSAGE_COOLDOWN: int = decouple.config(
+        "CRITICAL_MESSAGE_COOLDOWN", cast=int, default=600
+    )
+    FUEL_LEVEL_BATCH_SIZE: int = decouple.config(
+        "FUEL_LEVEL_BATCH_SIZE", cast=int, default=500
+    )
+    FUEL_LEVEL_FLUSH_INTERVAL: float = decouple.config(
+        "FUEL_LEVEL_FLUSH_INTERVAL", cast=float, default=5
+    )
     JWT_SECRET: str = decouple.config("JWT_SECRET")
+    PASSWORD_HASHING_WORKERS: int = decouple.config(
+        "PASSWORD_HASHING_WORKERS", cast=int, default=4
+    )
     POSTGRES_USER: str = decouple.config("POSTGRES_USER")
     POSTGRES_PASSWORD: str = decouple.config("POSTGRES_PASSWORD")
     POSTGRES_DB: str = decouple.config("POSTGRES_DB")
@@ -1,19 +1,32 @@
 import logging
 import logging.config
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi_pagination import add_pagination
 from fastapi_pagination.utils import disable_installed_extensions_check
 
 from app.api.endpoints import router
 from app.config.logs.log_config import LOGGING_CONFIG
 from app.config.settings.base import settings
+from app.services.fuel_level import fuel_level_writer
 
 # Set up logging configuration
 logging.config.dictConfig(LOGGING_CONFIG)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    fuel_level_writer.start()
+    yield
+    # Write out whatever is still buffered before shutting down
+    await fuel_level_writer.stop()
+
+
+# Responses that still go through `response_model` are encoded with orjson
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 app.include_router(router)
 
 # Enable pagination in the app
@@ -1,3 +1,4 @@
+from app.models.db.data_version import *
 from app.models.db.fuel import *
 from app.models.db.shift import *
 from app.models.db.user import *
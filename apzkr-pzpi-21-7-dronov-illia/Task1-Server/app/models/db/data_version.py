@@ -0,0 +1,83 @@
+from sqlalchemy import DDL, BigInteger, String, Table, event, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+# Id of the writing transaction. Unlike a sequence value it can be compared with
+# the snapshot of an export, see UserRepository.get_export_watermark
+CURRENT_TRANSACTION_ID: str = "pg_current_xact_id()::text::bigint"
+
+reject_update = DDL(
+    "CREATE OR REPLACE FUNCTION reject_update() RETURNS trigger AS $$ "
+    "BEGIN RAISE EXCEPTION '%% is append-only', TG_TABLE_NAME; END; "
+    "$$ LANGUAGE plpgsql"
+)
+
+record_deleted_rows = DDL(
+    "CREATE OR REPLACE FUNCTION record_deleted_rows() RETURNS trigger AS $$ "
+    "BEGIN INSERT INTO deleted_rows (table_name, row_id) "
+    "SELECT TG_TABLE_NAME, id FROM deleted; RETURN NULL; END; "
+    "$$ LANGUAGE plpgsql"
+)
+
+
+class DataVersion(Base):
+    # Bumped in the same transaction as every change of the table
+    __tablename__ = "data_versions"
+
+    table_name: Mapped[str] = mapped_column(String(63), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+def row_version_column() -> Mapped[int]:
+    """Row version taken on every insert and update, exports follow changes by it"""
+    return mapped_column(
+        BigInteger,
+        server_default=text(CURRENT_TRANSACTION_ID),
+        onupdate=text(CURRENT_TRANSACTION_ID),
+        index=True,
+    )
+
+
+class DeletedRow(Base):
+    """Tombstones of exported rows, so incremental exports can follow deletes"""
+
+    __tablename__ = "deleted_rows"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    table_name: Mapped[str] = mapped_column(String(63))
+    row_id: Mapped[int]
+    row_version: Mapped[int] = row_version_column()
+
+
+def make_append_only(table: Table) -> None:
+    """
+    Rows of the table can only be inserted or deleted.
+    The migrations create the same trigger.
+    """
+    event.listen(table, "before_create", reject_update)
+    event.listen(
+        table,
+        "after_create",
+        DDL(
+            f"CREATE TRIGGER {table.name}_append_only BEFORE UPDATE ON {table.name} "
+            "FOR EACH ROW EXECUTE FUNCTION reject_update()"
+        ),
+    )
+
+
+def track_deletes(table: Table) -> None:
+    """
+    Deleted rows of the table, cascades included, leave tombstones in deleted_rows.
+    The migrations create the same trigger.
+    """
+    event.listen(table, "before_create", record_deleted_rows)
+    event.listen(
+        table,
+        "after_create",
+        DDL(
+            f"CREATE TRIGGER {table.name}_track_deletes AFTER DELETE ON {table.name} "
+            "REFERENCING OLD TABLE AS deleted "
+            "FOR EACH STATEMENT EXECUTE FUNCTION record_deleted_rows()"
+        ),
+    )
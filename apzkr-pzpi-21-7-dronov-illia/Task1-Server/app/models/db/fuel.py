@@ -1,11 +1,16 @@
 import enum
 from datetime import datetime
 
-from sqlalchemy import Enum, ForeignKey
+from sqlalchemy import DDL, Enum, ForeignKey, Index, UniqueConstraint, event
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 
 from app.core.database import Base
+from app.models.db.data_version import (
+    make_append_only,
+    row_version_column,
+    track_deletes,
+)
 
 
 class FuelTypes(enum.Enum):
@@ -29,6 +34,10 @@ class FuelStorage(Base):
             validate_strings=True,
         )
     )
+    row_version: Mapped[int] = row_version_column()
+
+
+track_deletes(FuelStorage.__table__)
 
 
 class FuelSupplier(Base):
@@ -45,6 +54,10 @@ class FuelSupplier(Base):
             validate_strings=True,
         )
     )
+    row_version: Mapped[int] = row_version_column()
+
+
+track_deletes(FuelSupplier.__table__)
 
 
 class Purchase(Base):
@@ -52,11 +65,102 @@ class Purchase(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     fuel_storage_id: Mapped[int] = mapped_column(
-        ForeignKey("fuel_storages.id", ondelete="CASCADE")
+        ForeignKey("fuel_storages.id", ondelete="CASCADE"), index=True
     )
     fuel_supplier_id: Mapped[int] = mapped_column(
-        ForeignKey("fuel_suppliers.id", ondelete="CASCADE")
+        ForeignKey("fuel_suppliers.id", ondelete="CASCADE"), index=True
+    )
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), index=True
+    )
+    amount: Mapped[float]
+    # Supplier price at the time of the purchase, later price changes don't apply
+    price: Mapped[float]
+    created_at: Mapped[datetime] = mapped_column(default=func.now(), index=True)
+    row_version: Mapped[int] = row_version_column()
+
+
+make_append_only(Purchase.__table__)
+track_deletes(Purchase.__table__)
+
+# Deleted purchases, cascades included, are recounted out of the rolled up months
+refresh_purchase_rollups = DDL("""
+    CREATE OR REPLACE FUNCTION refresh_purchase_rollups() RETURNS trigger AS $$
+    BEGIN
+        WITH stale AS (
+            DELETE FROM purchase_monthly_rollups AS rollup
+            USING (
+                SELECT DISTINCT
+                    date_trunc('month', created_at) AS month, fuel_supplier_id
+                FROM deleted_purchases
+            ) AS deleted
+            WHERE rollup.month = deleted.month
+                AND rollup.fuel_supplier_id = deleted.fuel_supplier_id
+            RETURNING rollup.month, rollup.fuel_supplier_id, rollup.fuel_type
+        )
+        INSERT INTO purchase_monthly_rollups (
+            month, fuel_supplier_id, fuel_type,
+            purchases_count, total_amount, total_spend
+        )
+        SELECT
+            stale.month, stale.fuel_supplier_id, stale.fuel_type,
+            count(*), sum(purchases.amount), sum(purchases.amount * purchases.price)
+        FROM stale
+        JOIN purchases ON purchases.fuel_supplier_id = stale.fuel_supplier_id
+            AND purchases.created_at >= stale.month
+            AND purchases.created_at < stale.month + interval '1 month'
+        GROUP BY stale.month, stale.fuel_supplier_id, stale.fuel_type;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """)
+event.listen(Purchase.__table__, "after_create", refresh_purchase_rollups)
+event.listen(
+    Purchase.__table__,
+    "after_create",
+    DDL(
+        "CREATE TRIGGER purchases_refresh_rollups AFTER DELETE ON purchases "
+        "REFERENCING OLD TABLE AS deleted_purchases "
+        "FOR EACH STATEMENT EXECUTE FUNCTION refresh_purchase_rollups()"
+    ),
+)
+
+
+class FuelStorageLevel(Base):
+    __tablename__ = "fuel_storage_levels"
+    __table_args__ = (
+        Index(
+            "ix_fuel_storage_levels_fuel_storage_id_created_at",
+            "fuel_storage_id",
+            "created_at",
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    fuel_storage_id: Mapped[int] = mapped_column(
+        ForeignKey("fuel_storages.id", ondelete="CASCADE")
     )
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
     amount: Mapped[float]
     created_at: Mapped[datetime] = mapped_column(default=func.now())
+
+
+class PurchaseMonthlyRollup(Base):
+    __tablename__ = "purchase_monthly_rollups"
+    __table_args__ = (UniqueConstraint("month", "fuel_supplier_id"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    month: Mapped[datetime]
+    fuel_supplier_id: Mapped[int] = mapped_column(
+        ForeignKey("fuel_suppliers.id", ondelete="CASCADE")
+    )
+    fuel_type: Mapped[FuelTypes] = mapped_column(
+        Enum(
+            FuelTypes,
+            name="fueltypes",
+            create_constraint=True,
+            validate_strings=True,
+        )
+    )
+    purchases_count: Mapped[int]
+    total_amount: Mapped[float]
+    total_spend: Mapped[float]
@@ -1,14 +1,30 @@
 from datetime import datetime
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 
 from app.core.database import Base
+from app.models.db.data_version import row_version_column, track_deletes
 
 
 class Shift(Base):
     __tablename__ = "shifts"
+    # Nobody can be on two shifts at once and a vehicle can't be taken twice
+    __table_args__ = (
+        Index(
+            "uq_shifts_user_id_active",
+            "user_id",
+            unique=True,
+            postgresql_where=text("end_time IS NULL"),
+        ),
+        Index(
+            "uq_shifts_vehicle_id_active",
+            "vehicle_id",
+            unique=True,
+            postgresql_where=text("end_time IS NULL"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
@@ -17,3 +33,7 @@ class Shift(Base):
     )
     start_time: Mapped[datetime] = mapped_column(default=func.now())
     end_time: Mapped[datetime] = mapped_column(nullable=True)
+    row_version: Mapped[int] = row_version_column()
+
+
+track_deletes(Shift.__table__)
@@ -6,6 +6,7 @@ from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 
 from app.core.database import Base
+from app.models.db.data_version import row_version_column, track_deletes
 
 
 class UserRoles(enum.Enum):
@@ -32,6 +33,10 @@ class User(Base):
     password: Mapped[str]
     passport_number: Mapped[str] = mapped_column(String(32))
     registered_at: Mapped[datetime] = mapped_column(default=func.now())
+    row_version: Mapped[int] = row_version_column()
 
     def __repr__(self) -> str:
         return f'User "{self.first_name} {self.last_name}"'
+
+
+track_deletes(User.__table__)
@@ -1,11 +1,20 @@
 import enum
 from datetime import datetime
 
-from sqlalchemy import Enum, ForeignKey, String
+from sqlalchemy import BigInteger, Enum, ForeignKey, Index, Sequence, String, desc, text
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 
 from app.core.database import Base
+from app.models.db.data_version import (
+    make_append_only,
+    row_version_column,
+    track_deletes,
+)
+
+# Taken on every status change, while the vehicle row is locked, so the versions
+# of one vehicle grow in commit order. The status cache keeps the highest one.
+status_versions = Sequence("vehicle_status_versions", metadata=Base.metadata)
 
 
 class VehicleTypes(enum.Enum):
@@ -39,10 +48,40 @@ class Vehicle(Base):
     max_fuel_lvl: Mapped[float]
     current_lng: Mapped[float]
     current_lat: Mapped[float]
+    # Denormalized copy of the two latest rows from the statuses table
+    current_status: Mapped[VehicleStatuses] = mapped_column(
+        Enum(
+            VehicleStatuses,
+            name="vehiclestatuses",
+            create_constraint=True,
+            validate_strings=True,
+        ),
+        nullable=True,
+    )
+    previous_status: Mapped[VehicleStatuses] = mapped_column(
+        Enum(
+            VehicleStatuses,
+            name="vehiclestatuses",
+            create_constraint=True,
+            validate_strings=True,
+        ),
+        nullable=True,
+    )
+    status_version: Mapped[int] = mapped_column(
+        BigInteger, server_default=text("nextval('vehicle_status_versions')")
+    )
+    row_version: Mapped[int] = row_version_column()
+
+
+track_deletes(Vehicle.__table__)
 
 
 class Status(Base):
     __tablename__ = "statuses"
+    __table_args__ = (
+        # Serves per-vehicle history and the cascade delete of a vehicle's statuses
+        Index("ix_statuses_vehicle_id_created_at", "vehicle_id", desc("created_at")),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     vehicle_id: Mapped[int] = mapped_column(
@@ -57,10 +96,22 @@ class Status(Base):
         )
     )
     created_at: Mapped[datetime] = mapped_column(default=func.now())
+    row_version: Mapped[int] = row_version_column()
+
+
+make_append_only(Status.__table__)
+track_deletes(Status.__table__)
 
 
 class Inspection(Base):
     __tablename__ = "inspections"
+    __table_args__ = (
+        Index(
+            "ix_inspections_vehicle_id_active",
+            "vehicle_id",
+            postgresql_where=text("end_time IS NULL"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     vehicle_id: Mapped[int] = mapped_column(
@@ -71,3 +122,7 @@ class Inspection(Base):
     conclusion: Mapped[str] = mapped_column(nullable=True)
     start_time: Mapped[datetime] = mapped_column(default=func.now())
     end_time: Mapped[datetime] = mapped_column(nullable=True)
+    row_version: Mapped[int] = row_version_column()
+
+
+track_deletes(Inspection.__table__)
@@ -0,0 +1,20 @@
+from functools import lru_cache
+from typing import Any, Sequence, Type
+
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import Row
+
+
+@lru_cache
+def get_adapter(content_type: Any) -> TypeAdapter:
+    # Building an adapter compiles a validator and a serializer, so every type gets one for good
+    return TypeAdapter(content_type)
+
+
+def get_list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return get_adapter(list[schema])
+
+
+def validate_rows(schema: Type[BaseModel], rows: Sequence[Row]) -> list[BaseModel]:
+    # Row mappings validate faster than attribute lookups or keyword arguments
+    return get_list_adapter(schema).validate_python([row._mapping for row in rows])
@@ -0,0 +1,25 @@
+import enum
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ExportFormats(enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class ExportJobStatuses(enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class ExportJobData(BaseModel):
+    id: str
+    status: ExportJobStatuses
+    progress: float
+    created_at: datetime
+    error: Optional[str] = None
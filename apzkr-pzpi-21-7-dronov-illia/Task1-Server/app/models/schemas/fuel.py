@@ -1,6 +1,7 @@
+from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.models.db.fuel import FuelTypes
 
@@ -21,6 +22,11 @@ class SupplierUpdate(BaseModel):
     fuel_type: Optional[FuelTypes] = None
 
 
+class SupplierRankFilter(BaseModel):
+    storage_id: Optional[int] = None
+    fuel_type: Optional[FuelTypes] = None
+
+
 class StorageBase(BaseModel):
     max_amount: int
     critical_amount: float
@@ -39,6 +45,41 @@ class StorageUpdate(BaseModel):
     fuel_type: Optional[FuelTypes] = None
 
 
+class StorageBulkUpdate(StorageUpdate):
+    id: int
+
+
+class StorageBulkResult(BaseModel):
+    index: int
+    data: Optional[StorageData] = None
+    error: Optional[str] = None
+
+
+class StorageConsume(BaseModel):
+    amount: float = Field(gt=0)
+
+
+class StorageHistoryFilter(BaseModel):
+    date_from: datetime
+    date_to: Optional[datetime] = None
+    bucket: int = 60
+
+
+class StorageLevelBucket(BaseModel):
+    bucket: datetime
+    min_amount: float
+    avg_amount: float
+    max_amount: float
+
+
+class StorageForecast(BaseModel):
+    storage_id: int
+    current_amount: float
+    critical_amount: float
+    consumption_per_hour: Optional[float] = None
+    critical_at: Optional[datetime] = None
+
+
 class PurchaseBase(BaseModel):
     fuel_storage_id: int
     fuel_supplier_id: int
@@ -51,3 +92,33 @@ class PurchaseCreate(PurchaseBase):
 
 class PurchaseData(PurchaseBase):
     id: int
+
+
+class PurchaseBulkResult(BaseModel):
+    index: int
+    data: Optional[PurchaseData] = None
+    error: Optional[str] = None
+
+
+class PurchaseFilter(BaseModel):
+    fuel_storage_id: Optional[int] = None
+    fuel_supplier_id: Optional[int] = None
+    user_id: Optional[int] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+
+class SpendFilter(BaseModel):
+    fuel_supplier_id: Optional[int] = None
+    fuel_type: Optional[FuelTypes] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+
+class SpendData(BaseModel):
+    month: datetime
+    fuel_supplier_id: int
+    fuel_type: FuelTypes
+    purchases_count: int
+    total_amount: float
+    total_spend: float
@@ -0,0 +1,13 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class CriticalMessageBase(BaseModel):
+    storage_id: int
+    message: str
+
+
+class CriticalMessageData(CriticalMessageBase):
+    id: str
+    created_at: datetime
@@ -0,0 +1,15 @@
+from typing import Generic, TypeVar
+
+from fastapi import Query
+from fastapi_pagination.cursor import CursorPage as BaseCursorPage
+from fastapi_pagination.cursor import CursorParams as BaseCursorParams
+
+T = TypeVar("T")
+
+
+class CursorParams(BaseCursorParams):
+    size: int = Query(50, ge=1, le=500, description="Page size")
+
+
+class CursorPage(BaseCursorPage[T], Generic[T]):
+    __params_type__ = CursorParams
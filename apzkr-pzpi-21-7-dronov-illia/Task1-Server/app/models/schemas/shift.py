@@ -22,3 +22,10 @@ class ShiftCreate(ShiftBase):
 
 class ShiftUpdate(BaseModel):
     end_time: datetime
+
+
+class ShiftFilter(BaseModel):
+    vehicle_id: Optional[int] = None
+    user_id: Optional[int] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
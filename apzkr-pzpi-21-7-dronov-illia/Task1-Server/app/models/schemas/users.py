@@ -65,6 +65,16 @@ class UserData(UserBase):
     role: str
 
 
+class UserFilter(BaseModel):
+    role: Optional[UserRoles] = None
+
+
+class UserIdentity(BaseModel):
+    id: int
+    email: EmailStr
+    role: UserRoles
+
+
 class UserLoginInput(BaseModel):
     email: EmailStr
     password: str
@@ -22,6 +22,11 @@ class VehicleData(VehicleBase):
     current_status: Optional[str]
 
 
+class VehicleStatusData(BaseModel):
+    current_status: Optional[VehicleStatuses]
+    previous_status: Optional[VehicleStatuses]
+
+
 class SetStatus(BaseModel):
     status: VehicleStatuses
 
@@ -36,6 +41,11 @@ class VehicleUpdate(BaseModel):
     current_lat: Optional[Annotated[float, Ge(-90), Le(90)]] = None
 
 
+class VehicleFilter(BaseModel):
+    type: Optional[VehicleTypes] = None
+    status: Optional[VehicleStatuses] = None
+
+
 class InspectionBase(BaseModel):
     vehicle_id: int
     reason: str
@@ -53,3 +63,10 @@ class InspectionUpdate(BaseModel):
     conclusion: Optional[str] = None
     reason: Optional[str] = None
     end_time: Optional[datetime] = None
+
+
+class InspectionFilter(BaseModel):
+    vehicle_id: Optional[int] = None
+    user_id: Optional[int] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
@@ -1,12 +1,130 @@
-from itertools import chain
-from typing import Any, Iterable, Type
+import inspect
+from itertools import chain, groupby, islice
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    Type,
+    Union,
+)
 
+from fastapi import HTTPException, status
 from pydantic import BaseModel
-from sqlalchemy import delete, select, update
+from sqlalchemy import (
+    Row,
+    Table,
+    column,
+    delete,
+    event,
+    insert,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import ORMExecuteState, Session, UOWTransaction
 from sqlalchemy.sql import Select
 
+from app.config.logs.logger import logger
 from app.core.database import Base
+from app.models.db.data_version import DataVersion
+
+AfterCommit = Callable[[], Union[Awaitable[None], None]]
+
+BULK_CHUNK_SIZE: int = 1000
+# PostgreSQL doesn't accept more bind parameters in a single statement
+MAX_QUERY_PARAMETERS: int = 32767
+
+
+def chunked(items: Sequence[Any], size: int) -> Iterator[list[Any]]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def after_commit(async_session: AsyncSession, callback: AfterCommit) -> None:
+    async_session.info.setdefault("after_commit", []).append(callback)
+
+
+def _add_changed_table(session: Session, table: Table) -> None:
+    if table.name != DataVersion.__tablename__:
+        session.info.setdefault("changed_tables", set()).add(table.name)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed_tables(session: Session, flush_context: UOWTransaction) -> None:
+    for instance in chain(session.new, session.dirty, session.deleted):
+        _add_changed_table(session, instance.__table__)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_executed_tables(orm_execute_state: ORMExecuteState) -> None:
+    # Bulk statements bypass the flush
+    state = orm_execute_state
+    if state.is_insert or state.is_update or state.is_delete:
+        _add_changed_table(state.session, state.statement.table)
+
+
+class UnitOfWork:
+    """
+    Keeps every write made through a session in one transaction. Repositories only
+    flush, the outermost unit of work commits once and then runs the actions
+    registered with `after_commit`, so caches never see rolled back changes.
+    The data versions of the changed tables are bumped within the same commit.
+    """
+
+    def __init__(self, async_session: AsyncSession) -> None:
+        self.async_session = async_session
+
+    async def __aenter__(self) -> "UnitOfWork":
+        info: dict = self.async_session.info
+        info["unit_of_work_depth"] = info.get("unit_of_work_depth", 0) + 1
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        info: dict = self.async_session.info
+        info["unit_of_work_depth"] -= 1
+        # Nested units of work leave the decision to the outermost one
+        if info["unit_of_work_depth"]:
+            return
+
+        callbacks: list[AfterCommit] = info.pop("after_commit", [])
+        if exc_type:
+            info.pop("changed_tables", None)
+            await self.async_session.rollback()
+            return
+
+        # Pending objects have to be flushed to be counted as changes
+        await self.async_session.flush()
+        await self._bump_data_versions(info.pop("changed_tables", set()))
+        await self.async_session.commit()
+        for callback in callbacks:
+            # The data is committed already, a failed side effect can't undo it
+            try:
+                result = callback()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as error:
+                logger.error(f"After commit action has failed: {error}")
+
+    async def _bump_data_versions(self, tables: set[str]) -> None:
+        if not tables:
+            return
+
+        # Sorted rows lock the versions in the same order in every transaction
+        query = pg_insert(DataVersion).values(
+            [{"table_name": table, "version": 1} for table in sorted(tables)]
+        )
+        query = query.on_conflict_do_update(
+            index_elements=[DataVersion.table_name],
+            set_={"version": DataVersion.version + 1},
+        )
+        await self.async_session.execute(query)
 
 
 class BaseRepository:
@@ -15,6 +133,9 @@ class BaseRepository:
     def __init__(self, async_session: AsyncSession):
         self.async_session = async_session
 
+    def after_commit(self, callback: AfterCommit) -> None:
+        after_commit(self.async_session, callback)
+
     def unpack(self, collection: Iterable) -> list:
         return list(chain.from_iterable(collection))
 
@@ -22,7 +143,7 @@ class BaseRepository:
         new_instance = self.model(**model_data.model_dump(), **kwargs)
         self.async_session.add(new_instance)
 
-        await self.async_session.commit()
+        await self.async_session.flush()
         return new_instance
 
     async def exists(self, query: Select) -> bool:
@@ -41,12 +162,60 @@ class BaseRepository:
         result = response.unique().all()
         return result
 
+    def select_columns(self, schema: Type[BaseModel]) -> Select:
+        # Only the columns the schema is built from, loaded as plain rows
+        return select(*[getattr(self.model, name) for name in schema.model_fields])
+
+    def _paginate(self, query: Select, size: int, cursor: Optional[int]) -> Select:
+        # Keyset pagination over the primary key, newest rows first
+        if cursor is not None:
+            query = query.where(self.model.id < cursor)
+        return query.order_by(self.model.id.desc()).limit(size + 1)
+
+    def _split_page(
+        self, items: Sequence[Any], size: int
+    ) -> tuple[list[Any], Optional[int]]:
+        next_cursor: Optional[int] = items[size - 1].id if len(items) > size else None
+        return list(items[:size]), next_cursor
+
+    async def get_page(
+        self, query: Select, size: int, cursor: Optional[int] = None
+    ) -> tuple[list[Any], Optional[int]]:
+        items: list[Any] = self.unpack(
+            await self.get_many(self._paginate(query, size, cursor))
+        )
+        return self._split_page(items, size)
+
+    async def get_rows_page(
+        self, query: Select, size: int, cursor: Optional[int] = None
+    ) -> tuple[list[Row], Optional[int]]:
+        # Rows skip the identity map, the query should select the id column
+        response = await self.async_session.execute(self._paginate(query, size, cursor))
+        return self._split_page(response.all(), size)
+
     async def get_instance(self, query: Select) -> Base:
         response = await self.async_session.execute(query)
         result = response.unique().scalar_one_or_none()
         return result
 
-    async def update(self, instance_id: int, model_data: Type[BaseModel]) -> Type[Base]:
+    async def get_or_404(self, instance_id: int, for_update: bool = False) -> Base:
+        # One query instead of checking the existence and fetching the row separately
+        query = select(self.model).where(self.model.id == instance_id)
+        if for_update:
+            # Refresh an already loaded instance with the locked row
+            query = query.with_for_update().execution_options(populate_existing=True)
+
+        instance = await self.get_instance(query)
+        if not instance:
+            raise HTTPException(
+                status.HTTP_404_NOT_FOUND,
+                detail=f"{self.model.__name__} is not found",
+            )
+        return instance
+
+    async def update(
+        self, instance_id: int, model_data: Type[BaseModel]
+    ) -> Optional[Type[Base]]:
         query = (
             update(self.model)
             .where(self.model.id == instance_id)
@@ -60,24 +229,111 @@ class BaseRepository:
             .returning(self.model)
         )
         res = await self.async_session.execute(query)
-        await self.async_session.commit()
-        return res.unique().scalar_one()
+        return res.unique().scalar_one_or_none()
 
-    async def delete(self, instance_id: int) -> int:
+    async def delete(self, instance_id: int) -> Optional[int]:
         query = (
             delete(self.model)
             .where(self.model.id == instance_id)
             .returning(self.model.id)
         )
 
-        result = (await self.async_session.execute(query)).scalar_one()
-        await self.async_session.commit()
+        result = (await self.async_session.execute(query)).scalar_one_or_none()
         return result
 
+    async def insert_many(self, rows: Sequence[dict[str, Any]]) -> list[int]:
+        """
+        Inserts plain rows with multi-row INSERT ... VALUES statements, skipping
+        the ORM flush. Returned ids follow the order of the rows.
+        """
+        if not rows:
+            return []
+
+        table: Table = self.model.__table__
+        query = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+        response = await self.async_session.execute(query, list(rows))
+        return list(response.scalars())
+
+    async def upsert_many(
+        self,
+        rows: Sequence[dict[str, Any]],
+        index_elements: Sequence[str],
+        update_columns: Optional[Sequence[str]] = None,
+    ) -> list[int]:
+        """
+        INSERT ... ON CONFLICT DO UPDATE for every row, conflicting rows get
+        `update_columns` (every inserted column by default) from the new values.
+        One conflict target can't appear twice among the rows.
+        """
+        if not rows:
+            return []
+
+        table: Table = self.model.__table__
+        if update_columns is None:
+            update_columns = [key for key in rows[0] if key not in index_elements]
+
+        query = pg_insert(table)
+        set_: dict[str, Any] = {key: query.excluded[key] for key in update_columns}
+        # ON CONFLICT DO UPDATE skips the onupdate defaults, row versions included
+        for table_column in table.columns:
+            if table_column.onupdate is not None and table_column.name not in set_:
+                set_[table_column.name] = table_column.onupdate.arg
+
+        query = query.on_conflict_do_update(
+            index_elements=index_elements, set_=set_
+        ).returning(table.c.id, sort_by_parameter_order=True)
+        response = await self.async_session.execute(query, list(rows))
+        return list(response.scalars())
+
+    async def update_many(self, rows: Sequence[dict[str, Any]]) -> list[int]:
+        """
+        Applies per-row changes with UPDATE ... FROM (VALUES ...), every row has
+        to contain the id. Rows changing the same columns share a statement.
+        """
+        table: Table = self.model.__table__
+
+        def get_keys(row: dict[str, Any]) -> tuple[str, ...]:
+            return tuple(sorted(key for key in row if key != "id"))
+
+        updated_ids: list[int] = []
+        for keys, group in groupby(sorted(rows, key=get_keys), key=get_keys):
+            if not keys:
+                continue
+
+            names: tuple[str, ...] = ("id", *keys)
+            chunk_size: int = min(BULK_CHUNK_SIZE, MAX_QUERY_PARAMETERS // len(names))
+            for chunk in chunked(list(group), chunk_size):
+                data = values(
+                    *[column(name, table.c[name].type) for name in names], name="data"
+                ).data([tuple(row[name] for name in names) for row in chunk])
+                query = (
+                    update(table)
+                    .where(table.c.id == data.c.id)
+                    .values({key: data.c[key] for key in keys})
+                    .returning(table.c.id)
+                )
+                response = await self.async_session.execute(query)
+                updated_ids.extend(response.scalars())
+        return updated_ids
+
+    async def delete_many(self, instance_ids: Sequence[int]) -> list[int]:
+        # Smaller statements keep every lock set and parameter list bounded
+        deleted_ids: list[int] = []
+        for chunk in chunked(instance_ids, BULK_CHUNK_SIZE):
+            query = (
+                delete(self.model)
+                .where(self.model.id.in_(chunk))
+                .returning(self.model.id)
+                .execution_options(synchronize_session=False)
+            )
+            response = await self.async_session.execute(query)
+            deleted_ids.extend(response.scalars())
+        return deleted_ids
+
     async def save(self, obj: Any):
         self.async_session.add(obj)
-        await self.async_session.commit()
+        await self.async_session.flush()
 
     async def save_many(self, objects: list[Any]):
         self.async_session.add_all(objects)
-        await self.async_session.commit()
+        await self.async_session.flush()
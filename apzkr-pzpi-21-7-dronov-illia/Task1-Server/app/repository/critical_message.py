@@ -0,0 +1,74 @@
+from datetime import datetime
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from app.config.settings.base import settings
+from app.core.database import redis
+from app.models.schemas.message import CriticalMessageBase, CriticalMessageData
+
+
+class CriticalMessageRepository:
+    """Append-only store of critical messages kept in a Redis Stream"""
+
+    stream_name: str = "critical_messages"
+
+    def __init__(self, redis_client: Redis, max_length: int) -> None:
+        self.redis = redis_client
+        self.max_length = max_length
+
+    def _to_message(
+        self, message_id: str, fields: dict[str, str]
+    ) -> CriticalMessageData:
+        # Stream ids start with the millisecond timestamp of the entry
+        timestamp = int(message_id.split("-")[0])
+        return CriticalMessageData(
+            id=message_id,
+            storage_id=fields["storage_id"],
+            message=fields["message"],
+            created_at=datetime.utcfromtimestamp(timestamp / 1000),
+        )
+
+    async def add_message(self, data: CriticalMessageBase) -> CriticalMessageData:
+        message_id: str = await self.redis.xadd(
+            self.stream_name,
+            {"storage_id": data.storage_id, "message": data.message},
+            maxlen=self.max_length,
+            approximate=True,
+        )
+        return self._to_message(message_id, data.model_dump())
+
+    async def add_message_once(
+        self, data: CriticalMessageBase, cooldown: int
+    ) -> Optional[CriticalMessageData]:
+        # Only the first alert for a storage within the cooldown window gets through
+        is_first: bool = await self.redis.set(
+            f"{self.stream_name}:storage:{data.storage_id}", 1, nx=True, ex=cooldown
+        )
+        if not is_first:
+            return None
+
+        return await self.add_message(data)
+
+    async def get_messages(
+        self, size: int, cursor: Optional[str] = None
+    ) -> tuple[list[CriticalMessageData], Optional[str]]:
+        # Newest messages first, the cursor is the id of the last returned one
+        entries = await self.redis.xrevrange(
+            self.stream_name,
+            max=f"({cursor}" if cursor else "+",
+            min="-",
+            count=size + 1,
+        )
+        messages: list[CriticalMessageData] = [
+            self._to_message(message_id, fields) for message_id, fields in entries
+        ]
+        next_cursor: Optional[str] = (
+            messages[size - 1].id if len(messages) > size else None
+        )
+        return messages[:size], next_cursor
+
+
+critical_message_repository = CriticalMessageRepository(
+    redis, settings.CRITICAL_MESSAGES_MAX_LENGTH
+)
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from sqlalchemy import Row, func, select
+
+from app.models.db.fuel import FuelStorageLevel
+from app.repository.base import BaseRepository
+
+
+class FuelLevelRepository(BaseRepository):
+    model = FuelStorageLevel
+
+    async def add_levels(self, levels: list[dict[str, Any]]) -> None:
+        await self.insert_many(levels)
+
+    async def get_last_level_id(self) -> Optional[int]:
+        query = select(func.max(FuelStorageLevel.id))
+        return (await self.async_session.execute(query)).scalar_one()
+
+    async def get_levels_since(self, date_from: datetime) -> list[Row]:
+        query = select(
+            FuelStorageLevel.fuel_storage_id,
+            FuelStorageLevel.created_at,
+            FuelStorageLevel.amount,
+        ).where(FuelStorageLevel.created_at >= date_from)
+        return await self.get_many(query)
+
+    async def get_level_history(
+        self,
+        fuel_storage_id: int,
+        date_from: datetime,
+        date_to: datetime,
+        bucket: timedelta,
+    ) -> list[Row]:
+        # Buckets are aligned to date_from, so every bucket covers a full interval
+        bucket_start = func.date_bin(
+            bucket, FuelStorageLevel.created_at, date_from
+        ).label("bucket")
+        query = (
+            select(
+                bucket_start,
+                func.min(FuelStorageLevel.amount).label("min_amount"),
+                func.avg(FuelStorageLevel.amount).label("avg_amount"),
+                func.max(FuelStorageLevel.amount).label("max_amount"),
+            )
+            .where(
+                FuelStorageLevel.fuel_storage_id == fuel_storage_id,
+                FuelStorageLevel.created_at >= date_from,
+                FuelStorageLevel.created_at < date_to,
+            )
+            .group_by(bucket_start)
+            .order_by(bucket_start)
+        )
+        return await self.get_many(query)
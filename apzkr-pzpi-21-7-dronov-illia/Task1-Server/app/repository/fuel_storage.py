@@ -1,6 +1,6 @@
 from typing import Any, Optional
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 
 from app.models.db.fuel import FuelStorage
 from app.repository.base import BaseRepository
@@ -17,6 +17,19 @@ class FuelStorageRepository(BaseRepository):
         query = select(FuelStorage)
         return self.unpack(await self.get_many(query))
 
+    async def get_fuel_storages_by_ids(
+        self, fuel_storage_ids: set[int], for_update: bool = False
+    ) -> list[FuelStorage]:
+        # Locking in id order keeps concurrent bulk requests from deadlocking
+        query = (
+            select(FuelStorage)
+            .where(FuelStorage.id.in_(fuel_storage_ids))
+            .order_by(FuelStorage.id)
+        )
+        if for_update:
+            query = query.with_for_update()
+        return self.unpack(await self.get_many(query))
+
     async def create_fuel_storage(self, fuel_storage_data) -> dict[str, Any]:
         new_fuel_storage: FuelStorage = await self.create(fuel_storage_data)
         return new_fuel_storage
@@ -27,6 +40,25 @@ class FuelStorageRepository(BaseRepository):
         updated_fuel_storage = await self.update(fuel_storage_id, fuel_storage_data)
         return updated_fuel_storage
 
+    async def consume_fuel(
+        self, fuel_storage_id: int, amount: float
+    ) -> Optional[FuelStorage]:
+        # Draw relative to the stored level, so concurrent pumps don't overwrite each other
+        query = (
+            update(FuelStorage)
+            .where(
+                FuelStorage.id == fuel_storage_id,
+                FuelStorage.current_amount >= amount,
+            )
+            .values(current_amount=FuelStorage.current_amount - amount)
+            .returning(FuelStorage)
+            .execution_options(synchronize_session=False)
+        )
+        fuel_storage: Optional[FuelStorage] = (
+            await self.async_session.execute(query)
+        ).scalar_one_or_none()
+        return fuel_storage
+
     async def delete_fuel_storage(self, fuel_storage_id: int) -> Optional[int]:
         result = await self.delete(fuel_storage_id)
         return result
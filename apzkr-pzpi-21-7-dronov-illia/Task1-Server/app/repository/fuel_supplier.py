@@ -17,13 +17,19 @@ class FuelSupplierRepository(BaseRepository):
         query = select(FuelSupplier)
         return self.unpack(await self.get_many(query))
 
+    async def get_fuel_suppliers_by_ids(
+        self, fuel_supplier_ids: set[int]
+    ) -> list[FuelSupplier]:
+        query = select(FuelSupplier).where(FuelSupplier.id.in_(fuel_supplier_ids))
+        return self.unpack(await self.get_many(query))
+
     async def create_fuel_supplier(self, fuel_supplier_data) -> dict[str, Any]:
         new_fuel_supplier: FuelSupplier = await self.create(fuel_supplier_data)
         return new_fuel_supplier
 
     async def update_fuel_supplier(
         self, fuel_supplier_id: int, fuel_supplier_data
-    ) -> FuelSupplier:
+    ) -> Optional[FuelSupplier]:
         updated_fuel_supplier = await self.update(fuel_supplier_id, fuel_supplier_data)
         return updated_fuel_supplier
 
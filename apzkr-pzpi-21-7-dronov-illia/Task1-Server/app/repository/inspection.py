@@ -1,8 +1,9 @@
 from typing import Any, Optional
 
-from sqlalchemy import select
+from sqlalchemy import Row, select
 
 from app.models.db.vehicle import Inspection
+from app.models.schemas.vehicle import InspectionData, InspectionFilter
 from app.repository.base import BaseRepository
 
 
@@ -23,9 +24,20 @@ class InspectionRepository(BaseRepository):
         inspection = await self.get_current_inspection(vehicle_id)
         return bool(inspection)
 
-    async def get_inspections(self) -> list[Inspection]:
-        query = select(Inspection)
-        return self.unpack(await self.get_many(query))
+    async def get_inspections(
+        self, filters: InspectionFilter, size: int, cursor: Optional[int] = None
+    ) -> tuple[list[Row], Optional[int]]:
+        query = self.select_columns(InspectionData)
+        if filters.vehicle_id:
+            query = query.where(Inspection.vehicle_id == filters.vehicle_id)
+        if filters.user_id:
+            query = query.where(Inspection.user_id == filters.user_id)
+        if filters.date_from:
+            query = query.where(Inspection.start_time >= filters.date_from)
+        if filters.date_to:
+            query = query.where(Inspection.start_time <= filters.date_to)
+
+        return await self.get_rows_page(query, size, cursor)
 
     async def create_inspection(
         self, inspection_data, *args, **kwargs
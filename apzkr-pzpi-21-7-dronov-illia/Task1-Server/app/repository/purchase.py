@@ -1,8 +1,10 @@
-from typing import Any, Optional
+from datetime import datetime
+from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import Row, select, update
 
-from app.models.db.fuel import Purchase
+from app.models.db.fuel import FuelStorage, FuelSupplier, Purchase
+from app.models.schemas.fuel import PurchaseCreate, PurchaseData, PurchaseFilter
 from app.repository.base import BaseRepository
 
 
@@ -13,17 +15,64 @@ class PurchaseRepository(BaseRepository):
         query = select(Purchase).where(Purchase.id == purchase_id)
         return await self.get_instance(query)
 
-    async def get_purchases(self) -> list[Purchase]:
-        query = select(Purchase)
-        return self.unpack(await self.get_many(query))
+    async def get_purchases(
+        self, filters: PurchaseFilter, size: int, cursor: Optional[int] = None
+    ) -> tuple[list[Row], Optional[int]]:
+        query = self.select_columns(PurchaseData)
+        if filters.fuel_storage_id:
+            query = query.where(Purchase.fuel_storage_id == filters.fuel_storage_id)
+        if filters.fuel_supplier_id:
+            query = query.where(Purchase.fuel_supplier_id == filters.fuel_supplier_id)
+        if filters.user_id:
+            query = query.where(Purchase.user_id == filters.user_id)
+        if filters.date_from:
+            query = query.where(Purchase.created_at >= filters.date_from)
+        if filters.date_to:
+            query = query.where(Purchase.created_at <= filters.date_to)
 
-    async def create_purchase(self, purchase_data) -> dict[str, Any]:
-        new_purchase: Purchase = await self.create(purchase_data)
-        return new_purchase
+        return await self.get_rows_page(query, size, cursor)
 
-    async def update_purchase(self, purchase_id: int, purchase_data) -> Purchase:
-        updated_purchase = await self.update(purchase_id, purchase_data)
-        return updated_purchase
+    async def get_purchases_since(self, date_from: datetime) -> list[Row]:
+        query = select(
+            Purchase.fuel_storage_id, Purchase.created_at, Purchase.amount
+        ).where(Purchase.created_at >= date_from)
+        return await self.get_many(query)
+
+    async def create_purchase(
+        self, purchase_data: PurchaseCreate
+    ) -> Optional[tuple[Purchase, FuelStorage]]:
+        # The conditional update locks the storage row until commit, so concurrent
+        # purchases are re-checked against the fresh amount and can't overfill it
+        supplier_fuel_type = (
+            select(FuelSupplier.fuel_type)
+            .where(FuelSupplier.id == purchase_data.fuel_supplier_id)
+            .scalar_subquery()
+        )
+        query = (
+            update(FuelStorage)
+            .where(
+                FuelStorage.id == purchase_data.fuel_storage_id,
+                FuelStorage.fuel_type == supplier_fuel_type,
+                FuelStorage.current_amount + purchase_data.amount
+                <= FuelStorage.max_amount,
+            )
+            .values(current_amount=FuelStorage.current_amount + purchase_data.amount)
+            .returning(FuelStorage)
+            .execution_options(synchronize_session=False)
+        )
+        fuel_storage: Optional[FuelStorage] = (
+            await self.async_session.execute(query)
+        ).scalar_one_or_none()
+        if not fuel_storage:
+            return None
+
+        supplier_price = (
+            select(FuelSupplier.price)
+            .where(FuelSupplier.id == purchase_data.fuel_supplier_id)
+            .scalar_subquery()
+        )
+        new_purchase: Purchase = await self.create(purchase_data, price=supplier_price)
+        return new_purchase, fuel_storage
 
     async def delete_purchase(self, purchase_id: int) -> Optional[int]:
         result = await self.delete(purchase_id)
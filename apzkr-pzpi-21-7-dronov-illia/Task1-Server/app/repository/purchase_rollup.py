@@ -0,0 +1,87 @@
+from sqlalchemy import Row, func, literal_column, or_, select, union_all
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.db.fuel import FuelSupplier, Purchase, PurchaseMonthlyRollup
+from app.models.schemas.fuel import SpendFilter
+from app.repository.base import BaseRepository
+
+
+class PurchaseRollupRepository(BaseRepository):
+    model = PurchaseMonthlyRollup
+
+    def _aggregate_purchases(self):
+        month = func.date_trunc("month", Purchase.created_at).label("month")
+        return (
+            select(
+                month,
+                Purchase.fuel_supplier_id,
+                FuelSupplier.fuel_type,
+                func.count(Purchase.id).label("purchases_count"),
+                func.sum(Purchase.amount).label("total_amount"),
+                func.sum(Purchase.amount * Purchase.price).label("total_spend"),
+            )
+            .join(FuelSupplier, FuelSupplier.id == Purchase.fuel_supplier_id)
+            .group_by(month, Purchase.fuel_supplier_id, FuelSupplier.fuel_type)
+        )
+
+    async def rollup_closed_months(self) -> None:
+        """
+        Aggregates the closed months after the last rolled up one. The previous
+        month is aggregated again until the current one is over too, so purchases
+        committed after their month was rolled up still count. Deleted purchases
+        are recounted by the refresh_purchase_rollups trigger.
+        """
+        current_month = func.date_trunc("month", func.now())
+        one_month = literal_column("interval '1 month'")
+        last_month = select(func.max(PurchaseMonthlyRollup.month)).scalar_subquery()
+        closed_purchases = self._aggregate_purchases().where(
+            Purchase.created_at < current_month,
+            or_(
+                last_month.is_(None),
+                Purchase.created_at
+                >= func.least(last_month + one_month, current_month - one_month),
+            ),
+        )
+
+        columns: list[str] = [
+            "purchases_count",
+            "total_amount",
+            "total_spend",
+        ]
+        query = insert(PurchaseMonthlyRollup).from_select(
+            ["month", "fuel_supplier_id", "fuel_type", *columns], closed_purchases
+        )
+        query = query.on_conflict_do_update(
+            index_elements=["month", "fuel_supplier_id"],
+            set_={column: query.excluded[column] for column in columns},
+        )
+        await self.async_session.execute(query)
+
+    async def get_spend(self, filters: SpendFilter) -> list[Row]:
+        rolled_up = select(
+            PurchaseMonthlyRollup.month,
+            PurchaseMonthlyRollup.fuel_supplier_id,
+            PurchaseMonthlyRollup.fuel_type,
+            PurchaseMonthlyRollup.purchases_count,
+            PurchaseMonthlyRollup.total_amount,
+            PurchaseMonthlyRollup.total_spend,
+        )
+        current_month = self._aggregate_purchases().where(
+            Purchase.created_at >= func.date_trunc("month", func.now())
+        )
+        spend = union_all(rolled_up, current_month).subquery()
+
+        query = select(spend)
+        if filters.fuel_supplier_id:
+            query = query.where(spend.c.fuel_supplier_id == filters.fuel_supplier_id)
+        if filters.fuel_type:
+            query = query.where(spend.c.fuel_type == filters.fuel_type)
+        if filters.date_from:
+            query = query.where(
+                spend.c.month >= func.date_trunc("month", filters.date_from)
+            )
+        if filters.date_to:
+            query = query.where(spend.c.month <= filters.date_to)
+
+        query = query.order_by(spend.c.month, spend.c.fuel_supplier_id)
+        return await self.get_many(query)
@@ -1,8 +1,9 @@
-from typing import Any
+from typing import Any, Optional
 
-from sqlalchemy import select
+from sqlalchemy import Row, select
 
 from app.models.db.shift import Shift
+from app.models.schemas.shift import ShiftData, ShiftFilter
 from app.repository.base import BaseRepository
 
 
@@ -19,9 +20,20 @@ class ShiftRepository(BaseRepository):
         )
         return await self.get_instance(query)
 
-    async def get_shifts(self) -> list[Shift]:
-        query = select(Shift)
-        return self.unpack(await self.get_many(query))
+    async def get_shifts(
+        self, filters: ShiftFilter, size: int, cursor: Optional[int] = None
+    ) -> tuple[list[Row], Optional[int]]:
+        query = self.select_columns(ShiftData)
+        if filters.vehicle_id:
+            query = query.where(Shift.vehicle_id == filters.vehicle_id)
+        if filters.user_id:
+            query = query.where(Shift.user_id == filters.user_id)
+        if filters.date_from:
+            query = query.where(Shift.start_time >= filters.date_from)
+        if filters.date_to:
+            query = query.where(Shift.start_time <= filters.date_to)
+
+        return await self.get_rows_page(query, size, cursor)
 
     async def create_shift(self, shift_data) -> dict[str, Any]:
         new_shift: Shift = await self.create(shift_data)
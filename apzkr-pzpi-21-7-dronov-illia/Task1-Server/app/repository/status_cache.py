@@ -0,0 +1,94 @@
+from typing import Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.config.logs.logger import logger
+from app.config.settings.base import settings
+from app.core.database import redis
+from app.models.db.vehicle import VehicleStatuses
+
+# Higher than any status version, a deleted vehicle can't be cached again
+DELETED_VERSION: int = 2**63 - 1
+
+# Writes land after their commits in any order and a fill can read the row before
+# a newer write commits, so only a higher status version replaces the cached one
+SET_IF_NEWER: str = """
+local cached = redis.call('HGET', KEYS[1], 'version')
+if cached and tonumber(cached) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'version', ARGV[1], 'current', ARGV[2], 'previous', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+
+class StatusCache:
+    """
+    Redis hash per vehicle holding its current and previous status along with the
+    status version they were read at. Write paths check the vehicle row, the cache
+    only serves reads.
+    """
+
+    def __init__(self, redis_client: Redis, ttl: int) -> None:
+        self.redis = redis_client
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._set_if_newer = redis_client.register_script(SET_IF_NEWER)
+
+    def _get_key(self, vehicle_id: int) -> str:
+        return f"vehicle:{vehicle_id}:status"
+
+    async def get(self, vehicle_id: int) -> Optional[dict[str, VehicleStatuses]]:
+        """Cached statuses, the version of a deleted vehicle is DELETED_VERSION"""
+        try:
+            data: dict[str, str] = await self.redis.hgetall(self._get_key(vehicle_id))
+        except RedisError as error:
+            logger.warning(f"Status cache is unavailable: {error}")
+            data = {}
+
+        if not data:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return {
+            "current": VehicleStatuses[data["current"]] if data["current"] else None,
+            "previous": VehicleStatuses[data["previous"]] if data["previous"] else None,
+            "version": int(data["version"]),
+        }
+
+    async def set(
+        self,
+        vehicle_id: int,
+        current: Optional[VehicleStatuses],
+        previous: Optional[VehicleStatuses],
+        version: int,
+    ) -> bool:
+        try:
+            return bool(
+                await self._set_if_newer(
+                    keys=[self._get_key(vehicle_id)],
+                    args=[
+                        version,
+                        current.name if current else "",
+                        previous.name if previous else "",
+                        self.ttl,
+                    ],
+                )
+            )
+        except RedisError as error:
+            logger.warning(f"Status cache is unavailable: {error}")
+            return False
+
+    async def delete(self, vehicle_id: int) -> None:
+        # A tombstone instead of removing the key, a late fill can't bring it back
+        await self.set(vehicle_id, None, None, DELETED_VERSION)
+
+    def get_stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+status_cache = StatusCache(redis, settings.STATUS_CACHE_TTL)
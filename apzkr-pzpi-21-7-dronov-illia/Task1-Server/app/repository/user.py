@@ -1,23 +1,60 @@
+import asyncio
+import hashlib
+import os
+import tempfile
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Sequence
 
 import xlsxwriter
 from pydantic import EmailStr
-from sqlalchemy import inspect, select
+from sqlalchemy import Column, Row, Table, literal_column, select
+from xlsxwriter.worksheet import Worksheet
 
-from app.models.db.user import User
+from app.models.db.data_version import DataVersion, DeletedRow
 from app.models.db.fuel import FuelStorage, FuelSupplier, Purchase
 from app.models.db.shift import Shift
-from app.models.db.vehicle import Vehicle, Status, Inspection
+from app.models.db.user import User
+from app.models.db.vehicle import Inspection, Status, Vehicle
+from app.models.schemas.users import UserData, UserFilter
 from app.repository.base import BaseRepository
 
+EXPORT_MODELS: list = [
+    User,
+    FuelStorage,
+    FuelSupplier,
+    Purchase,
+    Shift,
+    Vehicle,
+    Status,
+    Inspection,
+]
+# Tombstones are streamed like the tables, so incremental exports can apply deletes
+EXPORT_TABLES: dict[str, Table] = {
+    model.__tablename__: model.__table__ for model in [*EXPORT_MODELS, DeletedRow]
+}
+# Columns that never leave the database, whatever the format
+EXPORT_HIDDEN_COLUMNS: dict[str, set[str]] = {User.__tablename__: {"password"}}
+EXPORT_BATCH_SIZE: int = 1000
+# Rows an XLSX worksheet can hold, the header included
+XLSX_MAX_ROWS: int = 1048576
+
+
+def get_export_columns(table: Table) -> list[Column]:
+    hidden_columns: set[str] = EXPORT_HIDDEN_COLUMNS.get(table.name, set())
+    return [column for column in table.columns if column.name not in hidden_columns]
+
 
 class UserRepository(BaseRepository):
     model = User
 
-    async def get_users(self) -> list[User]:
-        query = select(User)
-        return self.unpack(await self.get_many(query))
+    async def get_users(
+        self, filters: UserFilter, size: int, cursor: Optional[int] = None
+    ) -> tuple[list[Row], Optional[int]]:
+        query = self.select_columns(UserData)
+        if filters.role:
+            query = query.where(User.role == filters.role)
+
+        return await self.get_rows_page(query, size, cursor)
 
     async def create_user(self, user_data) -> Dict[str, Any]:
         new_user: User = await self.create(user_data)
@@ -28,6 +65,17 @@ class UserRepository(BaseRepository):
         result: Optional[User] = await self.get_instance(query)
         return result
 
+    async def get_identity(
+        self, user_id: Optional[int] = None, email: Optional[EmailStr] = None
+    ) -> Optional[Row]:
+        query = select(User.id, User.email, User.role)
+        if user_id is not None:
+            query = query.where(User.id == user_id)
+        else:
+            query = query.where(User.email == email)
+
+        return (await self.async_session.execute(query)).first()
+
     async def get_user_by_email(self, email: EmailStr) -> Optional[User]:
         query = select(User).where(User.email == email)
         result: Optional[User] = await self.get_instance(query)
@@ -42,7 +90,7 @@ class UserRepository(BaseRepository):
         query = select(User).where(User.email == email)
         return await self.exists(query)
 
-    async def update_user(self, user_id: int, user_data) -> User:
+    async def update_user(self, user_id: int, user_data) -> Optional[User]:
         updated_user = await self.update(user_id, user_data)
         return updated_user
 
@@ -50,46 +98,112 @@ class UserRepository(BaseRepository):
         result = await self.delete(user_id)
         return result
 
-    async def export_data_xlsx(self):
-        models: list = [
-            User,
-            FuelStorage,
-            FuelSupplier,
-            Purchase,
-            Shift,
-            Vehicle,
-            Status,
-            Inspection,
-        ]
-        workbook = xlsxwriter.Workbook(Path("export.xlsx").absolute())
-
-        for model in models:
-            worksheet = workbook.add_worksheet(model.__name__)
-
-            # Get all model rows
-            query = select(model)
-            data = self.unpack(await self.get_many(query))
-
-            # Get table columns' names
-            inspector = inspect(model.__table__)
-            column_names = [column.name for column in inspector.columns]
-
-            # Fill up the columns
-            bold_format = workbook.add_format({"bold": True})
-            column = 0
-            for item in column_names:
-                worksheet.write(0, column, item, bold_format)
-
-                column += 1
-            row = 1
-
-            # Fill up the rows
-            for data_row in data:
-                column = 0
-                for column_name in column_names:
-                    worksheet.write(row, column, str(getattr(data_row, column_name)))
-                    column += 1
-                row += 1
-
-        workbook.close()
-        return Path("export.xlsx").absolute()
+    def _write_xlsx_rows(
+        self, worksheet: Worksheet, first_row: int, rows: list[Sequence[Any]]
+    ) -> None:
+        for row, data_row in enumerate(rows, start=first_row):
+            for column, value in enumerate(data_row):
+                # xlsxwriter doesn't raise on cells out of the sheet, it skips them
+                if worksheet.write(row, column, str(value)) == -1:
+                    raise ValueError(
+                        f"Row {row} doesn't fit into the {worksheet.name} worksheet"
+                    )
+
+    def _add_xlsx_worksheet(
+        self, workbook: xlsxwriter.Workbook, name: str, table: Table, header_format
+    ) -> Worksheet:
+        worksheet = workbook.add_worksheet(name)
+        for column, table_column in enumerate(get_export_columns(table)):
+            worksheet.write(0, column, table_column.name, header_format)
+        return worksheet
+
+    async def get_export_fingerprint(self) -> str:
+        # Every commit that changes a table bumps its version, see UnitOfWork
+        query = (
+            select(DataVersion.table_name, DataVersion.version)
+            .where(DataVersion.table_name.in_(EXPORT_TABLES))
+            .order_by(DataVersion.table_name)
+        )
+        response = await self.async_session.execute(query)
+        return hashlib.sha1(str(response.all()).encode()).hexdigest()
+
+    async def export_data_xlsx(
+        self, on_progress: Optional[Callable[[float], None]] = None
+    ) -> Path:
+        # Every export gets its own file, the caller is responsible for removing it
+        file_descriptor, file_name = tempfile.mkstemp(prefix="export-", suffix=".xlsx")
+        os.close(file_descriptor)
+
+        # constant_memory flushes every row to disk as soon as the next one starts
+        workbook = xlsxwriter.Workbook(file_name, {"constant_memory": True})
+        bold_format = workbook.add_format({"bold": True})
+        try:
+            for index, model in enumerate(EXPORT_MODELS, start=1):
+                table: Table = model.__table__
+                worksheet = self._add_xlsx_worksheet(
+                    workbook, model.__name__, table, bold_format
+                )
+
+                # Fetch plain rows through a server-side cursor, batch by batch
+                query = select(*get_export_columns(table)).execution_options(
+                    yield_per=EXPORT_BATCH_SIZE
+                )
+                result = await self.async_session.stream(query)
+
+                row, sheet_number = 1, 1
+                async for rows in result.partitions():
+                    while rows:
+                        # Tables longer than a worksheet continue on Status_2, ...
+                        if row == XLSX_MAX_ROWS:
+                            sheet_number += 1
+                            worksheet = self._add_xlsx_worksheet(
+                                workbook,
+                                f"{model.__name__}_{sheet_number}",
+                                table,
+                                bold_format,
+                            )
+                            row = 1
+
+                        fitting_rows = rows[: XLSX_MAX_ROWS - row]
+                        await asyncio.to_thread(
+                            self._write_xlsx_rows, worksheet, row, fitting_rows
+                        )
+                        row += len(fitting_rows)
+                        rows = rows[len(fitting_rows) :]
+
+                if on_progress:
+                    on_progress(index / len(EXPORT_MODELS))
+
+            await asyncio.to_thread(workbook.close)
+        except BaseException:
+            os.remove(file_name)
+            raise
+
+        return Path(file_name)
+
+    async def get_export_watermark(self) -> int:
+        """
+        Oldest transaction still running when the export starts. Every row version
+        below it is committed or rolled back for good, rows at or above it may still
+        be joined by slower transactions, so the next export starts from it again.
+        """
+        query = select(
+            literal_column("pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+        )
+        return (await self.async_session.execute(query)).scalar_one()
+
+    async def stream_table(
+        self, table: Table, since: Optional[int] = None
+    ) -> AsyncIterator[Sequence[Row]]:
+        # Rows are versioned by the writing transaction, see get_export_watermark
+        query = (
+            select(*get_export_columns(table))
+            .order_by(table.c.row_version, table.c.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        if since is not None:
+            query = query.where(table.c.row_version >= since)
+
+        result = await self.async_session.stream(query)
+        async for rows in result.partitions():
+            yield rows
@@ -1,10 +1,11 @@
-from typing import Any, Optional
+from typing import Any, Optional, Union
 
-from sqlalchemy import select
+from sqlalchemy import ColumnElement, Row, select, update
 
-from app.models.db.vehicle import Status, Vehicle, VehicleStatuses
-from app.models.schemas.vehicle import SetStatus
+from app.models.db.vehicle import Status, Vehicle, VehicleStatuses, status_versions
+from app.models.schemas.vehicle import SetStatus, VehicleData, VehicleFilter
 from app.repository.base import BaseRepository
+from app.repository.status_cache import DELETED_VERSION, status_cache
 
 
 class VehicleRepository(BaseRepository):
@@ -14,45 +15,110 @@ class VehicleRepository(BaseRepository):
         query = select(Vehicle).where(Vehicle.id == vehicle_id)
         return await self.get_instance(query)
 
-    async def get_vehicles(self) -> list[Vehicle]:
-        query = select(Vehicle)
-        return self.unpack(await self.get_many(query))
+    async def get_vehicles(
+        self, filters: VehicleFilter, size: int, cursor: Optional[int] = None
+    ) -> tuple[list[Row], Optional[int]]:
+        query = self.select_columns(VehicleData)
+        if filters.type:
+            query = query.where(Vehicle.type == filters.type)
+        if filters.status:
+            query = query.where(Vehicle.current_status == filters.status)
 
-    async def get_recent_status(self, vehicle_id: int) -> VehicleStatuses:
-        query = (
-            select(Status.status)
-            .where(Status.vehicle_id == vehicle_id)
-            .order_by(Status.created_at.desc())
-            .limit(2)
-        )
-        statuses: list[VehicleStatuses] = self.unpack(await self.get_many(query))
-        return statuses[1]
+        return await self.get_rows_page(query, size, cursor)
+
+    async def get_statuses(
+        self, vehicle_id: int
+    ) -> Optional[dict[str, VehicleStatuses]]:
+        # Only for reads, the cached statuses can lag behind the row
+        statuses = await status_cache.get(vehicle_id)
+        if statuses is not None:
+            return statuses if statuses["version"] != DELETED_VERSION else None
+
+        # Fall back to the vehicle row and warm up the cache
+        query = select(
+            Vehicle.current_status, Vehicle.previous_status, Vehicle.status_version
+        ).where(Vehicle.id == vehicle_id)
+        row = (await self.async_session.execute(query)).first()
+        if not row:
+            return None
+
+        # The cache keeps a newer write that has landed since the row was read
+        await status_cache.set(vehicle_id, *row)
+        return {"current": row[0], "previous": row[1], "version": row[2]}
 
     async def get_current_status(self, vehicle_id: int) -> VehicleStatuses:
+        statuses = await self.get_statuses(vehicle_id)
+        return statuses["current"] if statuses else None
+
+    async def update_current_status(
+        self,
+        vehicle_id: int,
+        status: VehicleStatuses,
+        expected_status: Optional[VehicleStatuses] = None,
+    ) -> Optional[tuple[VehicleStatuses, Optional[VehicleStatuses]]]:
+        return await self._shift_statuses(vehicle_id, status, expected_status)
+
+    async def restore_previous_status(
+        self, vehicle_id: int, expected_status: VehicleStatuses
+    ) -> Optional[tuple[VehicleStatuses, Optional[VehicleStatuses]]]:
+        # The previous status comes from the row, a cached copy could be outdated
+        return await self._shift_statuses(
+            vehicle_id, Vehicle.previous_status, expected_status
+        )
+
+    async def _shift_statuses(
+        self,
+        vehicle_id: int,
+        status: Union[VehicleStatuses, ColumnElement],
+        expected_status: Optional[VehicleStatuses] = None,
+    ) -> Optional[tuple[VehicleStatuses, Optional[VehicleStatuses]]]:
+        # Shift the denormalized statuses and add the history row
+        query = update(Vehicle).where(Vehicle.id == vehicle_id)
+        if expected_status:
+            query = query.where(Vehicle.current_status == expected_status)
         query = (
-            select(Status.status)
-            .where(Status.vehicle_id == vehicle_id)
-            .order_by(Status.created_at.desc())
-            .limit(1)
+            query.values(
+                previous_status=Vehicle.current_status,
+                current_status=status,
+                status_version=status_versions.next_value(),
+            )
+            .returning(
+                Vehicle.current_status, Vehicle.previous_status, Vehicle.status_version
+            )
+            .execution_options(synchronize_session=False)
         )
-        return await self.get_instance(query)
+        statuses = (await self.async_session.execute(query)).first()
+        if not statuses:
+            return None
+
+        current, previous, version = statuses
+        new_status = Status(vehicle_id=vehicle_id, status=current)
+        self.async_session.add(new_status)
+
+        self.after_commit(
+            lambda: status_cache.set(vehicle_id, current, previous, version)
+        )
+        return current, previous
 
     async def set_current_status(
         self, vehicle_id: int, status: VehicleStatuses
     ) -> None:
-        new_status = Status(vehicle_id=vehicle_id, status=status)
-        self.async_session.add(new_status)
-        await self.async_session.commit()
+        await self.update_current_status(vehicle_id, status)
 
     async def create_vehicle(self, vehicle_data) -> dict[str, Any]:
-        new_vehicle: Vehicle = await self.create(vehicle_data)
-        await self.set_current_status(new_vehicle.id, VehicleStatuses.OFF_SHIFT)
+        new_vehicle: Vehicle = await self.create(
+            vehicle_data, current_status=VehicleStatuses.OFF_SHIFT
+        )
+        await self.save(
+            Status(vehicle_id=new_vehicle.id, status=new_vehicle.current_status)
+        )
         return new_vehicle
 
-    async def update_vehicle(self, vehicle_id: int, vehicle_data) -> Vehicle:
+    async def update_vehicle(self, vehicle_id: int, vehicle_data) -> Optional[Vehicle]:
         updated_shift = await self.update(vehicle_id, vehicle_data)
         return updated_shift
 
-    async def delete_vehicle(self, user_id: int) -> Optional[int]:
-        result = await self.delete(user_id)
+    async def delete_vehicle(self, vehicle_id: int) -> Optional[int]:
+        result = await self.delete(vehicle_id)
+        self.after_commit(lambda: status_cache.delete(vehicle_id))
         return result
@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, Optional
 
@@ -15,6 +17,11 @@ class AuthHandler:
         self.security = HTTPBearer()
         self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
         self.secret: str = settings.JWT_SECRET
+        # bcrypt is CPU bound, so it runs on a bounded pool outside the event loop
+        self.hashing_executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASHING_WORKERS,
+            thread_name_prefix="password-hashing",
+        )
 
     def get_password_hash(self, password: str) -> str:
         return self.pwd_context.hash(password)
@@ -22,6 +29,20 @@ class AuthHandler:
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         return self.pwd_context.verify(plain_password, hashed_password, scheme="bcrypt")
 
+    async def get_password_hash_async(self, password: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.hashing_executor, self.get_password_hash, password
+        )
+
+    async def verify_password_async(
+        self, plain_password: str, hashed_password: str
+    ) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.hashing_executor, self.verify_password, plain_password, hashed_password
+        )
+
     def encode_token(self, user_id: int, user_email: str) -> str:
         # Initialize user_crud object to get user id once and put it in jwt payload
 
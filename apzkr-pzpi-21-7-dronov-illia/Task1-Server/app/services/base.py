@@ -1,24 +1,83 @@
-from typing import Optional
+from functools import wraps
+from typing import Any, Awaitable, Callable, Optional, TypeVar, Union
 
 from fastapi import HTTPException, status
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config.logs.logger import logger
-from app.models.db.user import UserRoles
-from app.repository.base import BaseRepository
-from app.repository.user import UserRepository
+from app.models.db.user import User, UserRoles
+from app.models.schemas.pagination import CursorPage, CursorParams
+from app.models.schemas.users import UserIdentity
+from app.repository.base import (
+    AfterCommit,
+    BaseRepository,
+    UnitOfWork,
+    after_commit,
+)
 from app.utilities.formatters.http_error import error_wrapper
 
+ResultType = TypeVar("ResultType")
+
+
+def transactional(
+    method: Callable[..., Awaitable[ResultType]],
+) -> Callable[..., Awaitable[ResultType]]:
+    """Runs the service method in one unit of work, committed once when it returns"""
+
+    @wraps(method)
+    async def wrapper(self: "BaseService", *args, **kwargs) -> ResultType:
+        async with UnitOfWork(self._get_session()):
+            return await method(self, *args, **kwargs)
+
+    return wrapper
+
 
 class BaseService:
-    async def _validate_instance_exists(
-        self, repository: BaseRepository, instance_id: int
-    ) -> None:
-        if not await repository.exists_by_id(instance_id):
+    def _get_session(self) -> AsyncSession:
+        # Repositories of a service are all built on the same request session
+        for value in vars(self).values():
+            if isinstance(value, BaseRepository):
+                return value.async_session
+        raise RuntimeError(f"{type(self).__name__} has no database repositories")
+
+    def _after_commit(self, callback: AfterCommit) -> None:
+        after_commit(self._get_session(), callback)
+
+    def _validate_instance_found(
+        self, repository: BaseRepository, result: Optional[ResultType]
+    ) -> ResultType:
+        # Writes only match an existing row, so a missing one needs no query of its own
+        if result is None:
             raise HTTPException(
                 status.HTTP_404_NOT_FOUND,
                 detail=f"{repository.model.__name__} is not found",
             )
+        return result
+
+    def _get_cursor(self, params: CursorParams) -> Optional[int]:
+        if not params.cursor:
+            return None
+
+        try:
+            # Characters outside of base64 are dropped while decoding,
+            # so garbage can decode to an empty cursor
+            cursor: Optional[str] = params.to_raw_params().cursor
+            if not cursor:
+                raise ValueError("Empty cursor")
+            return int(cursor)
+        except ValueError:
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                detail=error_wrapper("Invalid cursor", "cursor"),
+            )
+
+    def _create_page(
+        self, items: list[Any], params: CursorParams, next_cursor: Optional[int]
+    ) -> CursorPage:
+        return CursorPage.create(
+            items, params, next_=str(next_cursor) if next_cursor else None
+        )
 
     def _validate_update_data(self, update_data: BaseModel) -> None:
         new_fields: dict = update_data.model_dump(exclude_none=True)
@@ -31,13 +90,12 @@ class BaseService:
                 ),
             )
 
-    async def _validate_user_permissions(
+    def _validate_user_permissions(
         self,
-        user_repository: UserRepository,
-        user_id: int,
+        current_user: Union[User, UserIdentity],
         role: Optional[UserRoles] = UserRoles.ADMIN,
         raise_exception: bool = True,
     ) -> None:
-        user = await user_repository.get_user_by_id(user_id)
-        if user.role != role and raise_exception:
+        # The user is already resolved by the auth dependency, no need to reload it
+        if current_user.role != role and raise_exception:
             raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Forbidden")
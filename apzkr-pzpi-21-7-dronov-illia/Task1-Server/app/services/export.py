@@ -0,0 +1,169 @@
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from uuid import uuid4
+
+from fastapi import HTTPException, status
+from sqlalchemy import Table
+
+from app.config.logs.logger import logger
+from app.core.database import async_session_maker
+from app.models.schemas.export import ExportFormats, ExportJobData, ExportJobStatuses
+from app.models.schemas.users import UserIdentity
+from app.repository.user import EXPORT_TABLES, UserRepository, get_export_columns
+from app.services.base import BaseService
+from app.utilities.formatters.export import rows_to_csv, rows_to_ndjson
+
+EXPORT_WATERMARK_HEADER: str = "X-Export-Watermark"
+
+
+@dataclass(slots=True)
+class ExportJob:
+    id: str
+    fingerprint: str
+    status: ExportJobStatuses = ExportJobStatuses.PENDING
+    progress: float = 0
+    file_path: Optional[Path] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+
+class ExportJobManager:
+    """Runs XLSX exports in the background and keeps the latest artifact"""
+
+    def __init__(self) -> None:
+        self.jobs: dict[str, ExportJob] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def get_job(self, job_id: str) -> Optional[ExportJob]:
+        return self.jobs.get(job_id)
+
+    def start_job(self, fingerprint: str) -> ExportJob:
+        # Reuse a running job or a finished artifact built from the same data
+        for job in self.jobs.values():
+            if job.fingerprint != fingerprint:
+                continue
+            if job.status in (ExportJobStatuses.PENDING, ExportJobStatuses.RUNNING):
+                return job
+            if job.status == ExportJobStatuses.DONE and job.file_path.exists():
+                return job
+
+        job = ExportJob(id=uuid4().hex, fingerprint=fingerprint)
+        self.jobs[job.id] = job
+
+        # Keep a reference to the task so it isn't garbage collected mid-run
+        task = asyncio.create_task(self._run_job(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run_job(self, job: ExportJob) -> None:
+        job.status = ExportJobStatuses.RUNNING
+
+        def set_progress(progress: float) -> None:
+            job.progress = progress
+
+        try:
+            # The request session is closed by now, so the job opens its own
+            async with async_session_maker() as session:
+                job.file_path = await UserRepository(session).export_data_xlsx(
+                    set_progress
+                )
+        except Exception as error:
+            logger.error(f"Export job {job.id} has failed: {error}")
+            job.status = ExportJobStatuses.FAILED
+            job.error = str(error)
+            return
+
+        job.status = ExportJobStatuses.DONE
+        self._drop_outdated_jobs(job)
+
+    def _drop_outdated_jobs(self, latest_job: ExportJob) -> None:
+        for job in list(self.jobs.values()):
+            if job is latest_job or job.status in (
+                ExportJobStatuses.PENDING,
+                ExportJobStatuses.RUNNING,
+            ):
+                continue
+
+            if job.file_path:
+                job.file_path.unlink(missing_ok=True)
+            del self.jobs[job.id]
+
+
+export_job_manager = ExportJobManager()
+
+
+class ExportService(BaseService):
+    def __init__(self, user_repository) -> None:
+        self.user_repository: UserRepository = user_repository
+
+    def _get_job(self, job_id: str) -> ExportJob:
+        job: Optional[ExportJob] = export_job_manager.get_job(job_id)
+        if not job:
+            raise HTTPException(
+                status.HTTP_404_NOT_FOUND, detail="Export job is not found"
+            )
+        return job
+
+    async def start_export(self, current_user: UserIdentity) -> ExportJobData:
+        self._validate_user_permissions(current_user)
+
+        fingerprint: str = await self.user_repository.get_export_fingerprint()
+        job: ExportJob = export_job_manager.start_job(fingerprint)
+        return ExportJobData.model_validate(job, from_attributes=True)
+
+    async def get_export(
+        self, job_id: str, current_user: UserIdentity
+    ) -> ExportJobData:
+        self._validate_user_permissions(current_user)
+
+        job: ExportJob = self._get_job(job_id)
+        return ExportJobData.model_validate(job, from_attributes=True)
+
+    async def get_export_file(self, job_id: str, current_user: UserIdentity) -> Path:
+        self._validate_user_permissions(current_user)
+
+        job: ExportJob = self._get_job(job_id)
+        if job.status != ExportJobStatuses.DONE:
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST, "The export is not finished yet"
+            )
+        if not job.file_path.exists():
+            raise HTTPException(
+                status.HTTP_404_NOT_FOUND, detail="Export file is not found"
+            )
+        return job.file_path
+
+    async def _stream_table(
+        self, table: Table, export_format: ExportFormats, since: Optional[int]
+    ) -> AsyncIterator[str]:
+        column_names: list[str] = [column.name for column in get_export_columns(table)]
+        if export_format == ExportFormats.CSV:
+            yield rows_to_csv([column_names])
+
+        async for rows in self.user_repository.stream_table(table, since):
+            if export_format == ExportFormats.CSV:
+                yield rows_to_csv(rows)
+            else:
+                yield rows_to_ndjson(column_names, rows)
+
+    async def get_table_stream(
+        self,
+        table_name: str,
+        export_format: ExportFormats,
+        since: Optional[int],
+        current_user: UserIdentity,
+    ) -> tuple[int, AsyncIterator[str]]:
+        # Validate everything before the response starts streaming
+        self._validate_user_permissions(current_user)
+
+        table: Optional[Table] = EXPORT_TABLES.get(table_name)
+        if table is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Table is not found")
+
+        # Taken before the rows are read, an older watermark only resends more rows
+        watermark: int = await self.user_repository.get_export_watermark()
+        return watermark, self._stream_table(table, export_format, since)
@@ -1,26 +1,57 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import numpy as np
 from fastapi import HTTPException, status
 from sqlalchemy.exc import IntegrityError
 
-from app.models.db.fuel import FuelStorage, FuelSupplier, Purchase
-from app.models.db.user import User
+from app.config.logs.logger import logger
+from app.config.settings.base import settings
+from app.models.db.fuel import FuelStorage, FuelSupplier, FuelTypes, Purchase
+from app.models.schemas.adapters import validate_rows
 from app.models.schemas.fuel import (
     PurchaseBase,
+    PurchaseBulkResult,
     PurchaseCreate,
     PurchaseData,
+    PurchaseFilter,
+    SpendData,
+    SpendFilter,
     StorageBase,
+    StorageBulkResult,
+    StorageBulkUpdate,
+    StorageConsume,
     StorageData,
+    StorageForecast,
+    StorageHistoryFilter,
+    StorageLevelBucket,
     StorageUpdate,
     SupplierBase,
     SupplierData,
+    SupplierRankFilter,
     SupplierUpdate,
 )
+from app.models.schemas.message import CriticalMessageBase
+from app.models.schemas.pagination import CursorPage, CursorParams
+from app.models.schemas.users import UserIdentity
+from app.repository.critical_message import CriticalMessageRepository
+from app.repository.fuel_level import FuelLevelRepository
 from app.repository.fuel_storage import FuelStorageRepository
 from app.repository.fuel_supplier import FuelSupplierRepository
 from app.repository.purchase import PurchaseRepository
+from app.repository.purchase_rollup import PurchaseRollupRepository
 from app.repository.user import UserRepository
-from app.services.base import BaseService
+from app.services.base import BaseService, transactional
+from app.services.fuel_level import consumption_rates, fuel_level_writer
+from app.services.price_index import supplier_price_index
+from app.utilities.forecast import estimate_consumption_rates, seconds_since
 from app.utilities.formatters.http_error import error_wrapper
 
+MAX_HISTORY_BUCKETS: int = 10000
+MAX_BULK_SIZE: int = 500
+FORECAST_WINDOW: timedelta = timedelta(hours=24)
+
 
 class FuelService(BaseService):
     def __init__(
@@ -29,27 +60,89 @@ class FuelService(BaseService):
         fuel_supplier_repository,
         fuel_storage_repository,
         purchase_repository,
+        critical_message_repository,
+        fuel_level_repository,
+        purchase_rollup_repository,
     ) -> None:
         self.user_repository: UserRepository = user_repository
         self.fuel_supplier_repository: FuelSupplierRepository = fuel_supplier_repository
         self.fuel_storage_repository: FuelStorageRepository = fuel_storage_repository
         self.purchase_repository: PurchaseRepository = purchase_repository
+        self.critical_message_repository: CriticalMessageRepository = (
+            critical_message_repository
+        )
+        self.fuel_level_repository: FuelLevelRepository = fuel_level_repository
+        self.purchase_rollup_repository: PurchaseRollupRepository = (
+            purchase_rollup_repository
+        )
+
+    @staticmethod
+    def _is_critical(storage: FuelStorage) -> bool:
+        return storage.current_amount <= storage.critical_amount
+
+    async def _notify_critical_level(
+        self, storage: FuelStorage, was_critical: bool
+    ) -> None:
+        # Alert only when the level crosses the critical mark,
+        # not on every update below it
+        if was_critical or not self._is_critical(storage):
+            return
+
+        await self.critical_message_repository.add_message_once(
+            CriticalMessageBase(
+                storage_id=storage.id,
+                message=f"Storage {storage.id} requires fuel purchase",
+            ),
+            settings.CRITICAL_MESSAGE_COOLDOWN,
+        )
+
+    def _on_levels_changed(
+        self, storages: list[FuelStorage], was_critical: dict[int, bool]
+    ) -> None:
+        # History and alerts follow the commit, so they never see rolled back levels
+        async def record_levels() -> None:
+            # Every sample is recorded before the first alert can fail
+            for storage in storages:
+                fuel_level_writer.add(storage)
+
+            # One failed alert doesn't stop the alerts of the other storages
+            for storage in storages:
+                try:
+                    await self._notify_critical_level(storage, was_critical[storage.id])
+                except Exception as error:
+                    logger.error(
+                        f"Critical level alert for storage {storage.id} has failed: "
+                        f"{error}"
+                    )
 
-    async def get_suppliers(self, current_user: User) -> list[SupplierData]:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
+        self._after_commit(record_levels)
+
+    def _validate_bulk_size(self, items: list) -> None:
+        if len(items) > MAX_BULK_SIZE:
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                detail=error_wrapper(
+                    f"No more than {MAX_BULK_SIZE} items can be sent at once", None
+                ),
+            )
+
+    async def get_suppliers(self, current_user: UserIdentity) -> list[SupplierData]:
+        self._validate_user_permissions(current_user)
 
         suppliers = await self.fuel_supplier_repository.get_fuel_suppliers()
         return [SupplierData(**supplier.__dict__) for supplier in suppliers]
 
+    @transactional
     async def create_supplier(
-        self, data: SupplierBase, current_user: User
+        self, data: SupplierBase, current_user: UserIdentity
     ) -> SupplierData:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
+        self._validate_user_permissions(current_user)
 
         try:
             new_supplier: FuelSupplier = (
                 await self.fuel_supplier_repository.create_fuel_supplier(data)
             )
+            self._after_commit(supplier_price_index.invalidate)
             return SupplierData(**new_supplier.__dict__)
         except IntegrityError:
             raise HTTPException(
@@ -59,18 +152,20 @@ class FuelService(BaseService):
                 ),
             )
 
+    @transactional
     async def update_supplier(
-        self, supplier_id: int, data: SupplierUpdate, current_user: User
+        self, supplier_id: int, data: SupplierUpdate, current_user: UserIdentity
     ) -> SupplierData:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
-        await self._validate_instance_exists(self.fuel_supplier_repository, supplier_id)
+        self._validate_user_permissions(current_user)
 
         try:
-            updated_supplier: FuelSupplier = (
+            updated_supplier: FuelSupplier = self._validate_instance_found(
+                self.fuel_supplier_repository,
                 await self.fuel_supplier_repository.update_fuel_supplier(
                     supplier_id, data
-                )
+                ),
             )
+            self._after_commit(supplier_price_index.invalidate)
             return SupplierData(**updated_supplier.__dict__)
         except IntegrityError:
             raise HTTPException(
@@ -80,76 +175,439 @@ class FuelService(BaseService):
                 ),
             )
 
-    async def delete_supplier(self, supplier_id: int, current_user: User) -> None:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
-        await self._validate_instance_exists(self.fuel_supplier_repository, supplier_id)
+    @transactional
+    async def delete_supplier(
+        self, supplier_id: int, current_user: UserIdentity
+    ) -> None:
+        self._validate_user_permissions(current_user)
+
+        self._validate_instance_found(
+            self.fuel_supplier_repository,
+            await self.fuel_supplier_repository.delete_fuel_supplier(supplier_id),
+        )
+        self._after_commit(supplier_price_index.invalidate)
+
+    async def get_ranked_suppliers(
+        self, filters: SupplierRankFilter, current_user: UserIdentity
+    ) -> list[SupplierData]:
+        self._validate_user_permissions(current_user)
+
+        fuel_type: Optional[FuelTypes] = filters.fuel_type
+        if filters.storage_id:
+            storage: FuelStorage = await self.fuel_storage_repository.get_or_404(
+                filters.storage_id
+            )
+            fuel_type = storage.fuel_type
+        if not fuel_type:
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                detail=error_wrapper(
+                    "Either storage_id or fuel_type should be provided", None
+                ),
+            )
+
+        if not supplier_price_index.is_built:
+            version: int = supplier_price_index.version
+            suppliers = await self.fuel_supplier_repository.get_fuel_suppliers()
+            supplier_price_index.build(suppliers, version)
+            if not supplier_price_index.is_built:
+                # A supplier has changed while reading, rank the fresh list directly
+                return sorted(
+                    (
+                        SupplierData(**supplier.__dict__)
+                        for supplier in suppliers
+                        if supplier.fuel_type == fuel_type
+                    ),
+                    key=lambda supplier: (supplier.price, supplier.id),
+                )
 
-        await self.fuel_supplier_repository.delete_fuel_supplier(supplier_id)
+        return supplier_price_index.get(fuel_type)
 
-    async def get_storages(self, current_user: User) -> list[StorageData]:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
+    async def get_storages(self, current_user: UserIdentity) -> list[StorageData]:
+        self._validate_user_permissions(current_user)
 
         storages = await self.fuel_storage_repository.get_fuel_storages()
         return [StorageData(**storage.__dict__) for storage in storages]
 
+    @transactional
     async def create_storage(
-        self, data: StorageBase, current_user: User
+        self, data: StorageBase, current_user: UserIdentity
     ) -> StorageData:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
+        self._validate_user_permissions(current_user)
 
         new_storage: FuelStorage = (
             await self.fuel_storage_repository.create_fuel_storage(data)
         )
+        self._after_commit(lambda: fuel_level_writer.add(new_storage))
         return StorageData(**new_storage.__dict__)
 
+    @transactional
     async def update_storage(
-        self, storage_id: int, data: StorageUpdate, current_user: User
+        self, storage_id: int, data: StorageUpdate, current_user: UserIdentity
     ) -> SupplierData:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
-        await self._validate_instance_exists(self.fuel_storage_repository, storage_id)
+        self._validate_user_permissions(current_user)
+
+        # The lock keeps the critical level crossing consistent with the update
+        storage: FuelStorage = await self.fuel_storage_repository.get_or_404(
+            storage_id, for_update=True
+        )
+        was_critical: bool = self._is_critical(storage)
 
         updated_storage: FuelStorage = (
             await self.fuel_storage_repository.update_fuel_storage(storage_id, data)
         )
+        self._on_levels_changed([updated_storage], {storage_id: was_critical})
         return StorageData(**updated_storage.__dict__)
 
-    async def delete_storage(self, storage_id: int, current_user: User) -> None:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
-        await self._validate_instance_exists(self.fuel_storage_repository, storage_id)
+    @transactional
+    async def consume_fuel(
+        self, storage_id: int, data: StorageConsume, current_user: UserIdentity
+    ) -> StorageData:
+        self._validate_user_permissions(current_user)
 
-        await self.fuel_storage_repository.delete_fuel_storage(storage_id)
+        fuel_storage: Optional[FuelStorage] = (
+            await self.fuel_storage_repository.consume_fuel(storage_id, data.amount)
+        )
+        if not fuel_storage:
+            await self.fuel_storage_repository.get_or_404(storage_id)
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                detail=error_wrapper(
+                    "There is not enough fuel in the storage", "amount"
+                ),
+            )
 
-    async def get_purchases(self, current_user: User) -> list[PurchaseData]:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
+        was_critical: bool = (
+            fuel_storage.current_amount + data.amount <= fuel_storage.critical_amount
+        )
+        self._on_levels_changed([fuel_storage], {fuel_storage.id: was_critical})
+        return StorageData(**fuel_storage.__dict__)
 
-        purchases = await self.purchase_repository.get_purchases()
-        return [PurchaseData(**purchase.__dict__) for purchase in purchases]
+    @staticmethod
+    def _to_utc(value: datetime) -> datetime:
+        # Levels are stored as naive UTC timestamps
+        if value.tzinfo:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
 
-    async def create_purchase(
-        self, data: PurchaseBase, current_user: User
-    ) -> PurchaseData:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
+    async def get_storage_history(
+        self,
+        storage_id: int,
+        filters: StorageHistoryFilter,
+        current_user: UserIdentity,
+    ) -> list[StorageLevelBucket]:
+        self._validate_user_permissions(current_user)
 
-        fuel_storage: FuelStorage = await self.fuel_storage_repository.get_fuel_storage(
-            data.fuel_storage_id
+        date_from: datetime = self._to_utc(filters.date_from)
+        date_to: datetime = self._to_utc(filters.date_to or datetime.utcnow())
+        if date_from >= date_to:
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                detail=error_wrapper(
+                    "date_from should be earlier than date_to", "date_from"
+                ),
+            )
+
+        if filters.bucket < 1:
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                detail=error_wrapper("Bucket should be at least one second", "bucket"),
+            )
+
+        bucket = timedelta(seconds=filters.bucket)
+        if (date_to - date_from) / bucket > MAX_HISTORY_BUCKETS:
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                detail=error_wrapper(
+                    f"The range is split into more than {MAX_HISTORY_BUCKETS} buckets, "
+                    "pick a larger bucket",
+                    "bucket",
+                ),
+            )
+
+        history = await self.fuel_level_repository.get_level_history(
+            storage_id, date_from, date_to, bucket
+        )
+        # Levels are only recorded for existing storages
+        if not history:
+            await self.fuel_storage_repository.get_or_404(storage_id)
+        return [StorageLevelBucket(**row._mapping) for row in history]
+
+    async def _get_consumption_rates(self) -> dict[int, float]:
+        # Rates only change when a new level sample arrives
+        last_level_id: Optional[int] = (
+            await self.fuel_level_repository.get_last_level_id()
+        )
+        if last_level_id == consumption_rates.last_level_id:
+            return consumption_rates.rates
+
+        window_start: datetime = datetime.utcnow() - FORECAST_WINDOW
+        levels = await self.fuel_level_repository.get_levels_since(window_start)
+        purchases = await self.purchase_repository.get_purchases_since(window_start)
+
+        rates: dict[int, float] = await asyncio.to_thread(
+            estimate_consumption_rates,
+            np.array([level.fuel_storage_id for level in levels], dtype=int),
+            seconds_since([level.created_at for level in levels], window_start),
+            np.array([level.amount for level in levels], dtype=float),
+            np.array([purchase.fuel_storage_id for purchase in purchases], dtype=int),
+            seconds_since(
+                [purchase.created_at for purchase in purchases], window_start
+            ),
+            np.array([purchase.amount for purchase in purchases], dtype=float),
+        )
+        consumption_rates.last_level_id = last_level_id
+        consumption_rates.rates = rates
+        return rates
+
+    async def get_storage_forecasts(
+        self, current_user: UserIdentity
+    ) -> list[StorageForecast]:
+        self._validate_user_permissions(current_user)
+
+        rates: dict[int, float] = await self._get_consumption_rates()
+        storages: list[FuelStorage] = (
+            await self.fuel_storage_repository.get_fuel_storages()
         )
 
-        fuel_supplier: FuelSupplier = await self.fuel_supplier_repository.get_fuel_supplier(data.fuel_supplier_id)
+        now: datetime = datetime.utcnow()
+        forecasts: list[StorageForecast] = []
+        for storage in storages:
+            rate: Optional[float] = rates.get(storage.id)
+            critical_at: Optional[datetime] = None
+            if self._is_critical(storage):
+                critical_at = now
+            elif rate:
+                try:
+                    critical_at = now + timedelta(
+                        seconds=(storage.current_amount - storage.critical_amount)
+                        / rate
+                    )
+                except OverflowError:
+                    # Consumption is too slow to ever reach the critical mark
+                    pass
+
+            forecasts.append(
+                StorageForecast(
+                    storage_id=storage.id,
+                    current_amount=storage.current_amount,
+                    critical_amount=storage.critical_amount,
+                    consumption_per_hour=rate * 3600 if rate is not None else None,
+                    critical_at=critical_at,
+                )
+            )
+        return forecasts
+
+    @transactional
+    async def update_storages(
+        self, data: list[StorageBulkUpdate], current_user: UserIdentity
+    ) -> list[StorageBulkResult]:
+        self._validate_user_permissions(current_user)
+        self._validate_bulk_size(data)
+
+        # Lock every affected storage at once, the changes are applied in one commit
+        storages: dict[int, FuelStorage] = {
+            storage.id: storage
+            for storage in await self.fuel_storage_repository.get_fuel_storages_by_ids(
+                {item.id for item in data}, for_update=True
+            )
+        }
+        was_critical: dict[int, bool] = {
+            storage.id: self._is_critical(storage) for storage in storages.values()
+        }
+
+        results: list[tuple[int, Optional[FuelStorage], Optional[str]]] = []
+        level_changes: dict[int, FuelStorage] = {}
+        for index, item in enumerate(data):
+            storage: Optional[FuelStorage] = storages.get(item.id)
+            new_fields: dict = item.model_dump(exclude={"id"}, exclude_none=True)
+            if not storage:
+                results.append((index, None, "FuelStorage is not found"))
+                continue
+            if not new_fields:
+                results.append(
+                    (index, None, "At least one valid field should be provided")
+                )
+                continue
+
+            for key, value in new_fields.items():
+                setattr(storage, key, value)
+            if "current_amount" in new_fields:
+                level_changes[storage.id] = storage
+            results.append((index, storage, None))
+
+        await self.fuel_storage_repository.save_many(list(storages.values()))
+        self._on_levels_changed(list(level_changes.values()), was_critical)
+        return [
+            StorageBulkResult(
+                index=index,
+                data=StorageData(**storage.__dict__) if storage else None,
+                error=error,
+            )
+            for index, storage, error in results
+        ]
+
+    @transactional
+    async def delete_storage(self, storage_id: int, current_user: UserIdentity) -> None:
+        self._validate_user_permissions(current_user)
+
+        self._validate_instance_found(
+            self.fuel_storage_repository,
+            await self.fuel_storage_repository.delete_fuel_storage(storage_id),
+        )
+
+    async def get_purchases(
+        self, filters: PurchaseFilter, params: CursorParams, current_user: UserIdentity
+    ) -> CursorPage[PurchaseData]:
+        self._validate_user_permissions(current_user)
+
+        purchases, next_cursor = await self.purchase_repository.get_purchases(
+            filters, params.size, self._get_cursor(params)
+        )
+        return self._create_page(
+            validate_rows(PurchaseData, purchases), params, next_cursor
+        )
+
+    def _get_purchase_error(
+        self,
+        data: PurchaseBase,
+        fuel_storage: Optional[FuelStorage],
+        fuel_supplier: Optional[FuelSupplier],
+    ) -> Optional[HTTPException]:
+        if not fuel_storage:
+            return HTTPException(
+                status.HTTP_404_NOT_FOUND, detail="FuelStorage is not found"
+            )
+
+        if not fuel_supplier:
+            return HTTPException(
+                status.HTTP_404_NOT_FOUND, detail="FuelSupplier is not found"
+            )
+
         if fuel_supplier.fuel_type != fuel_storage.fuel_type:
-            raise HTTPException(status.HTTP_400_BAD_REQUEST, "Type of fuel doesn't match for the storage and supplier")
+            return HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                "Type of fuel doesn't match for the storage and supplier",
+            )
 
         allowed_amount: float = fuel_storage.max_amount - fuel_storage.current_amount
         if data.amount > allowed_amount:
-            raise HTTPException(
+            return HTTPException(
                 status.HTTP_400_BAD_REQUEST,
-                f"You can't put that much fuel in. Maximum permissible value is {allowed_amount}",
+                "You can't put that much fuel in. "
+                f"Maximum permissible value is {allowed_amount}",
+            )
+        return None
+
+    async def _raise_purchase_rejected(self, data: PurchaseBase) -> None:
+        # Only called when the conditional update didn't match, to explain why
+        fuel_storage: Optional[FuelStorage] = (
+            await self.fuel_storage_repository.get_fuel_storage(data.fuel_storage_id)
+        )
+        fuel_supplier: Optional[FuelSupplier] = (
+            await self.fuel_supplier_repository.get_fuel_supplier(data.fuel_supplier_id)
+        )
+        error: Optional[HTTPException] = self._get_purchase_error(
+            data, fuel_storage, fuel_supplier
+        )
+        # The storage changed between the update and the reads,
+        # nothing is wrong with the data
+        raise error or HTTPException(
+            status.HTTP_409_CONFLICT, "The storage has just been changed, try again"
+        )
+
+    @transactional
+    async def create_purchase(
+        self, data: PurchaseBase, current_user: UserIdentity
+    ) -> PurchaseData:
+        self._validate_user_permissions(current_user)
+
+        result: Optional[tuple[Purchase, FuelStorage]] = (
+            await self.purchase_repository.create_purchase(
+                PurchaseCreate(**data.model_dump(), user_id=current_user.id)
             )
+        )
+        if not result:
+            await self._raise_purchase_rejected(data)
 
-        fuel_storage.current_amount += data.amount
-        await self.fuel_storage_repository.save(fuel_storage)
-        
-        new_purchase: Purchase = await self.purchase_repository.create_purchase(
-            PurchaseCreate(**data.model_dump(), user_id=current_user.id)
+        new_purchase, fuel_storage = result
+        was_critical: bool = (
+            fuel_storage.current_amount - data.amount <= fuel_storage.critical_amount
         )
-        print(new_purchase)
+        self._on_levels_changed([fuel_storage], {fuel_storage.id: was_critical})
         return PurchaseData(**new_purchase.__dict__)
+
+    @transactional
+    async def create_purchases(
+        self, data: list[PurchaseBase], current_user: UserIdentity
+    ) -> list[PurchaseBulkResult]:
+        self._validate_user_permissions(current_user)
+        self._validate_bulk_size(data)
+
+        # Two set-based reads instead of a lookup per item, the storages stay
+        # locked until the purchases are inserted so they can't be overfilled
+        storages: dict[int, FuelStorage] = {
+            storage.id: storage
+            for storage in await self.fuel_storage_repository.get_fuel_storages_by_ids(
+                {item.fuel_storage_id for item in data}, for_update=True
+            )
+        }
+        suppliers: dict[int, FuelSupplier] = {
+            supplier.id: supplier
+            for supplier in (
+                await self.fuel_supplier_repository.get_fuel_suppliers_by_ids(
+                    {item.fuel_supplier_id for item in data}
+                )
+            )
+        }
+        was_critical: dict[int, bool] = {
+            storage.id: self._is_critical(storage) for storage in storages.values()
+        }
+
+        results: list[tuple[int, Optional[Purchase], Optional[str]]] = []
+        level_changes: dict[int, FuelStorage] = {}
+        for index, item in enumerate(data):
+            storage: Optional[FuelStorage] = storages.get(item.fuel_storage_id)
+            error: Optional[HTTPException] = self._get_purchase_error(
+                item, storage, suppliers.get(item.fuel_supplier_id)
+            )
+            if error:
+                results.append((index, None, error.detail))
+                continue
+
+            # Later items for the same storage are checked against the updated amount
+            storage.current_amount += item.amount
+            level_changes[storage.id] = storage
+            purchase = Purchase(
+                **item.model_dump(),
+                user_id=current_user.id,
+                price=suppliers[item.fuel_supplier_id].price,
+            )
+            results.append((index, purchase, None))
+
+        # The purchases go in with one multi-row insert,
+        # in the same commit as the storages
+        await self.purchase_repository.save_many(
+            [purchase for _, purchase, _ in results if purchase]
+        )
+        self._on_levels_changed(list(level_changes.values()), was_critical)
+        return [
+            PurchaseBulkResult(
+                index=index,
+                data=PurchaseData(**purchase.__dict__) if purchase else None,
+                error=error,
+            )
+            for index, purchase, error in results
+        ]
+
+    @transactional
+    async def get_spend_analytics(
+        self, filters: SpendFilter, current_user: UserIdentity
+    ) -> list[SpendData]:
+        self._validate_user_permissions(current_user)
+
+        # Closed months are served from the rollup,
+        # only the current one is aggregated live
+        await self.purchase_rollup_repository.rollup_closed_months()
+        spend = await self.purchase_rollup_repository.get_spend(filters)
+        return [SpendData(**row._mapping) for row in spend]
@@ -0,0 +1,82 @@
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Optional
+
+from app.config.logs.logger import logger
+from app.config.settings.base import settings
+from app.core.database import async_session_maker
+from app.models.db.fuel import FuelStorage
+from app.repository.base import UnitOfWork
+from app.repository.fuel_level import FuelLevelRepository
+
+
+class FuelLevelWriter:
+    """Buffers storage level samples and writes them to the history in batches"""
+
+    def __init__(self, batch_size: int, flush_interval: float) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._levels: list[dict[str, Any]] = []
+        self._is_full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, storage: FuelStorage) -> None:
+        # The sample is stamped now, not when the batch reaches the database
+        self._levels.append(
+            {
+                "fuel_storage_id": storage.id,
+                "amount": storage.current_amount,
+                "created_at": datetime.utcnow(),
+            }
+        )
+        if len(self._levels) >= self.batch_size:
+            self._is_full.set()
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._is_full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            self._is_full.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._levels:
+            return
+
+        levels, self._levels = self._levels, []
+        try:
+            async with async_session_maker() as session, UnitOfWork(session):
+                await FuelLevelRepository(session).add_levels(levels)
+        except Exception as error:
+            logger.error(f"{len(levels)} fuel level samples were lost: {error}")
+
+
+fuel_level_writer = FuelLevelWriter(
+    settings.FUEL_LEVEL_BATCH_SIZE, settings.FUEL_LEVEL_FLUSH_INTERVAL
+)
+
+
+@dataclass(slots=True)
+class ConsumptionRates:
+    """Consumption rates of the storages, valid until a newer level sample arrives"""
+
+    last_level_id: Optional[int] = None
+    rates: dict[int, float] = field(default_factory=dict)
+
+
+consumption_rates = ConsumptionRates()
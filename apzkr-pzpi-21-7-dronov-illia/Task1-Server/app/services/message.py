@@ -0,0 +1,45 @@
+import re
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from app.models.schemas.message import CriticalMessageBase, CriticalMessageData
+from app.models.schemas.pagination import CursorPage, CursorParams
+from app.models.schemas.users import UserIdentity
+from app.repository.critical_message import CriticalMessageRepository
+from app.services.base import BaseService
+from app.utilities.formatters.http_error import error_wrapper
+
+
+class MessageService(BaseService):
+    def __init__(self, critical_message_repository) -> None:
+        self.critical_message_repository: CriticalMessageRepository = (
+            critical_message_repository
+        )
+
+    def _get_message_cursor(self, params: CursorParams) -> Optional[str]:
+        try:
+            cursor: Optional[str] = params.to_raw_params().cursor
+        except ValueError:
+            cursor = ""
+
+        # Cursor is a Redis Stream entry id, e.g. "1718195155000-0"
+        if cursor is not None and not re.fullmatch(r"\d+-\d+", cursor):
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                detail=error_wrapper("Invalid cursor", "cursor"),
+            )
+        return cursor
+
+    async def send_critical_message(
+        self, data: CriticalMessageBase, current_user: UserIdentity
+    ) -> CriticalMessageData:
+        return await self.critical_message_repository.add_message(data)
+
+    async def get_critical_messages(
+        self, params: CursorParams, current_user: UserIdentity
+    ) -> CursorPage[CriticalMessageData]:
+        messages, next_cursor = await self.critical_message_repository.get_messages(
+            params.size, self._get_message_cursor(params)
+        )
+        return CursorPage.create(messages, params, next_=next_cursor)
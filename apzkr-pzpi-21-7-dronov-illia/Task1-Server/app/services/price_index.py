@@ -0,0 +1,38 @@
+from typing import Optional
+
+from app.models.db.fuel import FuelSupplier, FuelTypes
+from app.models.schemas.fuel import SupplierData
+
+
+class SupplierPriceIndex:
+    """Suppliers of every fuel type ranked by price, rebuilt after any supplier change"""
+
+    def __init__(self) -> None:
+        self.version: int = 0
+        self._suppliers: Optional[dict[FuelTypes, list[SupplierData]]] = None
+
+    @property
+    def is_built(self) -> bool:
+        return self._suppliers is not None
+
+    def build(self, suppliers: list[FuelSupplier], version: int) -> None:
+        # Suppliers read before an invalidation must not end up in the index
+        if version != self.version:
+            return
+
+        index: dict[FuelTypes, list[SupplierData]] = {
+            fuel_type: [] for fuel_type in FuelTypes
+        }
+        for supplier in sorted(suppliers, key=lambda item: (item.price, item.id)):
+            index[supplier.fuel_type].append(SupplierData(**supplier.__dict__))
+        self._suppliers = index
+
+    def get(self, fuel_type: FuelTypes) -> list[SupplierData]:
+        return self._suppliers[fuel_type]
+
+    def invalidate(self) -> None:
+        self.version += 1
+        self._suppliers = None
+
+
+supplier_price_index = SupplierPriceIndex()
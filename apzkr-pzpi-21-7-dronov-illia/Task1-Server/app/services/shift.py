@@ -1,15 +1,26 @@
 from datetime import datetime
+from typing import Optional
 
 from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
 
 from app.models.db.shift import Shift
-from app.models.db.user import User, UserRoles
+from app.models.db.user import UserRoles
 from app.models.db.vehicle import VehicleStatuses
-from app.models.schemas.shift import ShiftBase, ShiftCreate, ShiftData, ShiftUpdate
+from app.models.schemas.adapters import validate_rows
+from app.models.schemas.pagination import CursorPage, CursorParams
+from app.models.schemas.shift import (
+    ShiftBase,
+    ShiftCreate,
+    ShiftData,
+    ShiftFilter,
+    ShiftUpdate,
+)
+from app.models.schemas.users import UserIdentity
 from app.repository.shift import ShiftRepository
 from app.repository.user import UserRepository
 from app.repository.vehicle import VehicleRepository
-from app.services.base import BaseService
+from app.services.base import BaseService, transactional
 from app.utilities.formatters.http_error import error_wrapper
 
 
@@ -19,56 +30,61 @@ class ShiftService(BaseService):
         self.shift_repository: ShiftRepository = shift_repository
         self.vehicle_repository: VehicleRepository = vehicle_repository
 
-    async def get_shifts(self, current_user: User) -> list[ShiftData]:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
+    async def get_shifts(
+        self, filters: ShiftFilter, params: CursorParams, current_user: UserIdentity
+    ) -> CursorPage[ShiftData]:
+        self._validate_user_permissions(current_user)
 
-        shifts = await self.shift_repository.get_shifts()
-        return [ShiftData(**shift.__dict__) for shift in shifts]
-
-    async def start_shift(self, shift_data: ShiftBase, current_user: User) -> ShiftData:
-        await self._validate_user_permissions(
-            self.user_repository, current_user.id, UserRoles.EMPLOYEE
-        )
-        await self._validate_instance_exists(
-            self.vehicle_repository, shift_data.vehicle_id
+        shifts, next_cursor = await self.shift_repository.get_shifts(
+            filters, params.size, self._get_cursor(params)
         )
+        return self._create_page(validate_rows(ShiftData, shifts), params, next_cursor)
 
-        current_vehicle_status: VehicleStatuses = (
-            await self.vehicle_repository.get_current_status(shift_data.vehicle_id)
+    @transactional
+    async def start_shift(
+        self, shift_data: ShiftBase, current_user: UserIdentity
+    ) -> ShiftData:
+        self._validate_user_permissions(current_user, UserRoles.EMPLOYEE)
+
+        # Only a vehicle that is off shift can be taken, checked by the update itself
+        vehicle_id: int = shift_data.vehicle_id
+        statuses: Optional[tuple[VehicleStatuses, Optional[VehicleStatuses]]] = (
+            await self.vehicle_repository.update_current_status(
+                vehicle_id, VehicleStatuses.SHIFT, VehicleStatuses.OFF_SHIFT
+            )
         )
-        if current_vehicle_status != VehicleStatuses.OFF_SHIFT:
+        if not statuses:
+            await self.vehicle_repository.get_or_404(vehicle_id)
             raise HTTPException(
                 status.HTTP_400_BAD_REQUEST,
                 error_wrapper("You can't use this vehicle at the moment", "vehicle_id"),
             )
 
-        user_on_shift: bool = await self.shift_repository.is_user_on_shift(
-            current_user.id
-        )
-        if user_on_shift:
+        # The partial unique indexes catch the races, the status change is
+        # rolled back together with the shift
+        try:
+            new_shift: Shift = await self.shift_repository.create_shift(
+                ShiftCreate(vehicle_id=vehicle_id, user_id=current_user.id)
+            )
+        except IntegrityError as error:
+            if "uq_shifts_user_id_active" in str(error.orig):
+                raise HTTPException(
+                    status.HTTP_400_BAD_REQUEST,
+                    "You are currently on the shift",
+                )
             raise HTTPException(
                 status.HTTP_400_BAD_REQUEST,
-                "You are currently on the shift",
+                error_wrapper("You can't use this vehicle at the moment", "vehicle_id"),
             )
 
-        vehicle_id: int = shift_data.vehicle_id
-        new_shift: Shift = await self.shift_repository.create_shift(
-            ShiftCreate(vehicle_id=vehicle_id, user_id=current_user.id)
-        )
-
-        await self.vehicle_repository.set_current_status(
-            vehicle_id, VehicleStatuses.SHIFT
-        )
-
         return ShiftData(**new_shift.__dict__)
 
-    async def end_shift(self, shift_id: int, current_user: User) -> ShiftData:
-        await self._validate_user_permissions(
-            self.user_repository, current_user.id, UserRoles.EMPLOYEE
-        )
-        await self._validate_instance_exists(self.shift_repository, shift_id)
+    @transactional
+    async def end_shift(self, shift_id: int, current_user: UserIdentity) -> ShiftData:
+        self._validate_user_permissions(current_user, UserRoles.EMPLOYEE)
 
-        shift: Shift = await self.shift_repository.get_shift(shift_id)
+        # Locking the shift keeps two concurrent requests from ending it twice
+        shift: Shift = await self.shift_repository.get_or_404(shift_id, for_update=True)
         if shift.end_time:
             raise HTTPException(
                 status.HTTP_400_BAD_REQUEST, "This shift is already ended up"
@@ -4,18 +4,23 @@ from fastapi import HTTPException, status
 from sqlalchemy.exc import IntegrityError
 
 from app.models.db.user import User, UserRoles
+from app.models.schemas.adapters import validate_rows
+from app.models.schemas.pagination import CursorPage, CursorParams
 from app.models.schemas.users import (
     PasswordChangeInput,
     PasswordChangeOutput,
     UserData,
+    UserFilter,
+    UserIdentity,
     UserLoginInput,
     UserLoginOutput,
     UserRegister,
     UserUpdate,
 )
+from app.repository.status_cache import status_cache
 from app.repository.user import UserRepository
 from app.securities.authorization.auth_handler import auth_handler
-from app.services.base import BaseService
+from app.services.base import BaseService, transactional
 from app.utilities.formatters.http_error import error_wrapper
 
 
@@ -23,16 +28,20 @@ class UserService(BaseService):
     def __init__(self, user_repository) -> None:
         self.user_repository: UserRepository = user_repository
 
-    async def get_profile(self, current_user) -> UserData:
-        return UserData(**current_user.__dict__)
+    async def get_profile(self, current_user: UserIdentity) -> UserData:
+        user: User = await self.user_repository.get_or_404(current_user.id)
+        return UserData(**user.__dict__)
 
+    @transactional
     async def register_user(
-        self, user_data: UserRegister, current_user: User
+        self, user_data: UserRegister, current_user: UserIdentity
     ) -> UserData:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
+        self._validate_user_permissions(current_user)
 
         # Hashing input password
-        user_data.password = auth_handler.get_password_hash(user_data.password)
+        user_data.password = await auth_handler.get_password_hash_async(
+            user_data.password
+        )
 
         try:
             result: User = await self.user_repository.create_user(user_data)
@@ -54,7 +63,7 @@ class UserService(BaseService):
                 detail="User with this email is not registered in the system",
             )
 
-        verify_password = auth_handler.verify_password(
+        verify_password = await auth_handler.verify_password_async(
             user_data.password, user_existing_object.password
         )
         if not verify_password:
@@ -66,22 +75,27 @@ class UserService(BaseService):
         auth_token = auth_handler.encode_token(user_existing_object.id, user_data.email)
         return {"token": auth_token}
 
-    async def get_users(self, current_user: User) -> list[User]:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
+    async def get_users(
+        self, filters: UserFilter, params: CursorParams, current_user: UserIdentity
+    ) -> CursorPage[UserData]:
+        self._validate_user_permissions(current_user)
 
-        users: list[User] = await self.user_repository.get_users()
-        return [UserData(**user.__dict__) for user in users]
+        users, next_cursor = await self.user_repository.get_users(
+            filters, params.size, self._get_cursor(params)
+        )
+        return self._create_page(validate_rows(UserData, users), params, next_cursor)
 
+    @transactional
     async def update_user(
-        self, user_id: int, user_data: UserUpdate, current_user: User
+        self, user_id: int, user_data: UserUpdate, current_user: UserIdentity
     ) -> UserData:
-        await self._validate_instance_exists(self.user_repository, user_id)
         if user_id != current_user.id:
             raise HTTPException(status.HTTP_403_FORBIDDEN, "Forbidden")
 
         try:
-            updated_user: User = await self.user_repository.update_user(
-                user_id, user_data
+            updated_user: User = self._validate_instance_found(
+                self.user_repository,
+                await self.user_repository.update_user(user_id, user_data),
             )
             return UserData(**updated_user.__dict__)
         except IntegrityError:
@@ -90,38 +104,52 @@ class UserService(BaseService):
                 detail=error_wrapper("User with this email already exists", "email"),
             )
 
-    async def delete_user(self, user_id: int, current_user: User) -> None:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
-        await self._validate_instance_exists(self.user_repository, user_id)
+    @transactional
+    async def delete_user(self, user_id: int, current_user: UserIdentity) -> None:
+        self._validate_user_permissions(current_user)
         if user_id == current_user.id:
             raise HTTPException(
                 status.HTTP_400_BAD_REQUEST,
                 "You are trying to delete an account you're currently logged in",
             )
 
-        await self.user_repository.delete_user(user_id)
+        self._validate_instance_found(
+            self.user_repository, await self.user_repository.delete_user(user_id)
+        )
 
+    @transactional
     async def change_password(
-        self, current_user: User, data: PasswordChangeInput
+        self, current_user: UserIdentity, data: PasswordChangeInput
     ) -> PasswordChangeOutput:
+        # The lock keeps concurrent changes from overwriting each other
+        user: User = await self.user_repository.get_or_404(
+            current_user.id, for_update=True
+        )
+
         # Validate the old password match the current one
-        if not auth_handler.verify_password(data.old_password, current_user.password):
+        if not await auth_handler.verify_password_async(
+            data.old_password, user.password
+        ):
             raise HTTPException(
                 status.HTTP_400_BAD_REQUEST,
                 detail=error_wrapper("Invalid old password", "old_password"),
             )
 
         # Validate the new password does not match the old password
-        if auth_handler.verify_password(data.new_password, current_user.password):
+        if await auth_handler.verify_password_async(data.new_password, user.password):
             raise HTTPException(
                 status.HTTP_409_CONFLICT, detail="You can't use your old password"
             )
 
-        current_user.password = auth_handler.get_password_hash(data.new_password)
-        await self.user_repository.save(current_user)
+        user.password = await auth_handler.get_password_hash_async(data.new_password)
+        await self.user_repository.save(user)
 
         return PasswordChangeOutput(message="The password was successfully reset")
 
-    async def export_data_xlsx(self, current_user_id: int):
-        await self._validate_user_permissions(self.user_repository, current_user_id)
+    async def get_cache_stats(self, current_user: UserIdentity) -> dict[str, Any]:
+        self._validate_user_permissions(current_user)
+        return {"vehicle_status": status_cache.get_stats()}
+
+    async def export_data_xlsx(self, current_user: UserIdentity):
+        self._validate_user_permissions(current_user)
         return await self.user_repository.export_data_xlsx()
@@ -1,23 +1,31 @@
+from typing import Optional
+
 from fastapi import HTTPException, status
 
 from app.models.db.shift import Shift
-from app.models.db.user import User, UserRoles
+from app.models.db.user import UserRoles
 from app.models.db.vehicle import Inspection, Vehicle, VehicleStatuses
+from app.models.schemas.adapters import validate_rows
+from app.models.schemas.pagination import CursorPage, CursorParams
 from app.models.schemas.vehicle import (
     InspectionBase,
     InspectionData,
+    InspectionFilter,
     InspectionUpdate,
     RefuelData,
     SetStatus,
     VehicleBase,
     VehicleData,
+    VehicleFilter,
+    VehicleStatusData,
     VehicleUpdate,
 )
+from app.models.schemas.users import UserIdentity
 from app.repository.inspection import InspectionRepository
 from app.repository.shift import ShiftRepository
 from app.repository.user import UserRepository
 from app.repository.vehicle import VehicleRepository
-from app.services.base import BaseService
+from app.services.base import BaseService, transactional
 
 
 class VehicleService(BaseService):
@@ -36,36 +44,47 @@ class VehicleService(BaseService):
     async def _get_vehicles_with_status(
         self, vehicles: list[Vehicle]
     ) -> list[VehicleData]:
-        current_statuses: list[str] = [
-            await self.vehicle_repository.get_current_status(vehicle.id)
-            for vehicle in vehicles
-        ]
-
-        # Unpack main vehicle object and add a status field
-        return [
-            VehicleData(
-                **vehicle.__dict__,
-                current_status=VehicleStatuses(status) if status else None,
+        # Current status is kept on the vehicle row itself
+        return [VehicleData(**vehicle.__dict__) for vehicle in vehicles]
+
+    async def get_vehicle_status(
+        self, vehicle_id: int, current_user: UserIdentity
+    ) -> VehicleStatusData:
+        statuses: Optional[dict[str, VehicleStatuses]] = (
+            await self.vehicle_repository.get_statuses(vehicle_id)
+        )
+        if not statuses:
+            raise HTTPException(
+                status.HTTP_404_NOT_FOUND, detail="Vehicle is not found"
             )
-            for vehicle, status in zip(vehicles, current_statuses)
-        ]
 
-    async def get_vehicles(self, current_user: User) -> list[VehicleData]:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
+        return VehicleStatusData(
+            current_status=statuses["current"], previous_status=statuses["previous"]
+        )
+
+    async def get_vehicles(
+        self, filters: VehicleFilter, params: CursorParams, current_user: UserIdentity
+    ) -> CursorPage[VehicleData]:
+        self._validate_user_permissions(current_user)
 
-        vehicles: list[Vehicle] = await self.vehicle_repository.get_vehicles()
-        return await self._get_vehicles_with_status(vehicles)
+        vehicles, next_cursor = await self.vehicle_repository.get_vehicles(
+            filters, params.size, self._get_cursor(params)
+        )
+        return self._create_page(
+            validate_rows(VehicleData, vehicles), params, next_cursor
+        )
 
+    @transactional
     async def refuel_vehicle(
-        self, vehicle_id: int, data: RefuelData, current_user: User
+        self, vehicle_id: int, data: RefuelData, current_user: UserIdentity
     ) -> None:
-        await self._validate_instance_exists(self.vehicle_repository, vehicle_id)
-        await self._validate_user_permissions(
-            self.user_repository, current_user.id, UserRoles.EMPLOYEE
-        )
+        self._validate_user_permissions(current_user, UserRoles.EMPLOYEE)
 
-        vehicle: Vehicle = await self.vehicle_repository.get_vehicle(vehicle_id)
-        vehicle_status = await self.vehicle_repository.get_current_status(vehicle_id)
+        # The locked row keeps concurrent refuels from adding to a stale level
+        vehicle: Vehicle = await self.vehicle_repository.get_or_404(
+            vehicle_id, for_update=True
+        )
+        vehicle_status = vehicle.current_status
         if vehicle_status in [VehicleStatuses.FUEL, VehicleStatuses.INSPECTION]:
             raise HTTPException(
                 status.HTTP_400_BAD_REQUEST,
@@ -95,76 +114,87 @@ class VehicleService(BaseService):
         vehicle.current_fuel_lvl += data.amount
         await self.vehicle_repository.save(vehicle)
 
-    async def stop_refuel(self, vehicle_id: int, current_user: User) -> None:
-        await self._validate_instance_exists(self.vehicle_repository, vehicle_id)
-        await self._validate_user_permissions(
-            self.user_repository, current_user.id, UserRoles.EMPLOYEE
-        )
+    @transactional
+    async def stop_refuel(self, vehicle_id: int, current_user: UserIdentity) -> None:
+        self._validate_user_permissions(current_user, UserRoles.EMPLOYEE)
 
-        vehicle_status = await self.vehicle_repository.get_current_status(vehicle_id)
-        if vehicle_status != VehicleStatuses.FUEL:
+        # Set status that was before refueling, the update only matches a refuel
+        if not await self.vehicle_repository.restore_previous_status(
+            vehicle_id, VehicleStatuses.FUEL
+        ):
+            await self.vehicle_repository.get_or_404(vehicle_id)
             raise HTTPException(
                 status.HTTP_400_BAD_REQUEST, "The vehicle is not on a refuel"
             )
 
-        # Set status that was before refueling
-        recent_status = await self.vehicle_repository.get_recent_status(vehicle_id)
-        await self.vehicle_repository.set_current_status(vehicle_id, recent_status)
-
+    @transactional
     async def create_vehicle(
-        self, data: VehicleBase, current_user: User
+        self, data: VehicleBase, current_user: UserIdentity
     ) -> VehicleData:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
+        self._validate_user_permissions(current_user)
 
         new_vehicle: Vehicle = await self.vehicle_repository.create_vehicle(data)
         return (await self._get_vehicles_with_status([new_vehicle]))[0]
 
+    @transactional
     async def set_current_status(
-        self, vehicle_id: int, status: SetStatus, current_user: User
+        self, vehicle_id: int, data: SetStatus, current_user: UserIdentity
     ) -> None:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
-        await self._validate_instance_exists(self.vehicle_repository, vehicle_id)
+        self._validate_user_permissions(current_user)
 
-        await self.vehicle_repository.set_current_status(vehicle_id, status.status)
+        # The unconditional update only misses a vehicle that doesn't exist
+        if not await self.vehicle_repository.update_current_status(
+            vehicle_id, data.status
+        ):
+            raise HTTPException(
+                status.HTTP_404_NOT_FOUND, detail="Vehicle is not found"
+            )
 
+    @transactional
     async def update_vehicle(
-        self, vehicle_id: int, data: VehicleUpdate, current_user: User
+        self, vehicle_id: int, data: VehicleUpdate, current_user: UserIdentity
     ) -> VehicleData:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
-        await self._validate_instance_exists(self.vehicle_repository, vehicle_id)
+        self._validate_user_permissions(current_user)
 
-        updated_vehicle: Vehicle = await self.vehicle_repository.update_vehicle(
-            vehicle_id, data
+        updated_vehicle: Vehicle = self._validate_instance_found(
+            self.vehicle_repository,
+            await self.vehicle_repository.update_vehicle(vehicle_id, data),
         )
         return (await self._get_vehicles_with_status([updated_vehicle]))[0]
 
-    async def delete_vehicle(self, vehicle_id: int, current_user: User) -> None:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
-        await self._validate_instance_exists(self.vehicle_repository, vehicle_id)
+    @transactional
+    async def delete_vehicle(self, vehicle_id: int, current_user: UserIdentity) -> None:
+        self._validate_user_permissions(current_user)
 
-        await self.vehicle_repository.delete_vehicle(vehicle_id)
+        self._validate_instance_found(
+            self.vehicle_repository,
+            await self.vehicle_repository.delete_vehicle(vehicle_id),
+        )
 
-    async def get_inspections(self, current_user: User) -> list[VehicleData]:
-        await self._validate_user_permissions(self.user_repository, current_user.id)
+    async def get_inspections(
+        self, filters: InspectionFilter, params: CursorParams, current_user: UserIdentity
+    ) -> CursorPage[InspectionData]:
+        self._validate_user_permissions(current_user)
 
-        inspections: list[
-            Inspection
-        ] = await self.inspection_repository.get_inspections()
-        return [InspectionData(**inspection.__dict__) for inspection in inspections]
+        inspections, next_cursor = await self.inspection_repository.get_inspections(
+            filters, params.size, self._get_cursor(params)
+        )
+        return self._create_page(
+            validate_rows(InspectionData, inspections), params, next_cursor
+        )
 
+    @transactional
     async def start_inspection(
-        self, data: InspectionBase, current_user: User
+        self, data: InspectionBase, current_user: UserIdentity
     ) -> InspectionData:
-        await self._validate_instance_exists(self.vehicle_repository, data.vehicle_id)
-        await self._validate_user_permissions(
-            self.user_repository, current_user.id, UserRoles.EMPLOYEE
-        )
+        self._validate_user_permissions(current_user, UserRoles.EMPLOYEE)
 
-        # Validate if employee can access the vehicle
+        # Validate if employee can access the vehicle, the vehicle of a shift exists
         current_shift: Shift = await self.shift_repository.get_current_user_shift(
             current_user.id
         )
         if not current_shift or current_shift.vehicle_id != data.vehicle_id:
+            await self.vehicle_repository.get_or_404(data.vehicle_id)
             raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
         is_vehicle_on_inspection: bool = (
@@ -184,16 +214,14 @@ class VehicleService(BaseService):
         )
         return InspectionData(**inspection.__dict__)
 
+    @transactional
     async def end_inspection(
-        self, inspection_id: int, data: InspectionUpdate, current_user: User
+        self, inspection_id: int, data: InspectionUpdate, current_user: UserIdentity
     ) -> InspectionData:
-        await self._validate_instance_exists(self.inspection_repository, inspection_id)
-        await self._validate_user_permissions(
-            self.user_repository, current_user.id, UserRoles.EMPLOYEE
-        )
+        self._validate_user_permissions(current_user, UserRoles.EMPLOYEE)
 
-        inspection: Inspection = await self.inspection_repository.get_inspection(
-            inspection_id
+        inspection: Inspection = await self.inspection_repository.get_or_404(
+            inspection_id, for_update=True
         )
         if inspection.user_id != current_user.id:
             raise HTTPException(status.HTTP_403_FORBIDDEN, "Forbidden")
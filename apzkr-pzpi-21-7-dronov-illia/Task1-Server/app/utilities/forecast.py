@@ -0,0 +1,65 @@
+from datetime import datetime
+
+import numpy as np
+
+
+def seconds_since(times: list[datetime], start: datetime) -> np.ndarray:
+    return (np.array(times, dtype="datetime64[us]") - np.datetime64(start)) / (
+        np.timedelta64(1, "s")
+    )
+
+
+def estimate_consumption_rates(
+    level_storage_ids: np.ndarray,
+    level_times: np.ndarray,
+    level_amounts: np.ndarray,
+    purchase_storage_ids: np.ndarray,
+    purchase_times: np.ndarray,
+    purchase_amounts: np.ndarray,
+) -> dict[int, float]:
+    """
+    Fits a least squares line through the level samples of every storage at once.
+    Times are seconds since the window start, the result is fuel drawn per second.
+    """
+    if not level_amounts.size:
+        return {}
+
+    storage_ids, groups = np.unique(level_storage_ids, return_inverse=True)
+
+    # Refills would look like negative consumption, so everything bought
+    # up to a sample is taken away from its level before fitting
+    levels = level_amounts.astype(float)
+    known_purchases = np.isin(purchase_storage_ids, storage_ids)
+    if known_purchases.any():
+        purchase_groups = np.searchsorted(
+            storage_ids, purchase_storage_ids[known_purchases]
+        )
+
+        # Offset every storage into its own time range to search all of them together
+        span = max(level_times.max(), purchase_times.max()) + 1
+        purchase_keys = purchase_groups * span + purchase_times[known_purchases]
+        order = np.argsort(purchase_keys)
+        purchase_keys = purchase_keys[order]
+        bought = np.concatenate(
+            ([0.0], np.cumsum(purchase_amounts[known_purchases][order]))
+        )
+
+        bought_before_sample = bought[
+            np.searchsorted(purchase_keys, groups * span + level_times, side="right")
+        ]
+        bought_before_storage = bought[np.searchsorted(purchase_keys, groups * span)]
+        levels -= bought_before_sample - bought_before_storage
+
+    # Centered sums per storage keep the slope stable for long windows
+    counts = np.bincount(groups)
+    mean_times = np.bincount(groups, level_times) / counts
+    centered_times = level_times - mean_times[groups]
+    variances = np.bincount(groups, centered_times**2)
+    covariances = np.bincount(groups, centered_times * levels)
+
+    rates: dict[int, float] = {}
+    for storage_id, variance, covariance in zip(storage_ids, variances, covariances):
+        # A single sample or samples at one instant don't give a trend
+        if variance > 0:
+            rates[int(storage_id)] = float(max(0.0, -covariance / variance))
+    return rates
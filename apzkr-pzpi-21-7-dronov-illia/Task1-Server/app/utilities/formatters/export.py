@@ -0,0 +1,46 @@
+import csv
+import enum
+import io
+import json
+from datetime import datetime
+from typing import Any, Sequence
+
+
+def _format_value(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def rows_to_ndjson(column_names: list[str], rows: Sequence[Sequence[Any]]) -> str:
+    """Converts table rows into newline-delimited JSON objects
+
+    Args:
+        column_names (list[str]): names of the table columns in the row order
+        rows (Sequence[Sequence[Any]]): batch of table rows
+
+    Returns:
+        str: one JSON object per row, each one terminated by a newline
+    """
+    return "".join(
+        json.dumps(dict(zip(column_names, map(_format_value, row))), ensure_ascii=False)
+        + "\n"
+        for row in rows
+    )
+
+
+def rows_to_csv(rows: Sequence[Sequence[Any]]) -> str:
+    """Converts table rows into CSV lines
+
+    Args:
+        rows (Sequence[Sequence[Any]]): batch of table rows (or a header)
+
+    Returns:
+        str: CSV lines for the given rows
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([map(_format_value, row) for row in rows])
+    return buffer.getvalue()
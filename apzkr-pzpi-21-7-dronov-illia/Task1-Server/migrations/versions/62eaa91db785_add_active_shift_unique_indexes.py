@@ -0,0 +1,31 @@
+"""add active shift unique indexes
+
+Revision ID: 62eaa91db785
+Revises: dd7c90d320c6
+Create Date: 2026-10-18 14:37:02.815590
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '62eaa91db785'
+down_revision = 'dd7c90d320c6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index('uq_shifts_user_id_active', 'shifts', ['user_id'], unique=True, postgresql_where=sa.text('end_time IS NULL'), postgresql_concurrently=True)
+        op.create_index('uq_shifts_vehicle_id_active', 'shifts', ['vehicle_id'], unique=True, postgresql_where=sa.text('end_time IS NULL'), postgresql_concurrently=True)
+        op.drop_index('ix_shifts_user_id_active', table_name='shifts', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_shifts_user_id_active', 'shifts', ['user_id'], unique=False, postgresql_where=sa.text('end_time IS NULL'), postgresql_concurrently=True)
+        op.drop_index('uq_shifts_vehicle_id_active', table_name='shifts', postgresql_concurrently=True)
+        op.drop_index('uq_shifts_user_id_active', table_name='shifts', postgresql_concurrently=True)
@@ -0,0 +1,54 @@
+"""add vehicle current status
+
+Revision ID: 6f440787cf58
+Revises: 5161c029751f
+Create Date: 2026-10-18 10:12:31.504217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '6f440787cf58'
+down_revision = '5161c029751f'
+branch_labels = None
+depends_on = None
+
+vehicle_statuses = postgresql.ENUM(
+    'SHIFT', 'INSPECTION', 'FUEL', 'OFF_SHIFT', name='vehiclestatuses', create_type=False
+)
+
+
+def upgrade() -> None:
+    op.add_column('vehicles', sa.Column('current_status', vehicle_statuses, nullable=True))
+    op.add_column('vehicles', sa.Column('previous_status', vehicle_statuses, nullable=True))
+
+    # Backfill both columns from the two latest history rows of every vehicle
+    op.execute(
+        """
+        WITH ranked AS (
+            SELECT
+                vehicle_id,
+                status,
+                row_number() OVER (
+                    PARTITION BY vehicle_id ORDER BY created_at DESC, id DESC
+                ) AS position
+            FROM statuses
+        )
+        UPDATE vehicles
+        SET current_status = current_row.status,
+            previous_status = previous_row.status
+        FROM ranked AS current_row
+        LEFT JOIN ranked AS previous_row
+            ON previous_row.vehicle_id = current_row.vehicle_id
+            AND previous_row.position = 2
+        WHERE current_row.vehicle_id = vehicles.id
+            AND current_row.position = 1
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('vehicles', 'previous_status')
+    op.drop_column('vehicles', 'current_status')
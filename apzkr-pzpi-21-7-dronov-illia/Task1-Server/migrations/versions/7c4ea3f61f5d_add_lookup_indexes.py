@@ -0,0 +1,37 @@
+"""add lookup indexes
+
+Revision ID: 7c4ea3f61f5d
+Revises: 6f440787cf58
+Create Date: 2026-10-18 11:40:05.118342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c4ea3f61f5d'
+down_revision = '6f440787cf58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index('ix_statuses_vehicle_id_created_at', 'statuses', ['vehicle_id', sa.text('created_at DESC')], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_shifts_user_id_active', 'shifts', ['user_id'], unique=False, postgresql_where=sa.text('end_time IS NULL'), postgresql_concurrently=True)
+        op.create_index('ix_inspections_vehicle_id_active', 'inspections', ['vehicle_id'], unique=False, postgresql_where=sa.text('end_time IS NULL'), postgresql_concurrently=True)
+        op.create_index(op.f('ix_purchases_fuel_storage_id'), 'purchases', ['fuel_storage_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_purchases_fuel_supplier_id'), 'purchases', ['fuel_supplier_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_purchases_user_id'), 'purchases', ['user_id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_purchases_user_id'), table_name='purchases', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_purchases_fuel_supplier_id'), table_name='purchases', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_purchases_fuel_storage_id'), table_name='purchases', postgresql_concurrently=True)
+        op.drop_index('ix_inspections_vehicle_id_active', table_name='inspections', postgresql_concurrently=True)
+        op.drop_index('ix_shifts_user_id_active', table_name='shifts', postgresql_concurrently=True)
+        op.drop_index('ix_statuses_vehicle_id_created_at', table_name='statuses', postgresql_concurrently=True)
@@ -0,0 +1,56 @@
+"""add row versions
+
+Revision ID: a6cd33183f27
+Revises: 1331985179ab
+Create Date: 2026-10-18 16:05:41.527318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6cd33183f27'
+down_revision = '1331985179ab'
+branch_labels = None
+depends_on = None
+
+VERSIONED_TABLES = ['users', 'vehicles', 'inspections', 'shifts', 'fuel_storages', 'fuel_suppliers']
+APPEND_ONLY_TABLES = ['statuses', 'purchases']
+
+
+def upgrade() -> None:
+    op.execute(sa.schema.CreateSequence(sa.Sequence('row_versions')))
+    # Existing rows get their versions from the default while the column is added
+    for table in VERSIONED_TABLES:
+        op.add_column(table, sa.Column('row_version', sa.BigInteger(), server_default=sa.text("nextval('row_versions')"), nullable=False))
+
+    op.execute(
+        "CREATE OR REPLACE FUNCTION reject_update() RETURNS trigger AS $$ "
+        "BEGIN RAISE EXCEPTION '% is append-only', TG_TABLE_NAME; END; "
+        "$$ LANGUAGE plpgsql"
+    )
+    for table in APPEND_ONLY_TABLES:
+        op.execute(
+            f"CREATE TRIGGER {table}_append_only BEFORE UPDATE ON {table} "
+            "FOR EACH ROW EXECUTE FUNCTION reject_update()"
+        )
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+    with op.get_context().autocommit_block():
+        for table in VERSIONED_TABLES:
+            op.create_index(op.f(f'ix_{table}_row_version'), table, ['row_version'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in VERSIONED_TABLES:
+            op.drop_index(op.f(f'ix_{table}_row_version'), table_name=table, postgresql_concurrently=True)
+
+    for table in APPEND_ONLY_TABLES:
+        op.execute(f"DROP TRIGGER {table}_append_only ON {table}")
+    op.execute("DROP FUNCTION reject_update()")
+
+    for table in VERSIONED_TABLES:
+        op.drop_column(table, 'row_version')
+    op.execute(sa.schema.DropSequence(sa.Sequence('row_versions')))
@@ -0,0 +1,42 @@
+"""add purchase monthly rollups table
+
+Revision ID: dd7c90d320c6
+Revises: 3a9a9d6aad9d
+Create Date: 2026-10-18 13:52:19.640731
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'dd7c90d320c6'
+down_revision = '3a9a9d6aad9d'
+branch_labels = None
+depends_on = None
+
+fuel_types = postgresql.ENUM('DIESEL', 'PETROL', 'GAS', name='fueltypes', create_type=False)
+
+
+def upgrade() -> None:
+    op.create_table('purchase_monthly_rollups',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('month', sa.DateTime(), nullable=False),
+    sa.Column('fuel_supplier_id', sa.Integer(), nullable=False),
+    sa.Column('fuel_type', fuel_types, nullable=False),
+    sa.Column('purchases_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.Column('total_spend', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['fuel_supplier_id'], ['fuel_suppliers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('month', 'fuel_supplier_id')
+    )
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_purchases_created_at'), 'purchases', ['created_at'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_purchases_created_at'), table_name='purchases')
+    op.drop_table('purchase_monthly_rollups')
@@ -0,0 +1,83 @@
+"""version rows by transaction
+
+Revision ID: e70594afcd56
+Revises: fc49b74af0d6
+Create Date: 2026-10-18 18:41:52.093517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e70594afcd56'
+down_revision = 'fc49b74af0d6'
+branch_labels = None
+depends_on = None
+
+VERSIONED_TABLES = ['users', 'vehicles', 'inspections', 'shifts', 'fuel_storages', 'fuel_suppliers']
+EXPORTED_TABLES = [*VERSIONED_TABLES, 'statuses', 'purchases']
+CURRENT_TRANSACTION_ID = sa.text('pg_current_xact_id()::text::bigint')
+
+
+def upgrade() -> None:
+    op.execute(sa.schema.CreateSequence(sa.Sequence('vehicle_status_versions')))
+    op.add_column('vehicles', sa.Column('status_version', sa.BigInteger(), server_default=sa.text("nextval('vehicle_status_versions')"), nullable=False))
+
+    # Sequence values can't be compared with transaction ids, every existing row
+    # gets the id of this migration instead
+    for table in VERSIONED_TABLES:
+        op.drop_index(op.f(f'ix_{table}_row_version'), table_name=table)
+        op.drop_column(table, 'row_version')
+    op.execute(sa.schema.DropSequence(sa.Sequence('row_versions')))
+    for table in EXPORTED_TABLES:
+        op.add_column(table, sa.Column('row_version', sa.BigInteger(), server_default=CURRENT_TRANSACTION_ID, nullable=False))
+
+    op.create_table('deleted_rows',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('table_name', sa.String(length=63), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('row_version', sa.BigInteger(), server_default=CURRENT_TRANSACTION_ID, nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_deleted_rows_row_version'), 'deleted_rows', ['row_version'], unique=False)
+
+    op.execute(
+        "CREATE OR REPLACE FUNCTION record_deleted_rows() RETURNS trigger AS $$ "
+        "BEGIN INSERT INTO deleted_rows (table_name, row_id) "
+        "SELECT TG_TABLE_NAME, id FROM deleted; RETURN NULL; END; "
+        "$$ LANGUAGE plpgsql"
+    )
+    for table in EXPORTED_TABLES:
+        op.execute(
+            f"CREATE TRIGGER {table}_track_deletes AFTER DELETE ON {table} "
+            "REFERENCING OLD TABLE AS deleted "
+            "FOR EACH STATEMENT EXECUTE FUNCTION record_deleted_rows()"
+        )
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+    with op.get_context().autocommit_block():
+        for table in EXPORTED_TABLES:
+            op.create_index(op.f(f'ix_{table}_row_version'), table, ['row_version'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in EXPORTED_TABLES:
+            op.drop_index(op.f(f'ix_{table}_row_version'), table_name=table, postgresql_concurrently=True)
+
+    for table in EXPORTED_TABLES:
+        op.execute(f"DROP TRIGGER {table}_track_deletes ON {table}")
+    op.execute("DROP FUNCTION record_deleted_rows()")
+    op.drop_index(op.f('ix_deleted_rows_row_version'), table_name='deleted_rows')
+    op.drop_table('deleted_rows')
+
+    for table in EXPORTED_TABLES:
+        op.drop_column(table, 'row_version')
+    op.execute(sa.schema.CreateSequence(sa.Sequence('row_versions')))
+    for table in VERSIONED_TABLES:
+        op.add_column(table, sa.Column('row_version', sa.BigInteger(), server_default=sa.text("nextval('row_versions')"), nullable=False))
+        op.create_index(op.f(f'ix_{table}_row_version'), table, ['row_version'], unique=False)
+
+    op.drop_column('vehicles', 'status_version')
+    op.execute(sa.schema.DropSequence(sa.Sequence('vehicle_status_versions')))
@@ -0,0 +1,77 @@
+"""add purchase price
+
+Revision ID: fc49b74af0d6
+Revises: a6cd33183f27
+Create Date: 2026-10-18 17:24:10.663204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'fc49b74af0d6'
+down_revision = 'a6cd33183f27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('purchases', sa.Column('price', sa.Float(), nullable=True))
+    # Rolled up months keep the price they were rolled up with, the others get the
+    # current one. The backfill is the only update purchases ever get.
+    op.execute("ALTER TABLE purchases DISABLE TRIGGER purchases_append_only")
+    op.execute(
+        "UPDATE purchases SET price = COALESCE("
+        "(SELECT rollup.total_spend / NULLIF(rollup.total_amount, 0) "
+        "FROM purchase_monthly_rollups AS rollup "
+        "WHERE rollup.month = date_trunc('month', purchases.created_at) "
+        "AND rollup.fuel_supplier_id = purchases.fuel_supplier_id), "
+        "(SELECT price FROM fuel_suppliers WHERE fuel_suppliers.id = purchases.fuel_supplier_id))"
+    )
+    op.execute("ALTER TABLE purchases ENABLE TRIGGER purchases_append_only")
+    op.alter_column('purchases', 'price', nullable=False)
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION refresh_purchase_rollups() RETURNS trigger AS $$
+        BEGIN
+            WITH stale AS (
+                DELETE FROM purchase_monthly_rollups AS rollup
+                USING (
+                    SELECT DISTINCT
+                        date_trunc('month', created_at) AS month, fuel_supplier_id
+                    FROM deleted_purchases
+                ) AS deleted
+                WHERE rollup.month = deleted.month
+                    AND rollup.fuel_supplier_id = deleted.fuel_supplier_id
+                RETURNING rollup.month, rollup.fuel_supplier_id, rollup.fuel_type
+            )
+            INSERT INTO purchase_monthly_rollups (
+                month, fuel_supplier_id, fuel_type,
+                purchases_count, total_amount, total_spend
+            )
+            SELECT
+                stale.month, stale.fuel_supplier_id, stale.fuel_type,
+                count(*), sum(purchases.amount), sum(purchases.amount * purchases.price)
+            FROM stale
+            JOIN purchases ON purchases.fuel_supplier_id = stale.fuel_supplier_id
+                AND purchases.created_at >= stale.month
+                AND purchases.created_at < stale.month + interval '1 month'
+            GROUP BY stale.month, stale.fuel_supplier_id, stale.fuel_type;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER purchases_refresh_rollups AFTER DELETE ON purchases "
+        "REFERENCING OLD TABLE AS deleted_purchases "
+        "FOR EACH STATEMENT EXECUTE FUNCTION refresh_purchase_rollups()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER purchases_refresh_rollups ON purchases")
+    op.execute("DROP FUNCTION refresh_purchase_rollups()")
+    op.drop_column('purchases', 'price')
@@ -0,0 +1,156 @@
+import asyncio
+from typing import Any, AsyncIterator, Iterator
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from sqlalchemy import event, make_url, text
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.config.settings.base import settings
+from app.core.database import DATABASE_URL, Base
+from app.models.db.fuel import FuelStorage, FuelTypes
+from app.models.db.user import User, UserRoles
+from app.models.db.vehicle import Vehicle, VehicleStatuses, VehicleTypes
+from app.repository import vehicle as vehicle_module
+from app.repository.status_cache import StatusCache
+from app.services import fuel as fuel_module
+from app.services.fuel_level import FuelLevelWriter
+
+TEST_DATABASE: str = f"{settings.POSTGRES_DB}_test"
+
+
+async def _recreate_database(url: URL) -> None:
+    # CREATE DATABASE can't run inside a transaction block
+    engine = create_async_engine(DATABASE_URL, isolation_level="AUTOCOMMIT")
+    async with engine.connect() as connection:
+        await connection.execute(text(f'DROP DATABASE IF EXISTS "{TEST_DATABASE}"'))
+        await connection.execute(text(f'CREATE DATABASE "{TEST_DATABASE}"'))
+    await engine.dispose()
+
+    engine = create_async_engine(url)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+
+async def _drop_database() -> None:
+    engine = create_async_engine(DATABASE_URL, isolation_level="AUTOCOMMIT")
+    async with engine.connect() as connection:
+        await connection.execute(text(f'DROP DATABASE IF EXISTS "{TEST_DATABASE}"'))
+    await engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def database_url() -> Iterator[URL]:
+    url: URL = make_url(DATABASE_URL).set(database=TEST_DATABASE)
+    try:
+        asyncio.run(_recreate_database(url))
+    except (OSError, ConnectionError) as error:
+        pytest.skip(f"PostgreSQL is not available: {error}")
+
+    yield url
+    asyncio.run(_drop_database())
+
+
+@pytest.fixture
+async def engine(database_url: URL) -> AsyncIterator[AsyncEngine]:
+    engine = create_async_engine(database_url, poolclass=NullPool)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def async_session(engine: AsyncEngine) -> AsyncIterator[AsyncSession]:
+    # Commits only release a savepoint, everything is rolled back after the test
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        async with AsyncSession(
+            bind=connection,
+            expire_on_commit=False,
+            join_transaction_mode="create_savepoint",
+        ) as session:
+            yield session
+        await transaction.rollback()
+
+
+@pytest.fixture
+def queries(engine: AsyncEngine) -> Iterator[list[tuple[str, Any]]]:
+    """Statements sent to the database during the test, with their parameters"""
+    recorded: list[tuple[str, Any]] = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        recorded.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield recorded
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def redis_server() -> FakeServer:
+    return FakeServer()
+
+
+@pytest.fixture
+def status_cache(redis_server: FakeServer, monkeypatch) -> StatusCache:
+    status_cache = StatusCache(
+        FakeRedis(server=redis_server, decode_responses=True), ttl=60
+    )
+    monkeypatch.setattr(vehicle_module, "status_cache", status_cache)
+    return status_cache
+
+
+@pytest.fixture
+def fuel_level_writer(monkeypatch) -> FuelLevelWriter:
+    writer = FuelLevelWriter(batch_size=100, flush_interval=60)
+    monkeypatch.setattr(fuel_module, "fuel_level_writer", writer)
+    return writer
+
+
+@pytest.fixture
+async def user(async_session: AsyncSession) -> User:
+    user = User(
+        first_name="Test",
+        last_name="User",
+        birth_date="01-01-2000",
+        gender="male",
+        role=UserRoles.EMPLOYEE,
+        email="test.user@example.com",
+        password="hash",
+        passport_number="AB123456",
+    )
+    async_session.add(user)
+    await async_session.flush()
+    return user
+
+
+@pytest.fixture
+async def vehicle(async_session: AsyncSession) -> Vehicle:
+    vehicle = Vehicle(
+        type=VehicleTypes.TRUCK,
+        title="Truck",
+        current_fuel_lvl=10,
+        max_fuel_lvl=100,
+        current_lng=30.5,
+        current_lat=50.4,
+        current_status=VehicleStatuses.OFF_SHIFT,
+    )
+    async_session.add(vehicle)
+    await async_session.flush()
+    return vehicle
+
+
+@pytest.fixture
+async def fuel_storage(async_session: AsyncSession) -> FuelStorage:
+    fuel_storage = FuelStorage(
+        max_amount=1000,
+        current_amount=500,
+        critical_amount=100,
+        fuel_type=FuelTypes.DIESEL,
+    )
+    async_session.add(fuel_storage)
+    await async_session.flush()
+    return fuel_storage
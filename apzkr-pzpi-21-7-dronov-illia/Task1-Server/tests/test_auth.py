@@ -0,0 +1,155 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.api.dependencies.user import get_current_identity
+from app.models.db.data_version import DeletedRow
+from app.models.db.user import User, UserRoles
+from app.models.schemas.users import (
+    PasswordChangeInput,
+    UserIdentity,
+    UserLoginInput,
+    UserRegister,
+)
+from app.repository.user import UserRepository
+from app.securities.authorization.auth_handler import auth_handler
+from app.services.user import UserService
+
+PASSWORD: str = "Password1"
+
+
+@pytest.fixture
+async def committed_users(engine: AsyncEngine) -> AsyncIterator[list[str]]:
+    """Emails of the users a test commits, removed afterwards"""
+    emails: list[str] = []
+    yield emails
+
+    async with engine.begin() as connection:
+        await connection.execute(delete(User).where(User.email.in_(emails)))
+        await connection.execute(
+            delete(DeletedRow).where(DeletedRow.table_name == "users")
+        )
+
+
+async def measure_loop_lag(done: asyncio.Event, interval: float = 0.005) -> float:
+    """Longest delay of a short timer on the event loop until `done` is set"""
+    lag: float = 0.0
+    while not done.is_set():
+        start: float = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(lag, time.perf_counter() - start - interval)
+    return lag
+
+
+async def test_role_comes_from_the_database(
+    async_session: AsyncSession, queries: list[tuple[str, Any]], user: User
+) -> None:
+    # The token doesn't carry the role, it can't outlive a demotion
+    auth_data = await auth_handler.decode_token(
+        auth_handler.encode_token(user.id, user.email)
+    )
+    assert "role" not in auth_data
+
+    queries.clear()
+    identity = await get_current_identity(auth_data, UserRepository(async_session))
+
+    assert identity.id == user.id
+    assert identity.role == UserRoles.EMPLOYEE
+    assert len(queries) == 1
+
+
+async def test_token_without_id_is_checked_by_email(
+    async_session: AsyncSession, user: User
+) -> None:
+    identity = await get_current_identity(
+        {"id": None, "email": user.email}, UserRepository(async_session)
+    )
+    assert identity.id == user.id
+
+
+async def test_deleted_user_is_rejected(
+    async_session: AsyncSession, user: User
+) -> None:
+    auth_data = {"id": user.id, "email": user.email}
+    await UserRepository(async_session).delete_user(user.id)
+
+    with pytest.raises(HTTPException) as error:
+        await get_current_identity(auth_data, UserRepository(async_session))
+
+    assert error.value.status_code == 401
+
+
+async def test_password_hashing_doesnt_block_the_event_loop(
+    engine: AsyncEngine, committed_users: list[str]
+) -> None:
+    hashed_password: str = auth_handler.get_password_hash(PASSWORD)
+    start: float = time.perf_counter()
+    auth_handler.verify_password(PASSWORD, hashed_password)
+    hashing_time: float = time.perf_counter() - start
+
+    email: str = "login.user@example.com"
+    committed_users.append(email)
+    async with engine.begin() as connection:
+        await connection.execute(
+            insert(User).values(
+                first_name="Login",
+                last_name="User",
+                birth_date="01-01-2000",
+                gender="male",
+                role=UserRoles.ADMIN,
+                email=email,
+                password=hashed_password,
+                passport_number="LU123456",
+            )
+        )
+    admin = UserIdentity(id=0, email=email, role=UserRoles.ADMIN)
+
+    async def login() -> None:
+        async with AsyncSession(engine) as session:
+            await UserService(UserRepository(session)).authenticate_user(
+                UserLoginInput(email=email, password=PASSWORD)
+            )
+
+    async def register(number: int) -> None:
+        committed_users.append(f"new.user{number}@example.com")
+        async with AsyncSession(engine) as session:
+            await UserService(UserRepository(session)).register_user(
+                UserRegister(
+                    first_name="New",
+                    last_name="User",
+                    birth_date="01-01-2000",
+                    gender="female",
+                    role=UserRoles.EMPLOYEE,
+                    email=f"new.user{number}@example.com",
+                    passport_number=f"NU12345{number}",
+                    password=PASSWORD,
+                ),
+                admin,
+            )
+
+    done = asyncio.Event()
+    lag_task: asyncio.Task = asyncio.create_task(measure_loop_lag(done))
+    await asyncio.gather(*[login() for _ in range(4)], *[register(n) for n in range(4)])
+    done.set()
+
+    # Hashing on the loop would stall the timer for at least one bcrypt round
+    assert await lag_task < hashing_time / 2
+
+
+async def test_password_is_changed_for_the_identity(
+    async_session: AsyncSession, user: User
+) -> None:
+    user.password = auth_handler.get_password_hash(PASSWORD)
+    await async_session.flush()
+
+    await UserService(UserRepository(async_session)).change_password(
+        UserIdentity(id=user.id, email=user.email, role=user.role),
+        PasswordChangeInput(old_password=PASSWORD, new_password="Password2"),
+    )
+
+    assert auth_handler.verify_password("Password2", user.password)
@@ -0,0 +1,140 @@
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.responses import schema_response
+from app.models.db.user import UserRoles
+from app.models.db.vehicle import VehicleStatuses, VehicleTypes
+from app.models.schemas.adapters import get_list_adapter
+from app.models.schemas.pagination import CursorParams
+from app.models.schemas.shift import ShiftData
+from app.models.schemas.users import UserIdentity
+from app.models.schemas.vehicle import VehicleData, VehicleFilter
+from app.repository.inspection import InspectionRepository
+from app.repository.shift import ShiftRepository
+from app.repository.user import UserRepository
+from app.repository.vehicle import VehicleRepository
+from app.services.vehicle import VehicleService
+
+ADMIN = UserIdentity(id=0, email="admin@example.com", role=UserRoles.ADMIN)
+PAGE_SIZE: int = 500
+
+
+def best_time(function: Callable[[], Any], runs: int = 3) -> float:
+    timings: list[float] = []
+    for _ in range(runs):
+        start: float = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+async def best_async_time(
+    function: Callable[[], Awaitable[Any]], runs: int = 5
+) -> float:
+    # The fastest run is the least disturbed by the rest of the machine
+    timings: list[float] = []
+    for _ in range(runs):
+        start: float = time.perf_counter()
+        await function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+async def add_vehicles(async_session: AsyncSession, count: int) -> None:
+    await VehicleRepository(async_session).insert_many(
+        [
+            {
+                "type": VehicleTypes.TRUCK,
+                "title": f"Truck {number}",
+                "current_fuel_lvl": 10,
+                "max_fuel_lvl": 100,
+                "current_lng": 30.5,
+                "current_lat": 50.4,
+                "current_status": VehicleStatuses.OFF_SHIFT,
+            }
+            for number in range(count)
+        ]
+    )
+
+
+async def test_vehicle_list_latency_is_flat_in_fleet_size(
+    async_session: AsyncSession, queries: list[tuple[str, Any]]
+) -> None:
+    service = VehicleService(
+        UserRepository(async_session),
+        VehicleRepository(async_session),
+        ShiftRepository(async_session),
+        InspectionRepository(async_session),
+    )
+
+    async def list_vehicles() -> None:
+        page = await service.get_vehicles(
+            VehicleFilter(), CursorParams(size=PAGE_SIZE), ADMIN
+        )
+        assert len(page.items) == PAGE_SIZE
+        assert all(item.current_status for item in page.items)
+
+    await add_vehicles(async_session, PAGE_SIZE)
+    small_fleet: float = await best_async_time(list_vehicles)
+    await add_vehicles(async_session, PAGE_SIZE * 9)
+    queries.clear()
+    await list_vehicles()
+    # The statuses come with the page, not with a lookup per vehicle
+    assert len(queries) == 1
+
+    large_fleet: float = await best_async_time(list_vehicles)
+    assert large_fleet < small_fleet * 3
+
+
+def test_schema_response_is_faster_than_the_default_response() -> None:
+    now = datetime.utcnow()
+    shifts: list[ShiftData] = [
+        ShiftData(
+            id=number,
+            user_id=number,
+            vehicle_id=number,
+            start_time=now - timedelta(hours=8),
+            end_time=now,
+        )
+        for number in range(10_000)
+    ]
+    vehicles: list[VehicleData] = [
+        VehicleData(
+            id=number,
+            type=VehicleTypes.TRUCK,
+            title=f"Truck {number}",
+            current_fuel_lvl=10,
+            max_fuel_lvl=100,
+            current_lng=30.5,
+            current_lat=50.4,
+            current_status=VehicleStatuses.OFF_SHIFT,
+        )
+        for number in range(10_000)
+    ]
+
+    for schema, items in ((ShiftData, shifts), (VehicleData, vehicles)):
+
+        def default_response() -> bytes:
+            # What FastAPI does with a returned response_model: dump, validate
+            # again, encode to plain types and render with the stdlib json
+            content = [item.model_dump() for item in items]
+            validated = get_list_adapter(schema).validate_python(content)
+            return JSONResponse(jsonable_encoder(validated)).body
+
+        def fast_response() -> bytes:
+            return schema_response(items, list[schema]).body
+
+        assert json.loads(fast_response()) == json.loads(default_response())
+        assert best_time(fast_response) * 5 < best_time(default_response)
+
+        # Routes that still go through the encoder render it with orjson
+        encoded = jsonable_encoder(items)
+        assert best_time(lambda: ORJSONResponse(encoded).body) < best_time(
+            lambda: JSONResponse(encoded).body
+        )
@@ -0,0 +1,259 @@
+import json
+import re
+import zipfile
+from pathlib import Path
+from typing import AsyncIterator
+
+import pytest
+import xlsxwriter
+from sqlalchemy import delete, insert, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from app.models.db.data_version import DeletedRow
+from app.models.db.fuel import FuelSupplier, FuelTypes
+from app.models.db.user import User, UserRoles
+from app.models.db.vehicle import Status, Vehicle, VehicleStatuses
+from app.models.schemas.export import ExportFormats
+from app.models.schemas.users import UserIdentity
+from app.models.schemas.vehicle import VehicleUpdate
+from app.repository import user as user_module
+from app.repository.base import UnitOfWork
+from app.repository.user import UserRepository
+from app.repository.vehicle import VehicleRepository
+from app.services.export import ExportService
+
+ADMIN = UserIdentity(id=1, email="admin@example.com", role=UserRoles.ADMIN)
+
+
+async def read_table(
+    async_session: AsyncSession,
+    table_name: str,
+    export_format: ExportFormats,
+    since: int = None,
+) -> str:
+    return (await export_table(async_session, table_name, export_format, since))[1]
+
+
+async def export_table(
+    async_session: AsyncSession,
+    table_name: str,
+    export_format: ExportFormats = ExportFormats.NDJSON,
+    since: int = None,
+) -> tuple[int, str]:
+    service = ExportService(UserRepository(async_session))
+    watermark, stream = await service.get_table_stream(
+        table_name, export_format, since, ADMIN
+    )
+    return watermark, "".join([chunk async for chunk in stream])
+
+
+@pytest.fixture
+async def committed_suppliers(engine: AsyncEngine) -> AsyncIterator[list[str]]:
+    """Titles of the suppliers a test commits, removed afterwards"""
+    titles: list[str] = []
+    yield titles
+
+    async with engine.begin() as connection:
+        await connection.execute(
+            delete(FuelSupplier).where(FuelSupplier.title.in_(titles))
+        )
+        await connection.execute(
+            delete(DeletedRow).where(DeletedRow.table_name == "fuel_suppliers")
+        )
+
+
+async def insert_supplier(connection: AsyncConnection, title: str) -> None:
+    await connection.execute(
+        insert(FuelSupplier).values(title=title, price=1, fuel_type=FuelTypes.DIESEL)
+    )
+
+
+def read_sheet_rows(file_path: Path) -> dict[str, int]:
+    # Row count of every worksheet, the header included
+    with zipfile.ZipFile(file_path) as archive:
+        names = re.findall(
+            r'<sheet name="([^"]+)"', archive.read("xl/workbook.xml").decode()
+        )
+        return {
+            name: archive.read(f"xl/worksheets/sheet{number}.xml")
+            .decode()
+            .count("<row ")
+            for number, name in enumerate(names, start=1)
+        }
+
+
+async def test_long_table_continues_on_next_worksheets(
+    async_session: AsyncSession, vehicle: Vehicle, monkeypatch
+) -> None:
+    monkeypatch.setattr(user_module, "XLSX_MAX_ROWS", 3)
+    monkeypatch.setattr(user_module, "EXPORT_BATCH_SIZE", 2)
+    async_session.add_all(
+        [Status(vehicle_id=vehicle.id, status=VehicleStatuses.SHIFT) for _ in range(5)]
+    )
+    await async_session.flush()
+
+    file_path: Path = await UserRepository(async_session).export_data_xlsx()
+    try:
+        sheet_rows: dict[str, int] = read_sheet_rows(file_path)
+    finally:
+        file_path.unlink()
+
+    assert sheet_rows["Status"] == 3
+    assert sheet_rows["Status_2"] == 3
+    assert sheet_rows["Status_3"] == 2
+    assert "Status_4" not in sheet_rows
+    assert sheet_rows["Vehicle"] == 2
+
+
+def test_row_out_of_the_worksheet_fails(tmp_path: Path) -> None:
+    workbook = xlsxwriter.Workbook(tmp_path / "export.xlsx")
+    worksheet = workbook.add_worksheet("Status")
+
+    with pytest.raises(ValueError):
+        UserRepository(None)._write_xlsx_rows(worksheet, 1048576, [("value",)])
+    workbook.close()
+
+
+async def test_fingerprint_follows_committed_changes(
+    async_session: AsyncSession, vehicle: Vehicle
+) -> None:
+    repository = UserRepository(async_session)
+    async with UnitOfWork(async_session):
+        pass
+    fingerprint: str = await repository.get_export_fingerprint()
+
+    # An update that doesn't change the row count or the ids
+    async with UnitOfWork(async_session):
+        await VehicleRepository(async_session).update_vehicle(
+            vehicle.id, VehicleUpdate(current_fuel_lvl=20)
+        )
+    updated_fingerprint: str = await repository.get_export_fingerprint()
+    assert updated_fingerprint != fingerprint
+
+    # Bulk statements skip the flush
+    async with UnitOfWork(async_session):
+        await VehicleRepository(async_session).delete_many([vehicle.id])
+    assert await repository.get_export_fingerprint() != updated_fingerprint
+
+
+async def test_fingerprint_ignores_rolled_back_changes(
+    async_session: AsyncSession, vehicle: Vehicle
+) -> None:
+    repository = UserRepository(async_session)
+    async with UnitOfWork(async_session):
+        pass
+    fingerprint: str = await repository.get_export_fingerprint()
+
+    with pytest.raises(RuntimeError):
+        async with UnitOfWork(async_session):
+            await VehicleRepository(async_session).update_vehicle(
+                vehicle.id, VehicleUpdate(current_fuel_lvl=20)
+            )
+            raise RuntimeError
+
+    assert await repository.get_export_fingerprint() == fingerprint
+
+
+@pytest.mark.parametrize("export_format", [ExportFormats.NDJSON, ExportFormats.CSV])
+async def test_password_is_not_exported(
+    async_session: AsyncSession, user: User, export_format: ExportFormats
+) -> None:
+    content: str = await read_table(async_session, "users", export_format)
+
+    assert user.email in content
+    assert "password" not in content
+    assert user.password not in content
+
+
+async def test_xlsx_export_skips_password(
+    async_session: AsyncSession, user: User
+) -> None:
+    file_path: Path = await UserRepository(async_session).export_data_xlsx()
+    try:
+        # constant_memory writes inline strings, User is the first worksheet
+        with zipfile.ZipFile(file_path) as archive:
+            sheet: str = archive.read("xl/worksheets/sheet1.xml").decode()
+    finally:
+        file_path.unlink()
+
+    assert user.email in sheet
+    assert "password" not in sheet
+
+
+async def test_updated_rows_are_streamed_after_watermark(
+    engine: AsyncEngine, committed_suppliers: list[str]
+) -> None:
+    committed_suppliers.append("Updated supplier")
+    async with engine.begin() as connection:
+        await insert_supplier(connection, "Updated supplier")
+
+    async with AsyncSession(engine) as session:
+        watermark, content = await export_table(session, "fuel_suppliers")
+        assert "Updated supplier" in content
+        assert (
+            "Updated supplier"
+            not in (await export_table(session, "fuel_suppliers", since=watermark))[1]
+        )
+
+        async with engine.begin() as connection:
+            await connection.execute(
+                update(FuelSupplier)
+                .where(FuelSupplier.title == "Updated supplier")
+                .values(price=5)
+            )
+        _, content = await export_table(session, "fuel_suppliers", since=watermark)
+
+    row: dict = json.loads(content)
+    assert row["title"] == "Updated supplier"
+    assert row["price"] == 5
+    assert row["row_version"] >= watermark
+
+
+async def test_slow_transaction_is_streamed_after_it_commits(
+    engine: AsyncEngine, committed_suppliers: list[str]
+) -> None:
+    committed_suppliers.extend(["Slow supplier", "Fast supplier"])
+    async with engine.connect() as slow, AsyncSession(engine) as session:
+        # The slow transaction writes first and commits after the fast one
+        slow_transaction = await slow.begin()
+        await insert_supplier(slow, "Slow supplier")
+        async with engine.begin() as fast:
+            await insert_supplier(fast, "Fast supplier")
+
+        watermark, content = await export_table(session, "fuel_suppliers")
+        assert "Fast supplier" in content
+        assert "Slow supplier" not in content
+
+        await slow_transaction.commit()
+        _, content = await export_table(session, "fuel_suppliers", since=watermark)
+
+    assert "Slow supplier" in content
+
+
+async def test_deletes_leave_tombstones(
+    async_session: AsyncSession, vehicle: Vehicle
+) -> None:
+    async_session.add(Status(vehicle_id=vehicle.id, status=VehicleStatuses.SHIFT))
+    await async_session.flush()
+    watermark: int = await UserRepository(async_session).get_export_watermark()
+
+    await VehicleRepository(async_session).delete_vehicle(vehicle.id)
+    _, content = await export_table(async_session, "deleted_rows", since=watermark)
+
+    # The statuses went with the vehicle through the cascade
+    rows: list[dict] = [json.loads(line) for line in content.splitlines()]
+    assert sorted(row["table_name"] for row in rows) == ["statuses", "vehicles"]
+    assert {"table_name": "vehicles", "row_id": vehicle.id} in [
+        {key: row[key] for key in ("table_name", "row_id")} for row in rows
+    ]
+
+
+async def test_append_only_tables_reject_updates(
+    async_session: AsyncSession, vehicle: Vehicle
+) -> None:
+    async_session.add(Status(vehicle_id=vehicle.id, status=VehicleStatuses.SHIFT))
+    await async_session.flush()
+
+    with pytest.raises(DBAPIError, match="statuses is append-only"):
+        await async_session.execute(update(Status).values(status=VehicleStatuses.FUEL))
@@ -0,0 +1,62 @@
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.db.fuel import FuelStorage, FuelTypes
+from app.models.schemas.message import CriticalMessageBase
+from app.repository.base import UnitOfWork
+from app.repository.fuel_storage import FuelStorageRepository
+from app.services.fuel import FuelService
+from app.services.fuel_level import FuelLevelWriter
+
+
+class FailingMessages:
+    """Critical messages that can't be sent for the first storage"""
+
+    def __init__(self, failing_storage_id: int) -> None:
+        self.failing_storage_id = failing_storage_id
+        self.sent: list[int] = []
+
+    async def add_message_once(
+        self, data: CriticalMessageBase, cooldown: int
+    ) -> Optional[CriticalMessageBase]:
+        if data.storage_id == self.failing_storage_id:
+            raise ConnectionError("Redis is down")
+        self.sent.append(data.storage_id)
+        return data
+
+
+async def test_failed_alert_doesnt_stop_levels_or_other_alerts(
+    async_session: AsyncSession, fuel_level_writer: FuelLevelWriter
+) -> None:
+    storages: list[FuelStorage] = [
+        FuelStorage(
+            max_amount=1000,
+            current_amount=50,
+            critical_amount=100,
+            fuel_type=FuelTypes.DIESEL,
+        )
+        for _ in range(2)
+    ]
+    async_session.add_all(storages)
+    await async_session.flush()
+
+    messages = FailingMessages(storages[0].id)
+    service = FuelService(
+        None,
+        None,
+        FuelStorageRepository(async_session),
+        None,
+        messages,
+        None,
+        None,
+    )
+    async with UnitOfWork(async_session):
+        service._on_levels_changed(
+            storages, {storage.id: False for storage in storages}
+        )
+
+    assert [level["fuel_storage_id"] for level in fuel_level_writer._levels] == [
+        storage.id for storage in storages
+    ]
+    assert messages.sent == [storages[1].id]
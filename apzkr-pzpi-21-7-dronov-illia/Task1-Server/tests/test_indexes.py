@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+
+import pytest
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.db.fuel import FuelStorage
+from app.models.db.user import User
+from app.models.db.vehicle import Status, Vehicle
+from app.models.schemas.fuel import PurchaseFilter
+from app.repository.fuel_level import FuelLevelRepository
+from app.repository.inspection import InspectionRepository
+from app.repository.purchase import PurchaseRepository
+from app.repository.shift import ShiftRepository
+from app.repository.user import UserRepository
+
+Lookup = Callable[[AsyncSession, dict[str, Any]], Awaitable[Any]]
+
+
+async def get_status_history(session: AsyncSession, ids: dict[str, Any]) -> Any:
+    query = (
+        select(Status)
+        .where(Status.vehicle_id == ids["vehicle_id"])
+        .order_by(Status.created_at.desc())
+        .limit(2)
+    )
+    return await session.execute(query)
+
+
+async def delete_vehicle_statuses(session: AsyncSession, ids: dict[str, Any]) -> Any:
+    # The same lookup the cascade delete of a vehicle runs
+    query = delete(Status).where(Status.vehicle_id == ids["vehicle_id"])
+    return await session.execute(query)
+
+
+LOOKUPS: list[tuple[str, Lookup, str]] = [
+    ("status history", get_status_history, "ix_statuses_vehicle_id_created_at"),
+    ("status cascade", delete_vehicle_statuses, "ix_statuses_vehicle_id_created_at"),
+    (
+        "current shift",
+        lambda session, ids: ShiftRepository(session).get_current_user_shift(
+            ids["user_id"]
+        ),
+        "uq_shifts_user_id_active",
+    ),
+    (
+        "current inspection",
+        lambda session, ids: InspectionRepository(session).get_current_inspection(
+            ids["vehicle_id"]
+        ),
+        "ix_inspections_vehicle_id_active",
+    ),
+    (
+        "purchases of a storage",
+        lambda session, ids: PurchaseRepository(session).get_purchases(
+            PurchaseFilter(fuel_storage_id=ids["fuel_storage_id"]), 50
+        ),
+        "ix_purchases_fuel_storage_id",
+    ),
+    (
+        "recent purchases",
+        lambda session, ids: PurchaseRepository(session).get_purchases_since(
+            datetime.utcnow() - timedelta(days=1)
+        ),
+        "ix_purchases_created_at",
+    ),
+    (
+        "storage level history",
+        lambda session, ids: FuelLevelRepository(session).get_level_history(
+            ids["fuel_storage_id"],
+            datetime.utcnow() - timedelta(days=1),
+            datetime.utcnow(),
+            timedelta(hours=1),
+        ),
+        "ix_fuel_storage_levels_fuel_storage_id_created_at",
+    ),
+    (
+        "user by email",
+        lambda session, ids: UserRepository(session).get_user_by_email(ids["email"]),
+        "users_email_key",
+    ),
+]
+
+
+@pytest.mark.parametrize(
+    "lookup, index_name",
+    [(lookup, index_name) for _, lookup, index_name in LOOKUPS],
+    ids=[name for name, _, _ in LOOKUPS],
+)
+async def test_lookup_uses_index(
+    async_session: AsyncSession,
+    queries: list[tuple[str, Any]],
+    user: User,
+    vehicle: Vehicle,
+    fuel_storage: FuelStorage,
+    lookup: Lookup,
+    index_name: str,
+) -> None:
+    ids: dict[str, Any] = {
+        "user_id": user.id,
+        "vehicle_id": vehicle.id,
+        "fuel_storage_id": fuel_storage.id,
+        "email": user.email,
+    }
+    # Tiny tables are always cheaper to scan, so only an unusable index shows up
+    await async_session.execute(text("SET LOCAL enable_seqscan = off"))
+
+    queries.clear()
+    await lookup(async_session, ids)
+    statement, parameters = queries[-1]
+
+    connection = await async_session.connection()
+    plan: str = "\n".join(
+        row[0]
+        for row in await connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+    )
+    assert "Seq Scan" not in plan
+    assert index_name in plan
@@ -0,0 +1,23 @@
+from typing import Optional
+
+import pytest
+from fastapi import HTTPException
+from fastapi_pagination.cursor import encode_cursor
+
+from app.models.schemas.pagination import CursorParams
+from app.services.base import BaseService
+
+
+@pytest.mark.parametrize(
+    "cursor, expected", [(None, None), ("", None), (encode_cursor("12"), 12)]
+)
+def test_cursor_is_decoded(cursor: Optional[str], expected: Optional[int]) -> None:
+    assert BaseService()._get_cursor(CursorParams(cursor=cursor)) == expected
+
+
+@pytest.mark.parametrize("cursor", ["!!!", "%%%", encode_cursor("abc")])
+def test_invalid_cursor_is_rejected(cursor: str) -> None:
+    with pytest.raises(HTTPException) as error:
+        BaseService()._get_cursor(CursorParams(cursor=cursor))
+
+    assert error.value.status_code == 400
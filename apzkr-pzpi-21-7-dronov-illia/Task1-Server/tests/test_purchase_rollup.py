@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.db.fuel import (
+    FuelStorage,
+    FuelSupplier,
+    FuelTypes,
+    Purchase,
+    PurchaseMonthlyRollup,
+)
+from app.models.db.user import User
+from app.models.schemas.fuel import PurchaseCreate, SpendFilter
+from app.repository.fuel_storage import FuelStorageRepository
+from app.repository.purchase import PurchaseRepository
+from app.repository.purchase_rollup import PurchaseRollupRepository
+
+
+def month_start(months_ago: int) -> datetime:
+    month: datetime = datetime.utcnow().replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+    for _ in range(months_ago):
+        month = (month - timedelta(days=1)).replace(day=1)
+    return month
+
+
+@pytest.fixture
+async def fuel_supplier(async_session: AsyncSession) -> FuelSupplier:
+    fuel_supplier = FuelSupplier(title="Supplier", price=2, fuel_type=FuelTypes.DIESEL)
+    async_session.add(fuel_supplier)
+    await async_session.flush()
+    return fuel_supplier
+
+
+@pytest.fixture
+def add_purchase(
+    async_session: AsyncSession,
+    user: User,
+    fuel_storage: FuelStorage,
+    fuel_supplier: FuelSupplier,
+):
+    async def add(created_at: datetime, amount: float = 10) -> Purchase:
+        purchase = Purchase(
+            fuel_storage_id=fuel_storage.id,
+            fuel_supplier_id=fuel_supplier.id,
+            user_id=user.id,
+            amount=amount,
+            price=fuel_supplier.price,
+            created_at=created_at,
+        )
+        async_session.add(purchase)
+        await async_session.flush()
+        return purchase
+
+    return add
+
+
+async def get_rollups(async_session: AsyncSession) -> list[tuple]:
+    query = select(
+        PurchaseMonthlyRollup.month,
+        PurchaseMonthlyRollup.purchases_count,
+        PurchaseMonthlyRollup.total_amount,
+        PurchaseMonthlyRollup.total_spend,
+    ).order_by(PurchaseMonthlyRollup.month)
+    return [tuple(row) for row in await async_session.execute(query)]
+
+
+async def test_late_purchase_of_the_previous_month_is_counted(
+    async_session: AsyncSession, add_purchase
+) -> None:
+    repository = PurchaseRollupRepository(async_session)
+    previous_month: datetime = month_start(1)
+    await add_purchase(previous_month + timedelta(days=27))
+    await repository.rollup_closed_months()
+
+    # Committed after the month was rolled up
+    await add_purchase(previous_month + timedelta(days=27, hours=23))
+    await repository.rollup_closed_months()
+
+    assert await get_rollups(async_session) == [(previous_month, 2, 20, 40)]
+
+
+async def test_deleted_purchases_are_recounted(
+    async_session: AsyncSession, add_purchase, fuel_storage: FuelStorage
+) -> None:
+    old_month: datetime = month_start(3)
+    purchase: Purchase = await add_purchase(old_month)
+    await add_purchase(old_month + timedelta(days=1), amount=5)
+    await PurchaseRollupRepository(async_session).rollup_closed_months()
+
+    await PurchaseRepository(async_session).delete_purchase(purchase.id)
+    assert await get_rollups(async_session) == [(old_month, 1, 5, 10)]
+
+    # Purchases deleted by the cascade leave the rollup too
+    await FuelStorageRepository(async_session).delete_fuel_storage(fuel_storage.id)
+    assert await get_rollups(async_session) == []
+
+
+async def test_spend_follows_the_price_at_purchase_time(
+    async_session: AsyncSession, add_purchase, fuel_supplier: FuelSupplier
+) -> None:
+    repository = PurchaseRollupRepository(async_session)
+    await add_purchase(month_start(2))
+    await add_purchase(datetime.utcnow())
+    await repository.rollup_closed_months()
+
+    fuel_supplier.price = 3
+    await async_session.flush()
+    spend = await repository.get_spend(SpendFilter())
+
+    assert [(row.month, row.total_spend) for row in spend] == [
+        (month_start(2), 20),
+        (month_start(0), 20),
+    ]
+
+
+async def test_purchase_keeps_the_supplier_price(
+    async_session: AsyncSession,
+    user: User,
+    fuel_storage: FuelStorage,
+    fuel_supplier: FuelSupplier,
+) -> None:
+    purchase, _ = await PurchaseRepository(async_session).create_purchase(
+        PurchaseCreate(
+            fuel_storage_id=fuel_storage.id,
+            fuel_supplier_id=fuel_supplier.id,
+            user_id=user.id,
+            amount=10,
+        )
+    )
+
+    await async_session.refresh(purchase)
+    assert purchase.price == fuel_supplier.price
@@ -0,0 +1,379 @@
+from datetime import datetime, timedelta
+from typing import Any
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.db.fuel import FuelStorage, FuelStorageLevel, FuelSupplier, FuelTypes
+from app.models.db.shift import Shift
+from app.models.db.user import User, UserRoles
+from app.models.db.vehicle import Vehicle, VehicleStatuses
+from app.models.schemas.fuel import StorageConsume, StorageHistoryFilter, SupplierUpdate
+from app.models.schemas.shift import ShiftBase
+from app.models.schemas.users import UserIdentity, UserUpdate
+from app.models.schemas.vehicle import InspectionBase, VehicleUpdate
+from app.repository.fuel_level import FuelLevelRepository
+from app.repository.fuel_storage import FuelStorageRepository
+from app.repository.fuel_supplier import FuelSupplierRepository
+from app.repository.inspection import InspectionRepository
+from app.repository.purchase import PurchaseRepository
+from app.repository.purchase_rollup import PurchaseRollupRepository
+from app.repository.shift import ShiftRepository
+from app.repository.status_cache import StatusCache
+from app.repository.user import UserRepository
+from app.repository.vehicle import VehicleRepository
+from app.services.fuel import FuelService
+from app.services.fuel_level import FuelLevelWriter
+from app.services.shift import ShiftService
+from app.services.user import UserService
+from app.services.vehicle import VehicleService
+
+
+def get_statements(queries: list[tuple[str, Any]]) -> list[str]:
+    # The first words are enough to tell the statements apart
+    return [" ".join(statement.split()[:3]) for statement, _ in queries]
+
+
+async def test_get_or_404_locks_in_one_query(
+    async_session: AsyncSession, queries: list[tuple[str, Any]], vehicle: Vehicle
+) -> None:
+    queries.clear()
+    instance = await VehicleRepository(async_session).get_or_404(
+        vehicle.id, for_update=True
+    )
+
+    assert instance is vehicle
+    assert len(queries) == 1
+    statement: str = queries[0][0]
+    assert statement.startswith("SELECT") and statement.endswith("FOR UPDATE")
+
+
+async def test_get_or_404_of_a_missing_row_is_one_query(
+    async_session: AsyncSession, queries: list[tuple[str, Any]]
+) -> None:
+    # The test savepoint is opened with the first statement of the session
+    await async_session.connection()
+    queries.clear()
+    with pytest.raises(HTTPException) as error:
+        await VehicleRepository(async_session).get_or_404(0, for_update=True)
+
+    assert error.value.status_code == 404
+    assert len(queries) == 1
+
+
+async def test_end_shift_queries(
+    async_session: AsyncSession,
+    queries: list[tuple[str, Any]],
+    user: User,
+    vehicle: Vehicle,
+    status_cache: StatusCache,
+) -> None:
+    shift = Shift(user_id=user.id, vehicle_id=vehicle.id)
+    vehicle.current_status = VehicleStatuses.SHIFT
+    async_session.add(shift)
+    await async_session.flush()
+    service = ShiftService(
+        UserRepository(async_session),
+        ShiftRepository(async_session),
+        VehicleRepository(async_session),
+    )
+
+    queries.clear()
+    await service.end_shift(
+        shift.id, UserIdentity(id=user.id, email=user.email, role=user.role)
+    )
+
+    assert get_statements(queries) == [
+        "SELECT shifts.id, shifts.user_id,",
+        "UPDATE shifts SET",
+        "UPDATE vehicles SET",
+        "INSERT INTO statuses",
+        "INSERT INTO data_versions",
+        "RELEASE SAVEPOINT sa_savepoint_1",
+    ]
+
+
+ADMIN = UserIdentity(id=0, email="admin@example.com", role=UserRoles.ADMIN)
+
+
+@pytest.fixture
+def vehicle_service(async_session: AsyncSession) -> VehicleService:
+    return VehicleService(
+        UserRepository(async_session),
+        VehicleRepository(async_session),
+        ShiftRepository(async_session),
+        InspectionRepository(async_session),
+    )
+
+
+@pytest.fixture
+def fuel_service(async_session: AsyncSession) -> FuelService:
+    return FuelService(
+        UserRepository(async_session),
+        FuelSupplierRepository(async_session),
+        FuelStorageRepository(async_session),
+        PurchaseRepository(async_session),
+        None,
+        FuelLevelRepository(async_session),
+        PurchaseRollupRepository(async_session),
+    )
+
+
+@pytest.fixture
+async def fuel_supplier(async_session: AsyncSession) -> FuelSupplier:
+    fuel_supplier = FuelSupplier(title="Supplier", price=50, fuel_type=FuelTypes.DIESEL)
+    async_session.add(fuel_supplier)
+    await async_session.flush()
+    return fuel_supplier
+
+
+def get_identity(user: User) -> UserIdentity:
+    return UserIdentity(id=user.id, email=user.email, role=user.role)
+
+
+async def test_update_vehicle_queries(
+    async_session: AsyncSession,
+    queries: list[tuple[str, Any]],
+    vehicle: Vehicle,
+    vehicle_service: VehicleService,
+    status_cache: StatusCache,
+) -> None:
+    queries.clear()
+    await vehicle_service.update_vehicle(
+        vehicle.id, VehicleUpdate(current_fuel_lvl=20), ADMIN
+    )
+
+    assert get_statements(queries) == [
+        "UPDATE vehicles SET",
+        "INSERT INTO data_versions",
+        "RELEASE SAVEPOINT sa_savepoint_1",
+    ]
+
+
+async def test_delete_vehicle_queries(
+    async_session: AsyncSession,
+    queries: list[tuple[str, Any]],
+    vehicle: Vehicle,
+    vehicle_service: VehicleService,
+    status_cache: StatusCache,
+) -> None:
+    queries.clear()
+    await vehicle_service.delete_vehicle(vehicle.id, ADMIN)
+
+    assert get_statements(queries) == [
+        "DELETE FROM vehicles",
+        "INSERT INTO data_versions",
+        "RELEASE SAVEPOINT sa_savepoint_1",
+    ]
+
+
+async def test_start_inspection_queries(
+    async_session: AsyncSession,
+    queries: list[tuple[str, Any]],
+    user: User,
+    vehicle: Vehicle,
+    vehicle_service: VehicleService,
+    status_cache: StatusCache,
+) -> None:
+    async_session.add(Shift(user_id=user.id, vehicle_id=vehicle.id))
+    await async_session.flush()
+
+    queries.clear()
+    await vehicle_service.start_inspection(
+        InspectionBase(vehicle_id=vehicle.id, reason="Noise"), get_identity(user)
+    )
+
+    assert get_statements(queries) == [
+        "SELECT shifts.id, shifts.user_id,",
+        "SELECT inspections.id, inspections.vehicle_id,",
+        "INSERT INTO inspections",
+        "UPDATE vehicles SET",
+        "INSERT INTO statuses",
+        "INSERT INTO data_versions",
+        "RELEASE SAVEPOINT sa_savepoint_1",
+    ]
+
+
+async def test_start_shift_queries(
+    async_session: AsyncSession,
+    queries: list[tuple[str, Any]],
+    user: User,
+    vehicle: Vehicle,
+    status_cache: StatusCache,
+) -> None:
+    service = ShiftService(
+        UserRepository(async_session),
+        ShiftRepository(async_session),
+        VehicleRepository(async_session),
+    )
+
+    queries.clear()
+    await service.start_shift(ShiftBase(vehicle_id=vehicle.id), get_identity(user))
+
+    assert get_statements(queries) == [
+        "UPDATE vehicles SET",
+        "INSERT INTO shifts",
+        "INSERT INTO statuses",
+        "INSERT INTO data_versions",
+        "RELEASE SAVEPOINT sa_savepoint_1",
+    ]
+
+
+async def test_update_supplier_queries(
+    async_session: AsyncSession,
+    queries: list[tuple[str, Any]],
+    fuel_supplier: FuelSupplier,
+    fuel_service: FuelService,
+) -> None:
+    queries.clear()
+    await fuel_service.update_supplier(
+        fuel_supplier.id, SupplierUpdate(price=60), ADMIN
+    )
+
+    assert get_statements(queries) == [
+        "UPDATE fuel_suppliers SET",
+        "INSERT INTO data_versions",
+        "RELEASE SAVEPOINT sa_savepoint_1",
+    ]
+
+
+async def test_delete_supplier_queries(
+    async_session: AsyncSession,
+    queries: list[tuple[str, Any]],
+    fuel_supplier: FuelSupplier,
+    fuel_service: FuelService,
+) -> None:
+    queries.clear()
+    await fuel_service.delete_supplier(fuel_supplier.id, ADMIN)
+
+    assert get_statements(queries) == [
+        "DELETE FROM fuel_suppliers",
+        "INSERT INTO data_versions",
+        "RELEASE SAVEPOINT sa_savepoint_1",
+    ]
+
+
+async def test_consume_fuel_queries(
+    async_session: AsyncSession,
+    queries: list[tuple[str, Any]],
+    fuel_storage: FuelStorage,
+    fuel_service: FuelService,
+    fuel_level_writer: FuelLevelWriter,
+) -> None:
+    queries.clear()
+    await fuel_service.consume_fuel(fuel_storage.id, StorageConsume(amount=10), ADMIN)
+
+    assert get_statements(queries) == [
+        "UPDATE fuel_storages SET",
+        "INSERT INTO data_versions",
+        "RELEASE SAVEPOINT sa_savepoint_1",
+    ]
+
+
+async def test_storage_history_queries(
+    async_session: AsyncSession,
+    queries: list[tuple[str, Any]],
+    fuel_storage: FuelStorage,
+    fuel_service: FuelService,
+) -> None:
+    async_session.add(FuelStorageLevel(fuel_storage_id=fuel_storage.id, amount=500))
+    await async_session.flush()
+
+    queries.clear()
+    await fuel_service.get_storage_history(
+        fuel_storage.id,
+        StorageHistoryFilter(date_from=datetime.utcnow() - timedelta(hours=1)),
+        ADMIN,
+    )
+
+    assert get_statements(queries) == [
+        "SELECT date_bin($1::INTERVAL, fuel_storage_levels.created_at,",
+    ]
+
+
+async def test_delete_storage_queries(
+    async_session: AsyncSession,
+    queries: list[tuple[str, Any]],
+    fuel_storage: FuelStorage,
+    fuel_service: FuelService,
+) -> None:
+    queries.clear()
+    await fuel_service.delete_storage(fuel_storage.id, ADMIN)
+
+    assert get_statements(queries) == [
+        "DELETE FROM fuel_storages",
+        "INSERT INTO data_versions",
+        "RELEASE SAVEPOINT sa_savepoint_1",
+    ]
+
+
+async def test_update_user_queries(
+    async_session: AsyncSession, queries: list[tuple[str, Any]], user: User
+) -> None:
+    queries.clear()
+    await UserService(UserRepository(async_session)).update_user(
+        user.id, UserUpdate(first_name="Updated"), get_identity(user)
+    )
+
+    assert get_statements(queries) == [
+        "UPDATE users SET",
+        "INSERT INTO data_versions",
+        "RELEASE SAVEPOINT sa_savepoint_1",
+    ]
+
+
+async def test_delete_user_queries(
+    async_session: AsyncSession, queries: list[tuple[str, Any]], user: User
+) -> None:
+    queries.clear()
+    await UserService(UserRepository(async_session)).delete_user(user.id, ADMIN)
+
+    assert get_statements(queries) == [
+        "DELETE FROM users",
+        "INSERT INTO data_versions",
+        "RELEASE SAVEPOINT sa_savepoint_1",
+    ]
+
+
+async def test_update_of_a_missing_vehicle_is_one_query(
+    async_session: AsyncSession,
+    queries: list[tuple[str, Any]],
+    vehicle_service: VehicleService,
+) -> None:
+    # The test savepoint is opened with the first statement of the session
+    await async_session.connection()
+    queries.clear()
+    with pytest.raises(HTTPException) as error:
+        await vehicle_service.update_vehicle(
+            0, VehicleUpdate(current_fuel_lvl=20), ADMIN
+        )
+
+    assert error.value.status_code == 404
+    assert get_statements(queries) == [
+        "UPDATE vehicles SET",
+        "ROLLBACK TO SAVEPOINT",
+    ]
+
+
+async def test_start_shift_reads_the_vehicle_only_when_the_update_misses(
+    async_session: AsyncSession,
+    queries: list[tuple[str, Any]],
+    user: User,
+) -> None:
+    service = ShiftService(
+        UserRepository(async_session),
+        ShiftRepository(async_session),
+        VehicleRepository(async_session),
+    )
+
+    queries.clear()
+    with pytest.raises(HTTPException) as error:
+        await service.start_shift(ShiftBase(vehicle_id=0), get_identity(user))
+
+    assert error.value.status_code == 404
+    assert get_statements(queries) == [
+        "UPDATE vehicles SET",
+        "SELECT vehicles.id, vehicles.type,",
+        "ROLLBACK TO SAVEPOINT",
+    ]
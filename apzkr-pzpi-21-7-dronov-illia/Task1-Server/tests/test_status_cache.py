@@ -0,0 +1,266 @@
+from typing import Any
+
+import pytest
+from fakeredis import FakeServer
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.db.user import User, UserRoles
+from app.models.db.vehicle import Vehicle, VehicleStatuses
+from app.models.schemas.users import UserIdentity
+from app.models.schemas.vehicle import RefuelData, SetStatus, VehicleStatusData
+from app.repository.base import UnitOfWork
+from app.repository.inspection import InspectionRepository
+from app.repository.shift import ShiftRepository
+from app.repository.status_cache import DELETED_VERSION, StatusCache
+from app.repository.user import UserRepository
+from app.repository.vehicle import VehicleRepository
+from app.services.vehicle import VehicleService
+
+
+@pytest.fixture
+def vehicle_service(async_session: AsyncSession) -> VehicleService:
+    return VehicleService(
+        UserRepository(async_session),
+        VehicleRepository(async_session),
+        ShiftRepository(async_session),
+        InspectionRepository(async_session),
+    )
+
+
+@pytest.fixture
+def employee(user: User) -> UserIdentity:
+    return UserIdentity(id=user.id, email=user.email, role=user.role)
+
+
+async def test_hit_skips_the_database(
+    async_session: AsyncSession,
+    queries: list[tuple[str, Any]],
+    vehicle: Vehicle,
+    status_cache: StatusCache,
+) -> None:
+    await status_cache.set(
+        vehicle.id,
+        VehicleStatuses.SHIFT,
+        VehicleStatuses.OFF_SHIFT,
+        vehicle.status_version,
+    )
+
+    queries.clear()
+    repository = VehicleRepository(async_session)
+    assert await repository.get_current_status(vehicle.id) == VehicleStatuses.SHIFT
+
+    assert queries == []
+    assert status_cache.get_stats() == {"hits": 1, "misses": 0}
+
+
+async def test_miss_falls_back_to_the_vehicle_row(
+    async_session: AsyncSession,
+    queries: list[tuple[str, Any]],
+    vehicle: Vehicle,
+    status_cache: StatusCache,
+) -> None:
+    queries.clear()
+    repository = VehicleRepository(async_session)
+    assert await repository.get_current_status(vehicle.id) == VehicleStatuses.OFF_SHIFT
+    assert len(queries) == 1
+
+    # The miss warmed up the cache
+    assert await repository.get_current_status(vehicle.id) == VehicleStatuses.OFF_SHIFT
+    assert len(queries) == 1
+    assert status_cache.get_stats() == {"hits": 1, "misses": 1}
+
+
+async def test_miss_for_a_missing_vehicle(
+    async_session: AsyncSession, status_cache: StatusCache
+) -> None:
+    assert await VehicleRepository(async_session).get_current_status(0) is None
+    assert await status_cache.get(0) is None
+
+
+async def test_status_change_is_cached_after_commit(
+    async_session: AsyncSession, vehicle: Vehicle, status_cache: StatusCache
+) -> None:
+    async with UnitOfWork(async_session):
+        await VehicleRepository(async_session).update_current_status(
+            vehicle.id, VehicleStatuses.SHIFT
+        )
+        assert await status_cache.get(vehicle.id) is None
+
+    await async_session.refresh(vehicle)
+    assert await status_cache.get(vehicle.id) == {
+        "current": VehicleStatuses.SHIFT,
+        "previous": VehicleStatuses.OFF_SHIFT,
+        "version": vehicle.status_version,
+    }
+    assert 0 < await status_cache.redis.ttl(status_cache._get_key(vehicle.id)) <= 60
+
+
+async def test_rolled_back_status_change_is_not_cached(
+    async_session: AsyncSession, vehicle: Vehicle, status_cache: StatusCache
+) -> None:
+    with pytest.raises(RuntimeError):
+        async with UnitOfWork(async_session):
+            await VehicleRepository(async_session).update_current_status(
+                vehicle.id, VehicleStatuses.SHIFT
+            )
+            raise RuntimeError
+
+    assert await status_cache.get(vehicle.id) is None
+
+
+async def test_older_version_doesnt_replace_newer(
+    vehicle: Vehicle, status_cache: StatusCache
+) -> None:
+    version: int = vehicle.status_version
+    assert await status_cache.set(
+        vehicle.id, VehicleStatuses.FUEL, VehicleStatuses.SHIFT, version + 2
+    )
+
+    # A callback landing out of commit order and a fill from a row read earlier
+    assert not await status_cache.set(
+        vehicle.id, VehicleStatuses.SHIFT, VehicleStatuses.OFF_SHIFT, version + 1
+    )
+    assert not await status_cache.set(
+        vehicle.id, VehicleStatuses.OFF_SHIFT, None, version
+    )
+
+    assert (await status_cache.get(vehicle.id))["current"] == VehicleStatuses.FUEL
+
+
+async def test_fill_doesnt_replace_the_committed_write(
+    async_session: AsyncSession, vehicle: Vehicle, status_cache: StatusCache
+) -> None:
+    # A reader saw the row before the update and fills in after its callback
+    read_version: int = vehicle.status_version
+    repository = VehicleRepository(async_session)
+    async with UnitOfWork(async_session):
+        await repository.update_current_status(vehicle.id, VehicleStatuses.SHIFT)
+
+    assert not await status_cache.set(
+        vehicle.id, VehicleStatuses.OFF_SHIFT, None, read_version
+    )
+    assert await repository.get_current_status(vehicle.id) == VehicleStatuses.SHIFT
+
+
+async def test_deleted_vehicle_isnt_cached_again(
+    async_session: AsyncSession,
+    queries: list[tuple[str, Any]],
+    vehicle: Vehicle,
+    status_cache: StatusCache,
+) -> None:
+    repository = VehicleRepository(async_session)
+    async with UnitOfWork(async_session):
+        await repository.delete_vehicle(vehicle.id)
+
+    assert not await status_cache.set(
+        vehicle.id, VehicleStatuses.OFF_SHIFT, None, vehicle.status_version
+    )
+    queries.clear()
+    assert await repository.get_statuses(vehicle.id) is None
+    assert queries == []
+
+
+async def test_works_without_redis(
+    async_session: AsyncSession,
+    vehicle: Vehicle,
+    redis_server: FakeServer,
+    status_cache: StatusCache,
+) -> None:
+    redis_server.connected = False
+    repository = VehicleRepository(async_session)
+
+    assert await repository.get_current_status(vehicle.id) == VehicleStatuses.OFF_SHIFT
+    async with UnitOfWork(async_session):
+        await repository.update_current_status(vehicle.id, VehicleStatuses.SHIFT)
+    assert await repository.get_current_status(vehicle.id) == VehicleStatuses.SHIFT
+    assert status_cache.get_stats() == {"hits": 0, "misses": 2}
+
+
+async def test_vehicle_status_is_read_from_the_cache(
+    queries: list[tuple[str, Any]],
+    vehicle: Vehicle,
+    status_cache: StatusCache,
+    vehicle_service: VehicleService,
+    employee: UserIdentity,
+) -> None:
+    await status_cache.set(
+        vehicle.id,
+        VehicleStatuses.SHIFT,
+        VehicleStatuses.OFF_SHIFT,
+        vehicle.status_version,
+    )
+
+    queries.clear()
+    assert await vehicle_service.get_vehicle_status(
+        vehicle.id, employee
+    ) == VehicleStatusData(
+        current_status=VehicleStatuses.SHIFT, previous_status=VehicleStatuses.OFF_SHIFT
+    )
+    assert queries == []
+
+    with pytest.raises(HTTPException) as error:
+        await vehicle_service.get_vehicle_status(0, employee)
+    assert error.value.status_code == 404
+
+
+async def test_stop_refuel_ignores_the_cache(
+    async_session: AsyncSession,
+    vehicle: Vehicle,
+    status_cache: StatusCache,
+    vehicle_service: VehicleService,
+    employee: UserIdentity,
+) -> None:
+    await vehicle_service.refuel_vehicle(vehicle.id, RefuelData(amount=5), employee)
+    # An entry that missed the refuel
+    await status_cache.redis.delete(status_cache._get_key(vehicle.id))
+    await status_cache.set(vehicle.id, VehicleStatuses.OFF_SHIFT, None, 0)
+
+    await vehicle_service.stop_refuel(vehicle.id, employee)
+
+    # The status before the refuel comes back from the vehicle row
+    await async_session.refresh(vehicle)
+    assert vehicle.current_status == VehicleStatuses.OFF_SHIFT
+    assert vehicle.previous_status == VehicleStatuses.FUEL
+    assert (await status_cache.get(vehicle.id))["current"] == VehicleStatuses.OFF_SHIFT
+
+
+async def test_stop_refuel_checks_the_row(
+    vehicle: Vehicle,
+    status_cache: StatusCache,
+    vehicle_service: VehicleService,
+    employee: UserIdentity,
+) -> None:
+    # An entry claiming a refuel the row doesn't have
+    await status_cache.set(
+        vehicle.id, VehicleStatuses.FUEL, VehicleStatuses.SHIFT, DELETED_VERSION - 1
+    )
+    with pytest.raises(HTTPException) as error:
+        await vehicle_service.stop_refuel(vehicle.id, employee)
+    assert error.value.status_code == 400
+
+    with pytest.raises(HTTPException) as error:
+        await vehicle_service.stop_refuel(0, employee)
+    assert error.value.status_code == 404
+
+
+async def test_set_status_ignores_the_cache(
+    async_session: AsyncSession,
+    vehicle: Vehicle,
+    status_cache: StatusCache,
+    vehicle_service: VehicleService,
+) -> None:
+    admin = UserIdentity(id=1, email="admin@example.com", role=UserRoles.ADMIN)
+    # An entry claiming the vehicle is gone
+    await status_cache.set(vehicle.id, None, None, DELETED_VERSION)
+    await vehicle_service.set_current_status(
+        vehicle.id, SetStatus(status=VehicleStatuses.SHIFT), admin
+    )
+    await async_session.refresh(vehicle)
+    assert vehicle.current_status == VehicleStatuses.SHIFT
+
+    with pytest.raises(HTTPException) as error:
+        await vehicle_service.set_current_status(
+            0, SetStatus(status=VehicleStatuses.SHIFT), admin
+        )
+    assert error.value.status_code == 404
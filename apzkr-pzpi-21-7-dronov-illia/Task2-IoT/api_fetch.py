@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Optional
 
 import requests
 
@@ -44,16 +44,13 @@ def get_storage_current_lvl(storage_id: int) -> int:
             return storage["current_amount"]
 
 
-def send_current_fuel_lvl(storage_id: int, current_lvl: float) -> None:
-    requests.patch(
-        f"{BASE_URL}/fuel/storages/{storage_id}/update",
-        json={"current_amount": current_lvl},
+def consume_fuel(storage_id: int, amount: float) -> Optional[float]:
+    response = requests.post(
+        f"{BASE_URL}/fuel/storages/{storage_id}/consume/",
+        json={"amount": amount},
         headers={"Authorization": f"Bearer {JWT}"},
     )
+    if not response.ok:
+        return None
 
-def send_critical_message(storage_id: int) -> None:
-    requests.post(
-        f"{BASE_URL}/admin/send-critical-messages/",
-        json={"storage_id": storage_id, "message": f"Storage {storage_id} requires fuel purchase"},
-        headers={"Authorization": f"Bearer {JWT}"},
-    )
\ No newline at end of file
+    return response.json()["current_amount"]
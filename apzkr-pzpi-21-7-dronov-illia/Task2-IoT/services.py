@@ -1,25 +1,30 @@
 from time import sleep
+from typing import Optional
 
 from tqdm import tqdm
 
-from api_fetch import get_storage_critical_lvl, get_storage_current_lvl, send_current_fuel_lvl, send_critical_message
+from api_fetch import consume_fuel, get_storage_critical_lvl, get_storage_current_lvl
 
 
 def refuel_critical(storage_id: int) -> None:
     critical_lvl: int = get_storage_critical_lvl(storage_id)
-    current_lvl: int = get_storage_current_lvl(storage_id)
+    current_lvl: Optional[float] = get_storage_current_lvl(storage_id)
 
     steps: int = int(current_lvl // 50)
 
     print("Start refueling the vehicle")
     for _ in tqdm(range(steps)):
-        current_lvl -= 50
-        send_current_fuel_lvl(storage_id, current_lvl)
+        # The server returns the level left after the draw, other pumps included
+        current_lvl = consume_fuel(storage_id, 50)
         sleep(0.2)
 
+        if current_lvl is None:
+            print("Not enough fuel left in the storage")
+            break
+
         if current_lvl <= critical_lvl:
-            send_critical_message(storage_id)
-            print("Critical amount message was sent to administrator")
+            # The server notices the crossing and alerts the administrator itself
+            print("Critical amount reached, administrator is notified by the server")
             break
 
 
@@ -28,6 +33,6 @@ def refuel_critical(storage_id: int) -> None:
 
 def refuel_regular(storage_id: int, fuel_amount: float) -> None:
     print("Start refueling the vehicle")
-    current_lvl: int = get_storage_current_lvl(storage_id)
-    send_current_fuel_lvl(storage_id, current_lvl - fuel_amount)
+    if consume_fuel(storage_id, fuel_amount) is None:
+        print("Not enough fuel left in the storage")
     print("Refueling is over")